@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     name = 'apps.dashboard'
     default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
@@ -0,0 +1,38 @@
+"""
+Recalcule les compteurs du tableau de bord et signale les écarts.
+À lancer avec: python manage.py rebuild_stats [--check]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.dashboard.stats import count_stats, rebuild_counters
+from apps.dashboard.models import StatsCounter
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs du tableau de bord depuis les tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Signaler les écarts sans modifier les compteurs (code de sortie 1 si écart)'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            stored = dict(StatsCounter.objects.values_list('key', 'value'))
+            drift = {
+                key: (stored.get(key), value)
+                for key, value in count_stats().items() if stored.get(key) != value
+            }
+        else:
+            drift = rebuild_counters()
+
+        for key, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(self.style.WARNING(f"{key}: {stored} -> {actual}"))
+
+        if options['check'] and drift:
+            raise CommandError(f"{len(drift)} compteur(s) en écart")
+        if drift:
+            self.stdout.write(self.style.SUCCESS(f"{len(drift)} compteur(s) corrigé(s)"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Aucun écart"))
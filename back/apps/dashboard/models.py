@@ -1,3 +1,13 @@
 from django.db import models
 
-# Create your models here.
+
+class StatsCounter(models.Model):
+    """Compteur du tableau de bord maintenu de façon incrémentale (voir stats.py)"""
+    key = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['key']
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
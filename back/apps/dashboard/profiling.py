@@ -0,0 +1,297 @@
+"""
+Profilage des requêtes à la demande, pour localiser la lenteur d'un endpoint.
+
+Activé par PERF_PROFILING_ENABLED (sinon le middleware est retiré de la
+chaîne), ``RequestProfilingMiddleware`` profile les requêtes portant l'en-tête
+PERF_PROFILING_HEADER avec le secret PERF_PROFILING_TOKEN (``X-Profile: <token>`` ;
+le middleware précède l'authentification et ne peut pas vérifier l'utilisateur)
+et un échantillon aléatoire (PERF_PROFILING_SAMPLE_RATE) des autres. Pour chacune il mesure :
+- le nombre et le temps des requêtes SQL ;
+- l'authentification, les permissions, la vue DRF (dispatch, qui inclut les
+  précédentes, la sérialisation et le SQL), la sérialisation et le rendu ;
+- les fonctions les plus coûteuses (cProfile, temps propre).
+Les mesures sont cumulées par route dans des tranches de PERF_PROFILING_SLOT
+secondes en cache, conservées PERF_PROFILING_WINDOW secondes :
+/api/dashboard/perf/ les agrège (histogramme de latence, temps moyens par
+composant, fonctions chaudes). Seule une réponse profilée à la demande (en-tête et
+secret valides) porte un en-tête Server-Timing.
+
+Le cumul en cache n'est pas atomique entre processus : sous forte concurrence
+quelques échantillons peuvent être perdus, ce qui reste acceptable pour un échantillonnage.
+"""
+import contextvars
+import cProfile
+import functools
+import hmac
+import os
+import pstats
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer, Serializer
+from rest_framework.views import APIView
+
+CACHE_PREFIX = 'perf_profile'
+# Bornes supérieures (ms) des classes de l'histogramme de latence, plus une classe de dépassement
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+COMPONENTS = ['sql', 'auth', 'permissions', 'view', 'serializer', 'render']
+
+_active = contextvars.ContextVar('request_profile', default=None)
+_lock = threading.Lock()
+_hooks_installed = False
+
+
+class RequestProfile:
+    """Temps cumulés d'une requête profilée, par composant"""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(COMPONENTS, 0.0)
+        self.sql_count = 0
+        self._depth = Counter()
+
+    @contextmanager
+    def measure(self, component):
+        # Appels imbriqués (sérialiseur dans un sérialiseur) : seul le plus externe compte
+        self._depth[component] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[component] -= 1
+            if not self._depth[component]:
+                self.seconds[component] += time.perf_counter() - started
+
+    def execute_sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds['sql'] += time.perf_counter() - started
+            self.sql_count += 1
+
+
+# Points de mesure DRF
+
+def _timed(component, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        with profile.measure(component):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def install_hooks():
+    """
+    Envelopper une fois les étapes de DRF mesurées. Hors requête profilée,
+    le surcoût est la lecture d'une variable de contexte.
+    """
+    global _hooks_installed
+    with _lock:
+        if _hooks_installed:
+            return
+        APIView.dispatch = _timed('view', APIView.dispatch)
+        APIView.perform_authentication = _timed('auth', APIView.perform_authentication)
+        APIView.check_permissions = _timed('permissions', APIView.check_permissions)
+        APIView.check_object_permissions = _timed('permissions', APIView.check_object_permissions)
+        Serializer.data = property(_timed('serializer', Serializer.data.fget))
+        ListSerializer.data = property(_timed('serializer', ListSerializer.data.fget))
+        Response.rendered_content = property(_timed('render', Response.rendered_content.fget))
+        _hooks_installed = True
+
+
+# Échantillons et agrégats
+
+def _short_path(filename):
+    """Chemin lisible d'une fonction : relatif au projet ou au paquet installé"""
+    if 'site-packages' + os.sep in filename:
+        return filename.split('site-packages' + os.sep, 1)[1]
+    base_dir = str(settings.BASE_DIR) + os.sep
+    return filename[len(base_dir):] if filename.startswith(base_dir) else filename
+
+
+def top_frames(profiler, limit):
+    """Fonctions au plus fort temps propre : {fonction: [appels, temps propre ms, temps cumulé ms]}"""
+    entries = sorted(pstats.Stats(profiler).stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return {
+        f'{_short_path(filename)}:{line}({name})': [calls, round(tottime * 1000, 3), round(cumtime * 1000, 3)]
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in entries
+    }
+
+
+def empty_stats():
+    return {
+        'count': 0,
+        'errors': 0,
+        'total_ms': 0.0,
+        'max_ms': 0.0,
+        'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        'sql_count': 0,
+        'components_ms': dict.fromkeys(COMPONENTS, 0.0),
+        'frames': {},
+    }
+
+
+def make_sample(profile, total_seconds, status_code, frames):
+    """Échantillon d'une requête, au format des cumuls par route"""
+    total_ms = total_seconds * 1000
+    sample = empty_stats()
+    sample.update({
+        'count': 1,
+        'errors': int(status_code >= 500),
+        'total_ms': total_ms,
+        'max_ms': total_ms,
+        'sql_count': profile.sql_count,
+        'components_ms': {component: seconds * 1000 for component, seconds in profile.seconds.items()},
+        'frames': frames,
+    })
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if total_ms <= bound), len(LATENCY_BUCKETS_MS))
+    sample['histogram'][bucket] = 1
+    return sample
+
+
+def merge_stats(target, stats, frame_limit):
+    """Ajouter des cumuls (ou un échantillon) à ceux d'une route ; garde les frame_limit fonctions les plus chaudes"""
+    for field in ('count', 'errors', 'total_ms', 'sql_count'):
+        target[field] += stats[field]
+    target['max_ms'] = max(target['max_ms'], stats['max_ms'])
+    target['histogram'] = [a + b for a, b in zip(target['histogram'], stats['histogram'])]
+    for component, ms in stats['components_ms'].items():
+        target['components_ms'][component] = target['components_ms'].get(component, 0.0) + ms
+    frames = target['frames']
+    for frame, (calls, tottime, cumtime) in stats['frames'].items():
+        current = frames.get(frame, [0, 0.0, 0.0])
+        frames[frame] = [current[0] + calls, current[1] + tottime, current[2] + cumtime]
+    if len(frames) > frame_limit:
+        target['frames'] = dict(sorted(frames.items(), key=lambda item: item[1][1], reverse=True)[:frame_limit])
+    return target
+
+
+def _slot(now=None):
+    return int((time.time() if now is None else now) // settings.PERF_PROFILING_SLOT)
+
+
+def record_sample(route, sample):
+    """Cumuler un échantillon dans la tranche courante du cache"""
+    key = f'{CACHE_PREFIX}:{_slot()}'
+    with _lock:
+        routes = cache.get(key) or {}
+        merge_stats(routes.setdefault(route, empty_stats()), sample, settings.PERF_PROFILING_TOP_FRAMES)
+        cache.set(key, routes, settings.PERF_PROFILING_WINDOW + settings.PERF_PROFILING_SLOT)
+
+
+def _histogram_percentile(histogram, count, max_ms, fraction):
+    """Borne supérieure de la classe contenant le percentile (maximum observé pour le dépassement)"""
+    if not count:
+        return None
+    seen = 0
+    for bound, bucket_count in zip(LATENCY_BUCKETS_MS + [None], histogram):
+        seen += bucket_count
+        if seen >= fraction * count:
+            return min(bound, max_ms) if bound is not None else max_ms
+    return max_ms
+
+
+def perf_report(window=None, route_filter=''):
+    """Agrégat des tranches de la fenêtre, par route, trié par temps total passé"""
+    window = min(window or settings.PERF_PROFILING_WINDOW, settings.PERF_PROFILING_WINDOW)
+    current = _slot()
+    slots = range(current - max(window // settings.PERF_PROFILING_SLOT, 1) + 1, current + 1)
+    merged = {}
+    for routes in cache.get_many([f'{CACHE_PREFIX}:{slot}' for slot in slots]).values():
+        for route, stats in routes.items():
+            if route_filter.lower() in route.lower():
+                merge_stats(merged.setdefault(route, empty_stats()), stats, settings.PERF_PROFILING_TOP_FRAMES)
+
+    report = []
+    for route, stats in sorted(merged.items(), key=lambda item: item[1]['total_ms'], reverse=True):
+        count = stats['count']
+        labels = [f'<={bound}' for bound in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}']
+        report.append({
+            'route': route,
+            'count': count,
+            'errors': stats['errors'],
+            'total_ms': round(stats['total_ms'], 1),
+            'latency_ms': {
+                'mean': round(stats['total_ms'] / count, 2),
+                'p50': _histogram_percentile(stats['histogram'], count, round(stats['max_ms'], 2), 0.5),
+                'p95': _histogram_percentile(stats['histogram'], count, round(stats['max_ms'], 2), 0.95),
+                'p99': _histogram_percentile(stats['histogram'], count, round(stats['max_ms'], 2), 0.99),
+                'max': round(stats['max_ms'], 2),
+            },
+            'histogram': dict(zip(labels, stats['histogram'])),
+            'sql_queries_mean': round(stats['sql_count'] / count, 1),
+            'components_ms_mean': {
+                component: round(ms / count, 2) for component, ms in stats['components_ms'].items()
+            },
+            'hot_frames': [
+                {'function': frame, 'calls': calls, 'self_ms': round(tottime, 2), 'cumulative_ms': round(cumtime, 2)}
+                for frame, (calls, tottime, cumtime) in sorted(
+                    stats['frames'].items(), key=lambda item: item[1][1], reverse=True
+                )
+            ],
+        })
+    return {'window_seconds': window, 'routes': report}
+
+
+# Middleware
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERF_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PERF_PROFILING_HEADER.upper().replace('-', '_')
+        install_hooks()
+
+    def requested(self, request):
+        """Profilage demandé par l'en-tête, avec le secret (jamais sans PERF_PROFILING_TOKEN)"""
+        token = settings.PERF_PROFILING_TOKEN
+        return bool(token) and hmac.compare_digest(request.META.get(self.header, ''), token)
+
+    def __call__(self, request):
+        requested = self.requested(request)
+        if not requested and random.random() >= settings.PERF_PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _active.set(profile)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Un autre profileur est déjà actif dans ce thread
+            profiler = None
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.execute_sql))
+                response = self.get_response(request)
+        finally:
+            total_seconds = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+            _active.reset(token)
+
+        match = request.resolver_match
+        route = f"{request.method} {match.view_name if match else 'unresolved'}"
+        frames = top_frames(profiler, settings.PERF_PROFILING_TOP_FRAMES) if profiler is not None else {}
+        record_sample(route, make_sample(profile, total_seconds, response.status_code, frames))
+        if not requested:
+            return response
+        response['Server-Timing'] = ', '.join(
+            [f'{component};dur={seconds * 1000:.2f}' for component, seconds in profile.seconds.items()]
+            + [f'total;dur={total_seconds * 1000:.2f}']
+        )
+        return response
@@ -0,0 +1,194 @@
+"""
+Métriques Prometheus exposées sur /metrics (format texte d'exposition).
+
+Mesures cumulées en mémoire dans le processus (compteurs et histogrammes de
+prometheus_client, sans accès base ni cache sur le chemin des requêtes) :
+- http_requests_total / http_request_duration_seconds : par méthode, route (nom de la vue) et statut ;
+- db_query_duration_seconds : requêtes SQL par base et type d'opération ;
+- cache_page_requests_total : hits / misses des listes mises en cache (metered_cache_page) ;
+- etl_jobs_total, etl_job_duration_seconds, etl_stage_duration_seconds, etl_rows_total :
+  traitements ETL terminés, durée par étape, lignes ingérées (rate() donne le débit).
+Les jauges de file ETL (etl_jobs, etl_queue_oldest_seconds) sont lues en base à chaque collecte.
+
+Sous gunicorn (plusieurs processus), définir PROMETHEUS_MULTIPROC_DIR : chaque
+processus, workers ETL compris, écrit ses valeurs dans des fichiers mmap de ce
+répertoire, agrégés à la collecte (voir gunicorn_config.py).
+"""
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.models import Count, Min
+from django.utils import timezone
+from django.views.decorators.cache import cache_page
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+    )
+    from prometheus_client.core import GaugeMetricFamily
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    PROMETHEUS_AVAILABLE = False
+
+# Bornes (secondes) des histogrammes
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+ETL_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+SQL_OPERATIONS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+_lock = threading.Lock()
+_collector_registered = False
+
+if PROMETHEUS_AVAILABLE:
+    HTTP_REQUESTS = Counter(
+        'http_requests_total', 'Requêtes HTTP traitées', ['method', 'route', 'status']
+    )
+    HTTP_DURATION = Histogram(
+        'http_request_duration_seconds', 'Durée des requêtes HTTP', ['method', 'route'], buckets=HTTP_BUCKETS
+    )
+    DB_DURATION = Histogram(
+        'db_query_duration_seconds', 'Durée des requêtes SQL', ['alias', 'operation'], buckets=DB_BUCKETS
+    )
+    CACHE_PAGE_REQUESTS = Counter(
+        'cache_page_requests_total', 'Listes servies depuis le cache (hit) ou recalculées (miss)', ['view', 'result']
+    )
+    ETL_JOBS = Counter('etl_jobs_total', 'Traitements ETL terminés', ['status'])
+    ETL_JOB_DURATION = Histogram(
+        'etl_job_duration_seconds', "Durée totale d'un traitement ETL", ['status'], buckets=ETL_BUCKETS
+    )
+    ETL_STAGE_DURATION = Histogram(
+        'etl_stage_duration_seconds', "Durée d'une étape de traitement ETL", ['stage'], buckets=ETL_BUCKETS
+    )
+    ETL_ROWS = Counter('etl_rows_total', 'Lignes ETL lues, par résultat', ['result'])
+
+
+def _sql_operation(sql):
+    operation = sql.lstrip()[:6].upper()
+    return operation if operation in SQL_OPERATIONS else 'OTHER'
+
+
+# Points de mesure ETL (appelés par le processeur, sans effet sans prometheus_client)
+
+def record_etl_rows(ingested, rejected):
+    if PROMETHEUS_AVAILABLE:
+        ETL_ROWS.labels('ingested').inc(ingested)
+        if rejected:
+            ETL_ROWS.labels('rejected').inc(rejected)
+
+
+def record_etl_job(status, metrics):
+    """Traitement terminé : statut, durée totale et durée de chaque étape (StageMetrics.as_dict())"""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    ETL_JOBS.labels(status).inc()
+    ETL_JOB_DURATION.labels(status).observe(metrics['total_seconds'])
+    for stage, stats in metrics['stages'].items():
+        ETL_STAGE_DURATION.labels(stage).observe(stats['wall_seconds'])
+
+
+# Cache des listes
+
+def metered_cache_page(timeout, view_name):
+    """cache_page qui compte les hits et misses de la vue"""
+    cached = cache_page(timeout)
+    if not PROMETHEUS_AVAILABLE:
+        return cached
+
+    def decorator(view_func):
+        cached_view = cached(view_func)
+
+        def wrapper(request, *args, **kwargs):
+            response = cached_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                # Positionné par le middleware de cache_page quand la réponse n'était pas en cache
+                missed = getattr(request, '_cache_update_cache', False)
+                CACHE_PAGE_REQUESTS.labels(view_name, 'miss' if missed else 'hit').inc()
+            return response
+        return wrapper
+    return decorator
+
+
+# Collecte
+
+class ETLQueueCollector:
+    """Jauges lues en base à chaque collecte : uploads par statut, âge du plus ancien en attente"""
+
+    def describe(self):
+        # Évite une collecte (donc des requêtes SQL) à l'enregistrement
+        return []
+
+    def collect(self):
+        from apps.etl.models import RawFileUpload
+
+        counts = dict(RawFileUpload.objects.values_list('status').annotate(count=Count('id')).order_by())
+        jobs = GaugeMetricFamily('etl_jobs', 'Uploads ETL par statut', labels=['status'])
+        for status, _ in RawFileUpload.STATUS_CHOICES:
+            jobs.add_metric([status], counts.get(status, 0))
+        yield jobs
+
+        oldest = RawFileUpload.objects.filter(
+            status=RawFileUpload.STATUS_PENDING, queued_at__isnull=False
+        ).aggregate(oldest=Min('queued_at'))['oldest']
+        yield GaugeMetricFamily(
+            'etl_queue_oldest_seconds', "Attente de l'upload le plus ancien de la file",
+            value=(timezone.now() - oldest).total_seconds() if oldest else 0
+        )
+
+
+def scrape_registry():
+    """Registre à exposer : agrégat des fichiers des processus en mode multiprocessus, sinon le registre global"""
+    global _collector_registered
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(ETLQueueCollector())
+        return registry
+    with _lock:
+        if not _collector_registered:
+            REGISTRY.register(ETLQueueCollector())
+            _collector_registered = True
+    return REGISTRY
+
+
+def exposition():
+    """Corps et type de contenu de la réponse /metrics"""
+    return generate_latest(scrape_registry()), CONTENT_TYPE_LATEST
+
+
+# Middleware
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED or not PROMETHEUS_AVAILABLE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def execute_sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            DB_DURATION.labels(context['connection'].alias, _sql_operation(sql)).observe(
+                time.perf_counter() - started
+            )
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self.execute_sql))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            match = request.resolver_match
+            route = match.view_name if match else 'unresolved'
+            HTTP_REQUESTS.labels(request.method, route, str(status)).inc()
+            HTTP_DURATION.labels(request.method, route).observe(time.perf_counter() - started)
@@ -0,0 +1,49 @@
+"""
+Mise à jour incrémentale des compteurs du tableau de bord à chaque création,
+modification (changement de rôle, de statut...) ou suppression d'un objet compté.
+"""
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .stats import COUNTER_SPECS, adjust_counters, counter_keys_for, tracked_fields
+
+
+def remember_counter_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Avant une modification, relire les valeurs en base des champs comptés"""
+    instance._stats_previous_keys = None
+    fields = tracked_fields(sender)
+    if raw or instance._state.adding or instance.pk is None or not fields:
+        return
+    if update_fields is not None and not fields & set(update_fields):
+        return
+    previous = sender._default_manager.filter(pk=instance.pk).values(*fields).first()
+    if previous is not None:
+        instance._stats_previous_keys = counter_keys_for(sender, previous)
+
+
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_counters({key: 1 for key in counter_keys_for(sender, instance)})
+        return
+    previous = getattr(instance, '_stats_previous_keys', None)
+    if previous is None:
+        return
+    current = counter_keys_for(sender, instance)
+    deltas = {key: 1 for key in current - previous}
+    deltas.update({key: -1 for key in previous - current})
+    adjust_counters(deltas)
+
+
+def update_counters_on_delete(sender, instance, **kwargs):
+    adjust_counters({key: -1 for key in counter_keys_for(sender, instance)})
+
+
+def connect_signals():
+    for label in {label for _, label, _ in COUNTER_SPECS}:
+        model = apps.get_model(label)
+        uid = f'dashboard_stats_{model._meta.label_lower}'
+        pre_save.connect(remember_counter_keys, sender=model, dispatch_uid=f'{uid}_pre_save')
+        post_save.connect(update_counters_on_save, sender=model, dispatch_uid=f'{uid}_post_save')
+        post_delete.connect(update_counters_on_delete, sender=model, dispatch_uid=f'{uid}_post_delete')
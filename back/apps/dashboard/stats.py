@@ -0,0 +1,210 @@
+"""
+Statistiques du tableau de bord administrateur.
+
+Chaque statistique est un StatsCounter tenu à jour de façon incrémentale :
+- par les signaux (signals.py) pour les save()/delete() unitaires ;
+- explicitement (``record_created``, ``adjust_counters``) pour les écritures
+  en masse (bulk_create, QuerySet.update) qui ne déclenchent pas de signal.
+La lecture coûte une requête sur une vingtaine de lignes ; ``rebuild_counters``
+(commande ``rebuild_stats``) recompte tout et signale les écarts.
+"""
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from apps.access_request.models import AccessRequest
+from apps.datacatalog.models import Indicator
+from apps.etl.models import RawFileUpload
+
+from .models import StatsCounter
+
+STATS_CACHE_KEY = 'dashboard_stats'
+
+# (section, modèle, {statistique: (champ, valeur) ou None pour le total})
+COUNTER_SPECS = [
+    ('users', 'accounts.User', {
+        'total': None,
+        'admins': ('role', 'ADMIN'),
+        'partners': ('role', 'PARTNER'),
+        'public': ('role', 'PUBLIC'),
+        'active': ('is_active_user', True),
+    }),
+    ('access_requests', 'access_request.AccessRequest', {
+        'total': None,
+        'pending': ('status', AccessRequest.STATUS_PENDING),
+        'approved': ('status', AccessRequest.STATUS_APPROVED),
+        'rejected': ('status', AccessRequest.STATUS_REJECTED),
+    }),
+    ('indicators', 'datacatalog.Indicator', {
+        'total': None,
+        'public': ('visibility', Indicator.VISIBILITY_PUBLIC),
+        'private': ('visibility', Indicator.VISIBILITY_PRIVATE),
+        'processed': ('is_processed', True),
+        'unprocessed': ('is_processed', False),
+    }),
+    ('etl', 'etl.RawFileUpload', {
+        'total_uploads': None,
+        'pending': ('status', RawFileUpload.STATUS_PENDING),
+        'processing': ('status', RawFileUpload.STATUS_PROCESSING),
+        'completed': ('status', RawFileUpload.STATUS_COMPLETED),
+        'failed': ('status', RawFileUpload.STATUS_FAILED),
+    }),
+    ('catalog', 'datacatalog.Category', {'categories': None}),
+    ('catalog', 'datacatalog.DataModel', {'data_models': None}),
+]
+
+COUNTER_KEYS = [
+    f'{section}.{name}'
+    for section, _, buckets in COUNTER_SPECS
+    for name in buckets
+]
+
+
+def _specs_for(model):
+    return [
+        (section, buckets) for section, label, buckets in COUNTER_SPECS
+        if label == model._meta.label
+    ]
+
+
+def is_counted(model):
+    return bool(_specs_for(model))
+
+
+def tracked_fields(model):
+    """Champs dont la valeur détermine les compteurs d'une instance"""
+    return {
+        condition[0]
+        for _, buckets in _specs_for(model)
+        for condition in buckets.values() if condition
+    }
+
+
+def counter_keys_for(model, values):
+    """Compteurs auxquels contribue une instance (objet ou dictionnaire de valeurs)"""
+    get = values.get if isinstance(values, dict) else lambda field: getattr(values, field)
+    return {
+        f'{section}.{name}'
+        for section, buckets in _specs_for(model)
+        for name, condition in buckets.items()
+        if condition is None or get(condition[0]) == condition[1]
+    }
+
+
+def adjust_counters(deltas):
+    """Appliquer des variations {clé: delta} avec des incréments F() (une requête par delta distinct)"""
+    by_delta = {}
+    for key, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(key)
+    if not by_delta:
+        return
+    with transaction.atomic():
+        for delta, keys in by_delta.items():
+            StatsCounter.objects.filter(key__in=keys).update(value=F('value') + delta)
+    invalidate_stats()
+
+
+def record_created(model, instances):
+    """Comptabiliser des objets insérés sans signal (bulk_create)"""
+    deltas = Counter()
+    for instance in instances:
+        deltas.update(counter_keys_for(model, instance))
+    adjust_counters(deltas)
+
+
+def record_updated(model, changes):
+    """Comptabiliser des modifications faites sans signal (bulk_update) : [(objet avant, objet après)]"""
+    deltas = Counter()
+    for previous, instance in changes:
+        before = counter_keys_for(model, previous)
+        after = counter_keys_for(model, instance)
+        deltas.update(after - before)
+        deltas.subtract(before - after)
+    adjust_counters(deltas)
+
+
+def deletion_deltas(model, queryset):
+    """
+    Variations des compteurs pour une suppression sans signal des objets d'un
+    queryset : à calculer avant la suppression, à appliquer ensuite avec adjust_counters
+    """
+    deltas = {}
+    for section, buckets in _specs_for(model):
+        deltas.update({key: -count for key, count in _bucket_counts(queryset, section, buckets).items()})
+    return deltas
+
+
+def record_transition(section, from_bucket, to_bucket, count):
+    """Comptabiliser ``count`` changements de statut faits par QuerySet.update()"""
+    if count:
+        adjust_counters({f'{section}.{from_bucket}': -count, f'{section}.{to_bucket}': count})
+
+
+def _bucket_counts(queryset, section, buckets):
+    return {
+        f'{section}.{name}': value
+        for name, value in queryset.aggregate(**{
+            name: Count('id', filter=Q(**{condition[0]: condition[1]}) if condition else None)
+            for name, condition in buckets.items()
+        }).items()
+    }
+
+
+def count_stats():
+    """Recompter toutes les statistiques en base (une requête par modèle)"""
+    counts = {}
+    for section, label, buckets in COUNTER_SPECS:
+        counts.update(_bucket_counts(apps.get_model(label).objects.all(), section, buckets))
+    return counts
+
+
+def rebuild_counters():
+    """Recalculer les compteurs depuis zéro ; retourne les écarts {clé: (stocké, réel)}"""
+    with transaction.atomic():
+        # Lignes verrouillées puis corrigées sur place : jamais absentes pour adjust_counters
+        stored = dict(StatsCounter.objects.select_for_update().values_list('key', 'value'))
+        actual = count_stats()
+        for key, value in actual.items():
+            if key not in stored:
+                StatsCounter.objects.update_or_create(key=key, defaults={'value': value})
+            elif stored[key] != value:
+                StatsCounter.objects.filter(key=key).update(value=value)
+    invalidate_stats()
+    return {
+        key: (stored.get(key), value)
+        for key, value in actual.items() if stored.get(key) != value
+    }
+
+
+def compute_stats():
+    """Lire les compteurs (une requête) et les regrouper par section"""
+    counters = dict(StatsCounter.objects.filter(key__in=COUNTER_KEYS).values_list('key', 'value'))
+    if len(counters) != len(COUNTER_KEYS):
+        # Compteurs absents (première utilisation, base vidée) : les initialiser
+        rebuild_counters()
+        counters = dict(StatsCounter.objects.values_list('key', 'value'))
+
+    stats = {}
+    for key in COUNTER_KEYS:
+        section, name = key.split('.', 1)
+        stats.setdefault(section, {})[name] = counters[key]
+    return stats
+
+
+def get_stats():
+    """Statistiques depuis le cache, relues au plus toutes les DASHBOARD_STATS_CACHE_TTL secondes"""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = compute_stats()
+        cache.set(STATS_CACHE_KEY, stats, settings.DASHBOARD_STATS_CACHE_TTL)
+    return stats
+
+
+def invalidate_stats():
+    """Forcer la relecture des statistiques à la prochaine consultation"""
+    cache.delete(STATS_CACHE_KEY)
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import DashboardStatsView, DashboardRecentActivityView
+from .views import DashboardStatsView, DashboardRecentActivityView, DashboardPerfView
 
 urlpatterns = [
     path('stats/', DashboardStatsView.as_view(), name='admin-stats'),
     path('activity/', DashboardRecentActivityView.as_view(), name='admin-activity'),
+    path('perf/', DashboardPerfView.as_view(), name='admin-perf'),
 ]
\ No newline at end of file
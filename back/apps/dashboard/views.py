@@ -1,10 +1,17 @@
-from rest_framework import views, response, permissions
+import hmac
+
+from rest_framework import views, response, permissions, status
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q
+from django.http import HttpResponse, JsonResponse
 from apps.access_request.models import AccessRequest
-from apps.datacatalog.models import Indicator, Category, DataModel
+from apps.datacatalog.models import Indicator
 from apps.etl.models import RawFileUpload
 
+from .profiling import perf_report
+from .prometheus import PROMETHEUS_AVAILABLE, exposition
+from .stats import get_stats
+
 User = get_user_model()
 
 class DashboardStatsView(views.APIView):
@@ -12,50 +19,8 @@ class DashboardStatsView(views.APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        """Récupérer les statistiques globales"""
-        stats = {
-            # Statistiques utilisateurs
-            'users': {
-                'total': User.objects.count(),
-                'admins': User.objects.filter(role=User.IS_ADMIN).count(),
-                'partners': User.objects.filter(role=User.IS_PARTNER).count(),
-                'public': User.objects.filter(role=User.IS_PUBLIC).count(),
-                'active': User.objects.filter(is_active_user=True).count(),
-            },
-            
-            # Statistiques demandes d accès
-            'access_requests': {
-                'total': AccessRequest.objects.count(),
-                'pending': AccessRequest.objects.filter(status=AccessRequest.STATUS_PENDING).count(),
-                'approved': AccessRequest.objects.filter(status=AccessRequest.STATUS_APPROVED).count(),
-                'rejected': AccessRequest.objects.filter(status=AccessRequest.STATUS_REJECTED).count(),
-            },
-            
-            # Statistiques indicateurs
-            'indicators': {
-                'total': Indicator.objects.count(),
-                'public': Indicator.objects.filter(visibility=Indicator.VISIBILITY_PUBLIC).count(),
-                'private': Indicator.objects.filter(visibility=Indicator.VISIBILITY_PRIVATE).count(),
-                'processed': Indicator.objects.filter(is_processed=True).count(),
-                'unprocessed': Indicator.objects.filter(is_processed=False).count(),
-            },
-            
-            # Statistiques ETL
-            'etl': {
-                'total_uploads': RawFileUpload.objects.count(),
-                'pending': RawFileUpload.objects.filter(status=RawFileUpload.STATUS_PENDING).count(),
-                'processing': RawFileUpload.objects.filter(status=RawFileUpload.STATUS_PROCESSING).count(),
-                'completed': RawFileUpload.objects.filter(status=RawFileUpload.STATUS_COMPLETED).count(),
-                'failed': RawFileUpload.objects.filter(status=RawFileUpload.STATUS_FAILED).count(),
-            },
-            
-            # Statistiques catalogue
-            'catalog': {
-                'categories': Category.objects.count(),
-                'data_models': DataModel.objects.count(),
-            }
-        }
-        return response.Response(stats)
+        """Récupérer les statistiques globales (mises en cache, voir stats.py)"""
+        return response.Response(get_stats())
 
 class DashboardRecentActivityView(views.APIView):
     """Vue pour les activités récentes"""
@@ -96,4 +61,48 @@ class DashboardRecentActivityView(views.APIView):
                 for ind in recent_indicators
             ]
         }
-        return response.Response(activity)
\ No newline at end of file
+        return response.Response(activity)
+
+class DashboardPerfView(views.APIView):
+    """Profils des requêtes par route (voir profiling.py)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """
+        Histogrammes de latence, temps moyens par composant et fonctions chaudes, par route.
+
+        Query params:
+        - window: fenêtre en secondes (défaut et maximum: PERF_PROFILING_WINDOW)
+        - route: filtre sur le nom de la route (ex: indicator-list)
+        """
+        try:
+            window = int(request.query_params.get('window', settings.PERF_PROFILING_WINDOW))
+        except ValueError:
+            return response.Response({'error': 'window doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+        return response.Response({
+            'enabled': settings.PERF_PROFILING_ENABLED,
+            'sample_rate': settings.PERF_PROFILING_SAMPLE_RATE,
+            'header': settings.PERF_PROFILING_HEADER,
+            **perf_report(max(window, 1), request.query_params.get('route', '')),
+        })
+
+
+def metrics_view(request):
+    """
+    Métriques au format d'exposition Prometheus (voir prometheus.py).
+
+    Vue Django simple : le collecteur n'a pas de JWT et demande un type de contenu
+    que la négociation DRF refuserait. L'en-tête Authorization: Bearer <METRICS_TOKEN>
+    est exigé ; sans jeton configuré, l'accès n'est ouvert qu'en DEBUG.
+    """
+    if not settings.METRICS_ENABLED or not PROMETHEUS_AVAILABLE:
+        return JsonResponse({'error': 'Métriques indisponibles (METRICS_ENABLED, prometheus_client)'}, status=503)
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            return JsonResponse({'error': 'METRICS_TOKEN requis hors DEBUG'}, status=403)
+    elif not hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        return JsonResponse({'error': 'Jeton de métriques invalide'}, status=401)
+    body, content_type = exposition()
+    return HttpResponse(body, content_type=content_type)
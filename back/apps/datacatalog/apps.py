@@ -5,3 +5,7 @@ class DatacatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
 
     name = 'apps.datacatalog'
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
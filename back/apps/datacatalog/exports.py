@@ -0,0 +1,426 @@
+"""
+Export en flux des données d'un indicateur (CSV, JSON lines, XLSX) et export
+groupé de plusieurs indicateurs en archive zip.
+
+Les lignes proviennent soit des DataPoint (itérateur sur la base), soit du
+fichier de données de l'indicateur lu par blocs : la mémoire utilisée ne
+dépend pas de la taille de l'export.
+"""
+import csv
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.text import slugify
+from openpyxl import Workbook
+
+from apps.etl.services.columnar import (
+    PREVIEW_ROWS, ensure_indicator_columnar, iter_columnar_batches, read_preview, read_schema
+)
+from apps.etl.services.readers import iter_file_chunks
+
+from .models import DataPoint
+from .timeseries import filter_datapoints
+from .zipstream import ZipStream
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+DATAPOINT_COLUMNS = ['period', 'period_label', 'region', 'variable', 'value', 'dimensions']
+DATAPOINT_TYPES = {
+    'period': 'date', 'period_label': 'string', 'region': 'string',
+    'variable': 'string', 'value': 'double', 'dimensions': 'json',
+}
+DATAPOINT_FILTERS = {'region': 'region', 'variable': 'variable', 'period_label': 'period_label'}
+ITERATOR_CHUNK_SIZE = 2000
+# Nombre de lignes écrites par morceau de réponse
+ROWS_PER_CHUNK = 1000
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def parse_filters(values):
+    """Filtres ``colonne:valeur`` (paramètre ``filter`` répétable)"""
+    filters = []
+    for value in values:
+        column, sep, expected = value.partition(':')
+        if not sep or not column:
+            raise ValueError(f'Filtre invalide: {value} (attendu colonne:valeur)')
+        filters.append((column, expected))
+    return filters
+
+
+def _select_columns(available, columns):
+    if not columns:
+        return list(available)
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Colonnes inconnues: {', '.join(unknown)}")
+    return columns
+
+
+def datapoint_rows(indicator, params, columns=None, filters=()):
+    """En-tête et itérateur des points de données d'un indicateur"""
+    columns = _select_columns(DATAPOINT_COLUMNS, columns)
+    queryset = filter_datapoints(DataPoint.objects.filter(indicator=indicator), params)
+    for column, expected in filters:
+        if column in DATAPOINT_FILTERS:
+            queryset = queryset.filter(**{DATAPOINT_FILTERS[column]: expected})
+        elif column.startswith('dimensions.') and '__' not in column:
+            queryset = queryset.filter(**{f"dimensions__{column[len('dimensions.'):]}": expected})
+        else:
+            raise ValueError(f'Filtre non supporté sur les points de données: {column}')
+
+    rows = queryset.order_by('period', 'id').values_list(*columns).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    return columns, rows
+
+
+def file_rows(indicator, columns=None, filters=()):
+    """
+    En-tête et itérateur des lignes du fichier de données d'un indicateur :
+    lues dans sa copie colonnaire (colonnes demandées seulement), sinon par
+    blocs dans le fichier d'origine.
+    """
+    columnar_path = ensure_indicator_columnar(indicator, settings.ETL_CHUNK_SIZE)
+    if columnar_path:
+        available = [field['name'] for field in read_schema(columnar_path)]
+        columns = _select_columns(available, columns)
+        # Les colonnes inconnues (filtres compris) sont signalées avant l'envoi de la réponse
+        batches = iter_columnar_batches(columnar_path, columns, filters)
+        first = next(batches, None)
+
+        def columnar_rows():
+            for batch in itertools.chain([first] if first is not None else [], batches):
+                yield from zip(*(column.to_pylist() for column in batch.columns))
+
+        return columns, columnar_rows()
+
+    chunks = iter(iter_file_chunks(indicator.data_file.path, indicator.file_format, settings.ETL_CHUNK_SIZE))
+    first = next(chunks, None)
+    if first is None:
+        return _select_columns([], columns), iter(())
+
+    available = [str(column) for column in first.columns]
+    columns = _select_columns(available, columns)
+    unknown = [column for column, _ in filters if column not in available]
+    if unknown:
+        raise ValueError(f"Colonnes inconnues: {', '.join(unknown)}")
+
+    def rows():
+        for chunk in itertools.chain([first], chunks):
+            chunk.columns = available
+            for column, expected in filters:
+                chunk = chunk[chunk[column].astype(str) == expected]
+            # Valeurs manquantes exportées comme cellules vides
+            chunk = chunk[columns].astype(object).where(chunk[columns].notna(), None)
+            yield from chunk.itertuples(index=False, name=None)
+
+    return columns, rows()
+
+
+def preview_data(indicator, columns=None, limit=PREVIEW_ROWS):
+    """
+    Aperçu des données d'un indicateur : colonnes typées, nombre de lignes et
+    premières lignes. Lit la copie colonnaire du fichier de données si elle
+    existe, sinon les points de données ; None s'il n'y a aucune donnée.
+    """
+    columnar_path = ensure_indicator_columnar(indicator, settings.ETL_CHUNK_SIZE)
+    if columnar_path:
+        return {'source': 'file', **read_preview(columnar_path, columns, limit)}
+
+    queryset = DataPoint.objects.filter(indicator=indicator)
+    if queryset.exists():
+        columns, rows = datapoint_rows(indicator, {}, columns)
+        return {
+            'source': 'datapoints',
+            'columns': [{'name': column, 'type': DATAPOINT_TYPES[column]} for column in columns],
+            'total_rows': queryset.count(),
+            'rows': [dict(zip(columns, row)) for row in itertools.islice(rows, limit)],
+        }
+
+    if indicator.data_file and os.path.exists(indicator.data_file.path):
+        # Sans pyarrow : premières lignes du fichier d'origine, types inconnus
+        columns, rows = file_rows(indicator, columns)
+        return {
+            'source': 'file',
+            'columns': [{'name': column, 'type': None} for column in columns],
+            'total_rows': None,
+            'rows': [dict(zip(columns, row)) for row in itertools.islice(rows, limit)],
+        }
+    return None
+
+
+def _cell(value):
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : retourne la ligne au lieu de l'écrire"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    writer = csv.writer(_Echo())
+    # BOM : ouverture correcte des accents dans Excel
+    yield ('\ufeff' + writer.writerow(columns)).encode('utf-8')
+    for batch in _batched(rows):
+        yield ''.join(writer.writerow([_cell(value) for value in row]) for row in batch).encode('utf-8')
+
+
+def stream_jsonl(columns, rows):
+    for batch in _batched(rows):
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n'
+            for row in batch
+        ).encode('utf-8')
+
+
+def stream_xlsx(columns, rows):
+    """
+    Le format XLSX (archive zip) ne peut pas être produit au fil de l'eau :
+    le classeur est écrit en mode write_only dans un fichier temporaire,
+    puis envoyé par morceaux et supprimé.
+    """
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Données')
+        sheet.append(columns)
+        for row in rows:
+            sheet.append([_cell(value) for value in row])
+        workbook.save(path)
+        yield from iter_file_bytes(path)
+    finally:
+        os.remove(path)
+
+
+def iter_file_bytes(path):
+    with open(path, 'rb') as source:
+        yield from _read_chunks(source)
+
+
+def _read_chunks(source):
+    while True:
+        data = source.read(FILE_CHUNK_SIZE)
+        if not data:
+            return
+        yield data
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'jsonl': stream_jsonl,
+    'xlsx': stream_xlsx,
+}
+
+
+def _batched(rows):
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, ROWS_PER_CHUNK))
+        if not batch:
+            return
+        yield batch
+
+
+def accepts_gzip(accept_encoding):
+    """Le client accepte-t-il gzip ? En-tête Accept-Encoding lu par jeton, ``q=0`` valant refus"""
+    qualities = {}
+    for token in accept_encoding.split(','):
+        coding, _, params = token.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def gzip_stream(chunks):
+    """Compresser un flux d'octets en gzip au fil de l'eau"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Export groupé (archive zip)
+
+def export_cache_dir():
+    # Hors de MEDIA_ROOT : les membres d'indicateurs privés ne doivent pas être servis sous /media/
+    return settings.CATALOG_EXPORT_CACHE_DIR or os.path.join(settings.PRIVATE_MEDIA_ROOT, 'exports_cache')
+
+
+def member_cache_key(indicator, source):
+    """
+    Clé du membre compressé d'un indicateur : change avec la version des
+    données (ingestion) ou avec le fichier (nom, taille, date de modification).
+    """
+    if source == 'file':
+        stat = os.stat(indicator.data_file.path)
+        fingerprint = f'{indicator.data_file.name}:{stat.st_size}:{stat.st_mtime_ns}'
+    else:
+        fingerprint = str(indicator.data_version)
+    digest = hashlib.sha1(f'{source}:{fingerprint}'.encode()).hexdigest()
+    return f'{indicator.pk}-{digest}'
+
+
+def _open_cached_member(key):
+    """Métadonnées et fichier ouvert d'un membre en cache, ou None"""
+    path = os.path.join(export_cache_dir(), key)
+    try:
+        with open(f'{path}.json') as meta_file:
+            meta = json.load(meta_file)
+        return meta, open(f'{path}.deflate', 'rb')
+    except (OSError, ValueError):
+        return None
+
+
+class _CacheSink:
+    """Copie des données compressées d'un membre vers le cache, abandonnée au-delà de max_bytes"""
+
+    def __init__(self, key, max_bytes):
+        self.key = key
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.directory = export_cache_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self.handle = tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False)
+
+    def write(self, data):
+        if self.handle is None:
+            return
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+        else:
+            self.handle.write(data)
+
+    def discard(self):
+        if self.handle is not None:
+            self.handle.close()
+            os.remove(self.handle.name)
+            self.handle = None
+
+    def commit(self, member):
+        if self.handle is None:
+            return
+        self.handle.close()
+        path = os.path.join(self.directory, self.key)
+        os.replace(self.handle.name, f'{path}.deflate')
+        meta = {'crc': member.crc, 'size': member.size, 'compressed_size': member.compressed_size}
+        with tempfile.NamedTemporaryFile('w', dir=self.directory, suffix='.tmp', delete=False) as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(meta_file.name, f'{path}.json')
+        self.handle = None
+
+        # Une seule version en cache par indicateur
+        indicator_prefix = f"{self.key.split('-')[0]}-"
+        for name in os.listdir(self.directory):
+            if name.startswith(indicator_prefix) and not name.startswith(self.key):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+def _member_name(indicator, source):
+    extension = '.csv' if source == 'datapoints' else os.path.splitext(indicator.data_file.name)[1] or '.csv'
+    return f"{indicator.pk}-{slugify(indicator.title)[:50] or 'indicateur'}{extension}"
+
+
+def _write_member(archive, indicator, source, name):
+    updated_at = indicator.updated_at
+    date_time = timezone.localtime(updated_at) if timezone.is_aware(updated_at) else updated_at
+    max_bytes = settings.CATALOG_EXPORT_CACHE_MAX_BYTES
+    key = member_cache_key(indicator, source) if max_bytes > 0 else None
+
+    cached = _open_cached_member(key) if key else None
+    if cached:
+        meta, handle = cached
+        with handle:
+            return (yield from archive.write_compressed(
+                name, _read_chunks(handle), meta['crc'], meta['size'], meta['compressed_size'], date_time
+            ))
+
+    if source == 'datapoints':
+        chunks = stream_csv(*datapoint_rows(indicator, {}))
+    else:
+        chunks = iter_file_bytes(indicator.data_file.path)
+    sink = _CacheSink(key, max_bytes) if key else None
+    try:
+        member = yield from archive.write_stream(name, chunks, date_time, sink)
+    except BaseException:
+        # Client déconnecté ou erreur de lecture : pas de membre partiel en cache
+        if sink is not None:
+            sink.discard()
+        raise
+    if sink is not None:
+        sink.commit(member)
+    return member
+
+
+def bulk_export_stream(indicators):
+    """
+    Archive zip des données de plusieurs indicateurs, suivie d'un manifest.json.
+    Les membres inchangés depuis le dernier export sont relus déjà compressés.
+    """
+    indicators = list(indicators)
+    with_datapoints = set(
+        DataPoint.objects.filter(indicator__in=indicators)
+        .order_by().values_list('indicator_id', flat=True).distinct()
+    )
+    archive = ZipStream()
+    manifest = []
+    for indicator in indicators:
+        entry = {
+            'id': indicator.pk,
+            'title': indicator.title,
+            'category': indicator.category.name if indicator.category else None,
+            'data_model': indicator.data_model.name if indicator.data_model else None,
+            'visibility': indicator.visibility,
+            'data_version': indicator.data_version,
+            'updated_at': indicator.updated_at.isoformat(),
+            'file': None,
+        }
+        if indicator.pk in with_datapoints:
+            source = 'datapoints'
+        elif indicator.data_file and os.path.exists(indicator.data_file.path):
+            source = 'file'
+        else:
+            manifest.append(entry)
+            continue
+
+        name = _member_name(indicator, source)
+        member = yield from _write_member(archive, indicator, source, name)
+        entry.update(file=name, source=source, size=member.size, crc32=f'{member.crc:08x}')
+        manifest.append(entry)
+
+    exported_at = timezone.localtime()
+    content = json.dumps(
+        {'exported_at': exported_at.isoformat(), 'indicators': manifest}, ensure_ascii=False, indent=2
+    ).encode('utf-8')
+    yield from archive.write_stream('manifest.json', [content], exported_at)
+    yield from archive.finish()
@@ -0,0 +1,13 @@
+from rest_framework.filters import SearchFilter
+
+from .search import search_indicators
+
+
+class IndicatorSearchFilter(SearchFilter):
+    """?search= servi par l'index plein texte (search.py) au lieu de LIKE sur chaque champ"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_indicators(queryset, ' '.join(terms))
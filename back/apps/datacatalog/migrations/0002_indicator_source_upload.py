@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0001_initial'),
+        ('etl', '0002_rawfileupload_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indicator',
+            name='source_upload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='indicators', to='etl.rawfileupload'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0002_indicator_source_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='cleaning_steps',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
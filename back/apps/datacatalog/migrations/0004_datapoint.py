@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0003_category_cleaning_steps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variable', models.CharField(blank=True, max_length=100)),
+                ('period', models.DateField()),
+                ('period_label', models.CharField(blank=True, max_length=20)),
+                ('region', models.CharField(blank=True, max_length=100)),
+                ('dimensions', models.JSONField(blank=True, default=dict)),
+                ('value', models.FloatField()),
+                ('indicator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='datapoints', to='datacatalog.indicator')),
+            ],
+            options={
+                'ordering': ['period', 'id'],
+                'indexes': [models.Index(fields=['indicator', 'period', 'id'], name='datacatalog_indicat_a6c1c4_idx'), models.Index(fields=['indicator', 'region', 'period'], name='datacatalog_indicat_39f35a_idx'), models.Index(fields=['indicator', 'variable', 'period'], name='datacatalog_indicat_ed8cbb_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0004_datapoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indicator',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0005_indicator_data_version'),
+        ('etl', '0003_rawfileupload_attempts_rawfileupload_heartbeat_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='indicator',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='indicator',
+            name='datacatalog_visibil_69e99d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='indicator',
+            name='datacatalog_categor_e7512f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='indicator',
+            index=models.Index(fields=['-created_at', '-id'], name='indicator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='indicator',
+            index=models.Index(fields=['visibility', '-created_at', '-id'], name='indicator_visibility_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='indicator',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='indicator_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='indicator',
+            index=models.Index(fields=['data_model', '-created_at', '-id'], name='indicator_data_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='indicator',
+            index=models.Index(fields=['is_processed', '-created_at', '-id'], name='indicator_processed_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Copie figée de apps/datacatalog/search.py au moment de la migration : une
+# migration ne doit pas dépendre du code applicatif, qui peut évoluer
+SQLITE_TABLE = 'datacatalog_indicator_fts'
+POSTGRES_TABLE = 'datacatalog_indicator_search'
+STOP_WORDS = {
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'd', 'dans', 'de', 'des', 'du', 'en',
+    'et', 'l', 'la', 'le', 'les', 'leur', 'ou', 'par', 'pour', 'sa', 'se', 'ses',
+    'son', 'sur', 'un', 'une',
+}
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+BATCH_SIZE = 2000
+
+
+def stem(word):
+    if len(word) > 4 and word[-1] in 'sx':
+        word = word[:-1]
+    for suffix, replacement in (('ement', ''), ('ation', 'at'), ('trice', 'teur'), ('euse', 'eur')):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            word = word[:-len(suffix)] + replacement
+            break
+    if len(word) > 4 and word[-1] == 'e':
+        word = word[:-1]
+    if len(word) > 4 and word[-1] == word[-2] and word[-1] not in 'aeiouy':
+        word = word[:-1]
+    return word
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', (text or '').lower()).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(stem(token) for token in TOKEN_PATTERN.findall(text) if token not in STOP_WORDS)
+
+
+def index_rows(cursor, backend, rows):
+    if backend == 'sqlite':
+        cursor.executemany(f"INSERT INTO {SQLITE_TABLE} (rowid, title, description) VALUES (%s, %s, %s)", rows)
+    else:
+        cursor.executemany(
+            f"INSERT INTO {POSTGRES_TABLE} (indicator_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+            f"ON CONFLICT (indicator_id) DO UPDATE SET document = EXCLUDED.document",
+            rows
+        )
+
+
+def create_search_index(apps, schema_editor):
+    backend = schema_editor.connection.vendor
+    if backend == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} "
+            f"USING fts5(title, description, tokenize='unicode61')"
+        )
+    elif backend == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+            f"indicator_id bigint PRIMARY KEY REFERENCES datacatalog_indicator(id) "
+            f"ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            f"document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_gin ON {POSTGRES_TABLE} USING GIN (document)"
+        )
+    else:
+        return
+
+    Indicator = apps.get_model('datacatalog', 'Indicator')
+    rows = []
+    with schema_editor.connection.cursor() as cursor:
+        for pk, title, description in Indicator.objects.values_list('id', 'title', 'description').iterator(
+            chunk_size=BATCH_SIZE
+        ):
+            rows.append((pk, normalize(title), normalize(description)))
+            if len(rows) == BATCH_SIZE:
+                index_rows(cursor, backend, rows)
+                rows = []
+        if rows:
+            index_rows(cursor, backend, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    backend = schema_editor.connection.vendor
+    if backend == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+    elif backend == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {POSTGRES_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0006_indicator_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
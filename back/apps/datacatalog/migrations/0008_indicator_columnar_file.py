@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0007_indicator_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indicator',
+            name='columnar_file',
+            field=models.FileField(blank=True, upload_to='indicators/columnar/'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:29
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalize_key(value):
+    # Copie figée de apps.datacatalog.models.normalize_key
+    text = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', text).strip().lower()[:255]
+
+
+def fill_natural_keys(apps, schema_editor):
+    """Clé naturelle des indicateurs existants : titre normalisé"""
+    Indicator = apps.get_model('datacatalog', 'Indicator')
+    batch = []
+    for indicator in Indicator.objects.only('id', 'title').iterator(chunk_size=2000):
+        indicator.natural_key = normalize_key(indicator.title)
+        batch.append(indicator)
+        if len(batch) == 2000:
+            Indicator.objects.bulk_update(batch, ['natural_key'])
+            batch = []
+    Indicator.objects.bulk_update(batch, ['natural_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0008_indicator_columnar_file'),
+        ('etl', '0007_rawfileupload_ingest_mode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indicator',
+            name='natural_key',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='indicator',
+            name='row_hash',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='indicator',
+            index=models.Index(fields=['category', 'natural_key'], name='indicator_natural_key_idx'),
+        ),
+        migrations.RunPython(fill_natural_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_last_upload(apps, schema_editor):
+    """Indicateurs existants : source_upload était jusqu'ici le dernier upload ayant écrit la ligne"""
+    Indicator = apps.get_model('datacatalog', 'Indicator')
+    Indicator.objects.filter(source_upload__isnull=False).update(last_upload=F('source_upload'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0009_indicator_natural_key'),
+        ('etl', '0011_uploadbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indicator',
+            name='last_upload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='updated_indicators', to='etl.rawfileupload'),
+        ),
+        migrations.RunPython(fill_last_upload, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,22 @@
+import re
+import unicodedata
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+
+def normalize_key(value):
+    """Clé naturelle : minuscules, sans accents ni espaces superflus"""
+    text = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', text).strip().lower()[:255]
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    # Étapes de nettoyage ETL propres à la catégorie (voir apps/etl/services/cleaning.py)
+    cleaning_steps = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -47,28 +58,73 @@ class Indicator(models.Model):
     # Fichier CSV ou Excel associé
     data_file = models.FileField(upload_to='indicators/')
     file_format = models.CharField(max_length=10, choices=[('CSV', 'CSV'), ('EXCEL', 'Excel')], default='CSV')
+    # Copie colonnaire (Arrow) du fichier de données, lue par les exports et l'aperçu
+    columnar_file = models.FileField(upload_to='indicators/columnar/', blank=True)
     
     # Métadonnées
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploaded_indicators')
+    source_upload = models.ForeignKey('etl.RawFileUpload', on_delete=models.SET_NULL, null=True, blank=True, related_name='indicators')
+    # Dernier upload ayant écrit l'indicateur (création ou mise à jour upsert) ;
+    # source_upload reste l'upload qui l'a créé, seul à pouvoir le supprimer en cas de reprise
+    last_upload = models.ForeignKey('etl.RawFileUpload', on_delete=models.SET_NULL, null=True, blank=True, related_name='updated_indicators')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     # Statut de traitement
     is_processed = models.BooleanField(default=False)
     processing_notes = models.TextField(blank=True)
+    # Incrémenté à chaque (ré)ingestion des points : invalide les agrégats en cache
+    data_version = models.PositiveIntegerField(default=0)
+    # Ré-ingestion en mode upsert : clé naturelle (titre normalisé par défaut, unique
+    # par catégorie) et empreinte de la ligne source pour ne réécrire que les lignes modifiées
+    natural_key = models.CharField(max_length=255, blank=True)
+    row_hash = models.CharField(max_length=16, blank=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        # Index composites alignés sur l'ordre de IndicatorCursorPagination
         indexes = [
-            models.Index(fields=['visibility']),
-            models.Index(fields=['category']),
+            models.Index(fields=['-created_at', '-id'], name='indicator_created_idx'),
+            models.Index(fields=['visibility', '-created_at', '-id'], name='indicator_visibility_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='indicator_category_idx'),
+            models.Index(fields=['data_model', '-created_at', '-id'], name='indicator_data_model_idx'),
+            models.Index(fields=['is_processed', '-created_at', '-id'], name='indicator_processed_idx'),
+            models.Index(fields=['category', 'natural_key'], name='indicator_natural_key_idx'),
         ]
 
     def __str__(self):
         return f"{self.title} ({self.get_visibility_display()})"
     
+    def save(self, *args, **kwargs):
+        if not self.natural_key:
+            self.natural_key = normalize_key(self.title)
+        super().save(*args, **kwargs)
+    
     def is_public(self):
         return self.visibility == self.VISIBILITY_PUBLIC
     
     def is_private(self):
-        return self.visibility == self.VISIBILITY_PRIVATE
\ No newline at end of file
+        return self.visibility == self.VISIBILITY_PRIVATE
+
+
+class DataPoint(models.Model):
+    """Valeur numérique d'un indicateur pour une période et des dimensions (série temporelle)"""
+    indicator = models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name='datapoints')
+    # Colonne source de la valeur (vide pour les colonnes-périodes : 2019, 2020...)
+    variable = models.CharField(max_length=100, blank=True)
+    period = models.DateField()
+    period_label = models.CharField(max_length=20, blank=True)
+    region = models.CharField(max_length=100, blank=True)
+    dimensions = models.JSONField(default=dict, blank=True)
+    value = models.FloatField()
+
+    class Meta:
+        ordering = ['period', 'id']
+        indexes = [
+            models.Index(fields=['indicator', 'period', 'id']),
+            models.Index(fields=['indicator', 'region', 'period']),
+            models.Index(fields=['indicator', 'variable', 'period']),
+        ]
+
+    def __str__(self):
+        return f"{self.indicator_id} {self.period_label or self.period}: {self.value}"
@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IndicatorCursorPagination(CursorPagination):
+    """
+    Pagination par curseur sur (created_at, id) pour les listes d'indicateurs.
+    Chaque page est une requête indexée (voir Indicator.Meta.indexes), quelle que
+    soit sa profondeur, et aucun COUNT(*) n'est exécuté.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
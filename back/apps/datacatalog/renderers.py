@@ -0,0 +1,35 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Renderer des réponses en flux : la vue renvoie directement une
+    StreamingHttpResponse, ce renderer permet seulement à DRF d'accepter
+    ?format=csv|jsonl|xlsx|sse. Les erreurs ({'error': ...}) restent en JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, str)):
+            return data
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class JSONLinesRenderer(PassthroughRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'jsonl'
+
+
+class XLSXRenderer(PassthroughRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+
+
+class EventStreamRenderer(PassthroughRenderer):
+    media_type = 'text/event-stream'
+    format = 'sse'
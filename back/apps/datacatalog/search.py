@@ -0,0 +1,181 @@
+"""
+Recherche plein texte des indicateurs.
+
+Le titre et la description sont normalisés en Python (minuscules, sans accents,
+mots vides retirés, racinisation légère du français) puis indexés dans :
+- SQLite : une table virtuelle FTS5 (classement bm25) ;
+- PostgreSQL : une table tsvector avec index GIN (classement ts_rank_cd).
+Les autres moteurs se replient sur des LIKE (icontains).
+
+L'index est tenu à jour par les signaux (signals.py) et par l'ETL après
+chaque insertion en masse (``index_indicators``).
+"""
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+SQLITE_TABLE = 'datacatalog_indicator_fts'
+POSTGRES_TABLE = 'datacatalog_indicator_search'
+# Poids du titre par rapport à la description dans le classement
+TITLE_WEIGHT = 10.0
+
+STOP_WORDS = {
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'd', 'dans', 'de', 'des', 'du', 'en',
+    'et', 'l', 'la', 'le', 'les', 'leur', 'ou', 'par', 'pour', 'sa', 'se', 'ses',
+    'son', 'sur', 'un', 'une',
+}
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def _strip_accents(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+def stem(word):
+    """Racinisation légère du français : pluriel, féminin et suffixes fréquents"""
+    if len(word) > 4 and word[-1] in 'sx':
+        word = word[:-1]
+    for suffix, replacement in (('ement', ''), ('ation', 'at'), ('trice', 'teur'), ('euse', 'eur')):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            word = word[:-len(suffix)] + replacement
+            break
+    if len(word) > 4 and word[-1] == 'e':
+        word = word[:-1]
+    if len(word) > 4 and word[-1] == word[-2] and word[-1] not in 'aeiouy':
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Termes indexés d'un texte (également appliqué aux requêtes)"""
+    text = _strip_accents((text or '').lower())
+    return [stem(token) for token in TOKEN_PATTERN.findall(text) if token not in STOP_WORDS]
+
+
+def normalize(text):
+    return ' '.join(tokenize(text))
+
+
+def search_backend(using=None):
+    """Moteur d'index disponible : 'sqlite', 'postgresql' ou None (repli LIKE)"""
+    vendor = (using or connection).vendor
+    return vendor if vendor in ('sqlite', 'postgresql') else None
+
+
+# Création de l'index (appelée par la migration)
+
+def create_index(schema_editor):
+    backend = search_backend(schema_editor.connection)
+    if backend == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} "
+            f"USING fts5(title, description, tokenize='unicode61')"
+        )
+    elif backend == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ("
+            f"indicator_id bigint PRIMARY KEY REFERENCES datacatalog_indicator(id) "
+            f"ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            f"document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_gin ON {POSTGRES_TABLE} USING GIN (document)"
+        )
+
+
+def drop_index(schema_editor):
+    backend = search_backend(schema_editor.connection)
+    if backend == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+    elif backend == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {POSTGRES_TABLE}")
+
+
+# Synchronisation
+
+def index_indicators(indicators):
+    """Indexer (ou réindexer) des indicateurs enregistrés"""
+    rows = [
+        (indicator.pk, normalize(indicator.title), normalize(indicator.description))
+        for indicator in indicators if indicator.pk is not None
+    ]
+    backend = search_backend()
+    if not rows or backend is None:
+        return
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.executemany(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, title, description) VALUES (%s, %s, %s)", rows
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {POSTGRES_TABLE} (indicator_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')) "
+                f"ON CONFLICT (indicator_id) DO UPDATE SET document = EXCLUDED.document",
+                rows
+            )
+
+
+def unindex_indicators(indicator_ids):
+    """Retirer des indicateurs de l'index (PostgreSQL : suppression en cascade)"""
+    indicator_ids = [(pk,) for pk in indicator_ids if pk is not None]
+    if indicator_ids and search_backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = %s", indicator_ids)
+
+
+def rebuild_index(queryset):
+    """Réindexer tous les indicateurs d'un queryset (par lots, une transaction par lot)"""
+    batch = []
+    for indicator in queryset.only('id', 'title', 'description').iterator(chunk_size=2000):
+        batch.append(indicator)
+        if len(batch) == 2000:
+            with transaction.atomic():
+                index_indicators(batch)
+            batch = []
+    with transaction.atomic():
+        index_indicators(batch)
+
+
+# Recherche
+
+def search_indicators(queryset, query):
+    """
+    Filtrer un queryset d'indicateurs sur une requête plein texte, trié par pertinence.
+
+    Chaque terme doit être présent (ET), en préfixe : « morta » trouve « mortalité ».
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none()
+
+    backend = search_backend()
+    table = queryset.model._meta.db_table
+    if backend == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            select={'search_rank': f'bm25({SQLITE_TABLE}, {TITLE_WEIGHT}, 1.0)'},
+            tables=[SQLITE_TABLE],
+            where=[f'{SQLITE_TABLE} MATCH %s', f'{SQLITE_TABLE}.rowid = {table}.id'],
+            params=[match],
+        ).order_by('search_rank', '-created_at', '-id')
+    if backend == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.extra(
+            select={'search_rank': f"ts_rank_cd({POSTGRES_TABLE}.document, to_tsquery('simple', %s))"},
+            select_params=[tsquery],
+            tables=[POSTGRES_TABLE],
+            where=[
+                f"{POSTGRES_TABLE}.document @@ to_tsquery('simple', %s)",
+                f'{POSTGRES_TABLE}.indicator_id = {table}.id',
+            ],
+            params=[tsquery],
+        ).order_by('-search_rank', '-created_at', '-id')
+
+    condition = Q()
+    for word in query.split():
+        condition &= Q(title__icontains=word) | Q(description__icontains=word)
+    return queryset.filter(condition)
@@ -1,19 +1,37 @@
 from rest_framework import serializers
 from .models import Indicator, Category, DataModel
 from apps.accounts.serializers import UserSerializer
+from apps.etl.services.cleaning import CleaningPipeline
+
+def _validate_cleaning_steps(steps):
+    try:
+        CleaningPipeline(steps)
+    except ValueError as e:
+        raise serializers.ValidationError(str(e))
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'created_at']
+        fields = ['id', 'name', 'description', 'cleaning_steps', 'created_at']
         read_only_fields = ['id', 'created_at']
 
+    def validate_cleaning_steps(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError('Une liste d\'étapes est attendue.')
+        _validate_cleaning_steps(value)
+        return value
+
 class DataModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = DataModel
         fields = ['id', 'name', 'description', 'schema', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def validate_schema(self, value):
+        if isinstance(value, dict) and value.get('cleaning_steps'):
+            _validate_cleaning_steps(value['cleaning_steps'])
+        return value
+
 class IndicatorSerializer(serializers.ModelSerializer):
     is_locked = serializers.SerializerMethodField()
     visibility_display = serializers.CharField(source='get_visibility_display', read_only=True)
@@ -0,0 +1,24 @@
+"""
+Synchronisation de l'index de recherche plein texte (search.py) avec les indicateurs.
+"""
+from django.db.models.signals import post_delete, post_save
+
+from .models import Indicator
+from .search import index_indicators, unindex_indicators
+
+INDEXED_FIELDS = {'title', 'description'}
+
+
+def index_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not INDEXED_FIELDS & set(update_fields)):
+        return
+    index_indicators([instance])
+
+
+def unindex_on_delete(sender, instance, **kwargs):
+    unindex_indicators([instance.pk])
+
+
+def connect_signals():
+    post_save.connect(index_on_save, sender=Indicator, dispatch_uid='indicator_search_index_save')
+    post_delete.connect(unindex_on_delete, sender=Indicator, dispatch_uid='indicator_search_index_delete')
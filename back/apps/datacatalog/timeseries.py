@@ -0,0 +1,166 @@
+"""
+Lecture des séries temporelles (DataPoint) : filtres, curseur de pagination,
+sous-échantillonnage et agrégations.
+"""
+import base64
+import hashlib
+import json
+import math
+from datetime import date
+
+import pandas as pd
+from django.db.models import Avg, Count, F, Max, Min, Sum, Window
+from django.db.models.fields.json import KT
+from django.db.models.functions import Mod, RowNumber, TruncMonth, TruncQuarter, TruncYear
+
+from apps.etl.services.datapoints import parse_period
+
+DATAPOINTS_PAGE_SIZE = 1000
+DATAPOINTS_MAX_PAGE_SIZE = 10000
+
+AGGREGATE_METRICS = {
+    'sum': Sum,
+    'avg': Avg,
+    'min': Min,
+    'max': Max,
+    'count': Count,
+}
+METRIC_ALIASES = {'mean': 'avg'}
+TIME_BUCKETS = {
+    'year': TruncYear,
+    'quarter': TruncQuarter,
+    'month': TruncMonth,
+}
+DIMENSION_PREFIX = 'dimensions.'
+
+
+def filter_datapoints(queryset, params):
+    """
+    Appliquer les filtres communs (period_start, period_end, region, variable).
+    Lève ValueError si une période est invalide.
+    """
+    for param, lookup in (('period_start', 'period__gte'), ('period_end', 'period__lte')):
+        if params.get(param):
+            period = parse_period(params[param])
+            if not period:
+                raise ValueError(f'Période invalide pour {param}: {params[param]}')
+            queryset = queryset.filter(**{lookup: period[0]})
+    if params.get('region'):
+        queryset = queryset.filter(region=params['region'])
+    if params.get('variable') is not None:
+        queryset = queryset.filter(variable=params['variable'])
+    return queryset
+
+
+def encode_datapoint_cursor(period, last_id):
+    """Curseur opaque de la forme (période, id) du dernier point renvoyé"""
+    raw = f'{period.isoformat()}|{last_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_datapoint_cursor(cursor):
+    """Décoder un curseur ; lève ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        period, last_id = raw.split('|')
+        return date.fromisoformat(period), int(last_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('curseur invalide')
+
+
+def downsample_datapoints(queryset, max_points):
+    """
+    Réduire la série à au plus ``max_points`` points régulièrement espacés.
+
+    Le pas est appliqué en base (ROW_NUMBER() sur l'ordre période, id) :
+    seuls les points retenus sont transférés.
+    """
+    queryset = queryset.order_by('period', 'id')
+    total = queryset.count()
+    if total <= max_points:
+        return queryset
+
+    stride = math.ceil(total / max_points)
+    return queryset.annotate(
+        row_number=Window(RowNumber(), order_by=[F('period').asc(), F('id').asc()])
+    ).annotate(
+        offset=Mod(F('row_number') - 1, stride)
+    ).filter(offset=0)
+
+
+def _group_expressions(group_by):
+    """
+    Colonnes de regroupement : region, variable ou dimensions.<clé>.
+    Retourne les clés de ``values()`` et les annotations nécessaires.
+    """
+    keys, expressions = [], {}
+    for position, key in enumerate(group_by):
+        if key in ('region', 'variable'):
+            keys.append(key)
+        elif key.startswith(DIMENSION_PREFIX) and key[len(DIMENSION_PREFIX):] and '__' not in key:
+            keys.append(f'dimension_{position}')
+            expressions[keys[-1]] = KT(f'dimensions__{key[len(DIMENSION_PREFIX):]}')
+        else:
+            raise ValueError(f'Regroupement non supporté: {key}')
+    return keys, expressions
+
+
+def aggregate_datapoints(queryset, group_by=(), bucket=None, metrics=None, percentiles=()):
+    """
+    Agréger les points par dimensions et par période (année, trimestre, mois).
+
+    sum, avg, min, max et count sont calculés par la base (GROUP BY) ;
+    les percentiles, non portables en SQL, sont calculés avec pandas sur les
+    seules colonnes de regroupement et valeurs.
+    """
+    metrics = [METRIC_ALIASES.get(metric, metric) for metric in (metrics or AGGREGATE_METRICS)]
+    unknown = [metric for metric in metrics if metric not in AGGREGATE_METRICS]
+    if unknown:
+        raise ValueError(f"Métriques non supportées: {', '.join(unknown)}")
+    if bucket and bucket not in TIME_BUCKETS:
+        raise ValueError(f'Période de regroupement non supportée: {bucket}')
+    if any(not 0 <= q <= 100 for q in percentiles):
+        raise ValueError('Les percentiles doivent être compris entre 0 et 100')
+
+    keys, expressions = _group_expressions(group_by)
+    if bucket:
+        keys.append('period_bucket')
+        expressions['period_bucket'] = TIME_BUCKETS[bucket]('period')
+    names = dict(zip(keys, [*group_by, 'period'] if bucket else group_by))
+
+    queryset = queryset.order_by().annotate(**expressions)
+    aggregates = {metric: AGGREGATE_METRICS[metric]('value') for metric in metrics}
+    if keys:
+        rows = list(queryset.values(*keys).annotate(**aggregates).order_by(*keys))
+    else:
+        rows = [queryset.aggregate(**aggregates)]
+
+    if percentiles:
+        frame = pd.DataFrame.from_records(
+            queryset.values_list(*keys, 'value'), columns=[*keys, 'value']
+        )
+        quantiles = [q / 100 for q in percentiles]
+        # Clé absente (dimension manquante) : '' des deux côtés pour la correspondance
+        frame[keys] = frame[keys].astype(object).where(frame[keys].notna(), '')
+        if keys:
+            computed = frame.groupby(keys, dropna=False)['value'].quantile(quantiles).unstack()
+            lookup = {
+                (index if isinstance(index, tuple) else (index,)): values
+                for index, values in computed.iterrows()
+            }
+        else:
+            lookup = {(): frame['value'].quantile(quantiles)}
+        for row in rows:
+            values = lookup.get(tuple('' if row[key] is None else row[key] for key in keys))
+            for q, quantile in zip(percentiles, quantiles):
+                value = None if values is None else values[quantile]
+                row[f'p{q:g}'] = None if value is None or pd.isna(value) else float(value)
+
+    return [{names.get(key, key): value for key, value in row.items()} for row in rows]
+
+
+def aggregate_cache_key(indicator, params):
+    """Clé de cache : signature de la requête + version des données de l'indicateur"""
+    signature = json.dumps(sorted(params.lists()), ensure_ascii=False)
+    digest = hashlib.sha1(signature.encode()).hexdigest()
+    return f'indicator_aggregate:{indicator.pk}:{indicator.data_version}:{digest}'
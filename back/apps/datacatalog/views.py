@@ -1,20 +1,39 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
 import logging
-import csv
-from django.http import HttpResponse
-
-from .models import Indicator, Category, DataModel
+import os
+from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+
+from apps.dashboard.prometheus import metered_cache_page
+from .models import Indicator, Category, DataModel, DataPoint
+from .exports import (
+    EXPORT_FORMATS, STREAMERS, accepts_gzip, bulk_export_stream, datapoint_rows, file_rows, gzip_stream, parse_filters,
+    preview_data
+)
+from .filters import IndicatorSearchFilter
+from .pagination import IndicatorCursorPagination
+from .renderers import CSVRenderer, JSONLinesRenderer, XLSXRenderer
+from .search import search_indicators
+from .timeseries import (
+    DATAPOINTS_MAX_PAGE_SIZE, DATAPOINTS_PAGE_SIZE, aggregate_cache_key, aggregate_datapoints,
+    decode_datapoint_cursor, downsample_datapoints, encode_datapoint_cursor, filter_datapoints
+)
 from .serializers import (
     IndicatorSerializer, CategorySerializer, DataModelSerializer,
     IndicatorCreateSerializer, IndicatorDetailSerializer
 )
 from apps.accounts.permissions import IsAdmin, IsAdminOrReadOnly, CanAccessPrivateData
+from apps.etl.services.columnar import PREVIEW_MAX_ROWS, PREVIEW_ROWS
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -38,7 +57,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
 
-    @method_decorator(cache_page(60 * 15))  # Cache 15 minutes
+    @method_decorator(metered_cache_page(60 * 15, 'category-list'))  # Cache 15 minutes
     def list(self, request, *args, **kwargs):
         """Liste des catégories avec cache"""
         logger.info(f"User {request.user} requested categories list")
@@ -63,7 +82,7 @@ class DataModelViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
 
-    @method_decorator(cache_page(60 * 15))  # Cache 15 minutes
+    @method_decorator(metered_cache_page(60 * 15, 'data-model-list'))  # Cache 15 minutes
     def list(self, request, *args, **kwargs):
         """Liste des modèles avec cache"""
         logger.info(f"User {request.user} requested data models list")
@@ -84,14 +103,20 @@ class IndicatorViewSet(viewsets.ModelViewSet):
 
     Actions personnalisées:
     - GET /api/catalog/indicators/public/           - Liste indicateurs publics (tous)
+    - GET /api/catalog/indicators/search/?q=        - Recherche plein texte (tous)
     - GET /api/catalog/indicators/private/          - Liste indicateurs privés (Admin)
     - GET /api/catalog/indicators/unprocessed/      - Liste indicateurs non traités (Admin)
     - GET /api/catalog/indicators/by_category/      - Filtrer par catégorie (Admin)
     - GET /api/catalog/indicators/by_data_model/    - Filtrer par modèle (Admin)
     - GET /api/catalog/indicators/{id}/export/      - Exporter données (CSV/JSON)
     - GET /api/catalog/indicators/{id}/datapoints/  - Récupérer points de données
+    - GET /api/catalog/indicators/{id}/aggregate/   - Agréger les points de données
+
+    Les actions de liste (public, private, unprocessed, by_category, by_data_model)
+    sont paginées par curseur : ?cursor=...&page_size=... (voir pagination.py).
     """
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [IndicatorSearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'title']
     filterset_fields = ['category', 'visibility', 'is_processed']
@@ -108,7 +133,7 @@ class IndicatorViewSet(viewsets.ModelViewSet):
         """Permissions dynamiques selon l'action"""
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsAdmin()]
-        elif self.action == 'public':
+        elif self.action in ['public', 'search']:
             return [permissions.AllowAny()]
         elif self.action in ['private', 'by_category', 'by_data_model', 'unprocessed']:
             return [IsAdmin()]
@@ -126,7 +151,7 @@ class IndicatorViewSet(viewsets.ModelViewSet):
             'category',
             'data_model',
             'uploaded_by'
-        ).order_by('-created_at')
+        ).order_by('-created_at', '-id')
 
         # Si Admin : accès à tout
         if user.is_authenticated and (user.is_staff or user.role == User.IS_ADMIN):
@@ -142,6 +167,18 @@ class IndicatorViewSet(viewsets.ModelViewSet):
         logger.debug(f"Public user {user} accessing public indicators only")
         return queryset.filter(visibility='PUBLIC')
 
+    def _paginated_response(self, queryset):
+        """Page d'indicateurs paginée par curseur sur (created_at, id)"""
+        paginator = IndicatorCursorPagination()
+        try:
+            # Sans la vue : l'ordre reste celui de la pagination (et de ses index),
+            # ?ordering= n'est pas appliqué
+            page = paginator.paginate_queryset(queryset, self.request, view=None)
+        except NotFound:
+            return Response({'error': 'Curseur invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = IndicatorSerializer(page, many=True, context={'request': self.request})
+        return paginator.get_paginated_response(serializer.data)
+
     def perform_create(self, serializer):
         """Créer un nouvel indicateur et enregistrer l'utilisateur"""
         instance = serializer.save(uploaded_by=self.request.user)
@@ -158,15 +195,10 @@ class IndicatorViewSet(viewsets.ModelViewSet):
                 visibility='PUBLIC'
             ).select_related(
                 'category', 'data_model', 'uploaded_by'
-            ).order_by('-created_at')
-
-            serializer = IndicatorSerializer(
-                public_indicators,
-                many=True,
-                context={'request': request}
             )
-            logger.info(f"Public indicators list accessed (count: {public_indicators.count()})")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+
+            logger.info("Public indicators list accessed")
+            return self._paginated_response(public_indicators)
 
         except Exception as e:
             logger.error(f"Error fetching public indicators: {str(e)}")
@@ -175,6 +207,37 @@ class IndicatorViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def search(self, request):
+        """
+        Recherche plein texte dans les titres et descriptions, triée par pertinence.
+        Insensible aux accents et aux pluriels ; chaque mot doit être présent et est cherché en préfixe.
+
+        Query params:
+        - q: texte recherché (2 caractères minimum)
+        """
+        query = request.query_params.get('q', '').strip()
+        if len(query) < 2:
+            return Response(
+                {'error': 'Le paramètre q doit contenir au moins 2 caractères'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # get_queryset applique la visibilité selon le rôle
+            results = search_indicators(self.get_queryset(), query)
+            page = self.paginate_queryset(results)
+            serializer = IndicatorSerializer(page, many=True, context={'request': request})
+            logger.info(f"Indicator search '{query}' by {request.user}")
+            return self.get_paginated_response(serializer.data)
+
+        except Exception as e:
+            logger.error(f"Error searching indicators: {str(e)}")
+            return Response(
+                {'error': 'Erreur lors de la recherche'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     @action(detail=False, methods=['get'], permission_classes=[IsAdmin])
     def private(self, request):
         """
@@ -186,15 +249,10 @@ class IndicatorViewSet(viewsets.ModelViewSet):
                 visibility='PRIVATE'
             ).select_related(
                 'category', 'data_model', 'uploaded_by'
-            ).order_by('-created_at')
-
-            serializer = IndicatorSerializer(
-                private_indicators,
-                many=True,
-                context={'request': request}
             )
-            logger.info(f"Admin {request.user} accessed private indicators (count: {private_indicators.count()})")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+
+            logger.info(f"Admin {request.user} accessed private indicators")
+            return self._paginated_response(private_indicators)
 
         except Exception as e:
             logger.error(f"Error fetching private indicators: {str(e)}")
@@ -221,15 +279,10 @@ class IndicatorViewSet(viewsets.ModelViewSet):
                 category_id=category_id
             ).select_related(
                 'category', 'data_model', 'uploaded_by'
-            ).order_by('-created_at')
-
-            serializer = IndicatorSerializer(
-                indicators,
-                many=True,
-                context={'request': request}
             )
-            logger.info(f"Indicators filtered by category {category_id} (count: {indicators.count()})")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+
+            logger.info(f"Indicators filtered by category {category_id}")
+            return self._paginated_response(indicators)
 
         except Exception as e:
             logger.error(f"Error filtering by category: {str(e)}")
@@ -256,15 +309,10 @@ class IndicatorViewSet(viewsets.ModelViewSet):
                 data_model_id=data_model_id
             ).select_related(
                 'category', 'data_model', 'uploaded_by'
-            ).order_by('-created_at')
-
-            serializer = IndicatorSerializer(
-                indicators,
-                many=True,
-                context={'request': request}
             )
-            logger.info(f"Indicators filtered by data_model {data_model_id} (count: {indicators.count()})")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+
+            logger.info(f"Indicators filtered by data_model {data_model_id}")
+            return self._paginated_response(indicators)
 
         except Exception as e:
             logger.error(f"Error filtering by data model: {str(e)}")
@@ -284,15 +332,10 @@ class IndicatorViewSet(viewsets.ModelViewSet):
                 is_processed=False
             ).select_related(
                 'category', 'data_model', 'uploaded_by'
-            ).order_by('-created_at')
-
-            serializer = IndicatorSerializer(
-                unprocessed,
-                many=True,
-                context={'request': request}
             )
-            logger.info(f"Unprocessed indicators accessed (count: {unprocessed.count()})")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+
+            logger.info("Unprocessed indicators accessed")
+            return self._paginated_response(unprocessed)
 
         except Exception as e:
             logger.error(f"Error fetching unprocessed indicators: {str(e)}")
@@ -304,24 +347,76 @@ class IndicatorViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def datapoints(self, request, pk=None):
         """
-        Récupère les points de données d'un indicateur.
-        À implémenter avec le modèle DataPoint.
+        Récupère les points de données d'un indicateur, triés par période.
+
+        Query params:
+        - period_start / period_end: bornes incluses (AAAA, AAAA-MM ou AAAA-MM-JJ)
+        - region, variable: filtres exacts
+        - limit: taille de page (défaut 1000, max 10000)
+        - cursor: curseur de la page suivante (en-tête X-Next-Cursor)
+        - max_points: sous-échantillonnage régulier de toute la plage filtrée
         """
         try:
             indicator = self.get_object()
-            logger.info(f"Datapoints requested for indicator {indicator.id}")
-
-            # Pour l'instant, retourner des données vides
-            # À implémenter avec le modèle DataPoint
-            datapoints = []
-
-            return Response(datapoints, status=status.HTTP_200_OK)
+            params = request.query_params
+
+            try:
+                queryset = filter_datapoints(DataPoint.objects.filter(indicator=indicator), params)
+                limit = min(int(params.get('limit', DATAPOINTS_PAGE_SIZE)), DATAPOINTS_MAX_PAGE_SIZE)
+                max_points = int(params['max_points']) if params.get('max_points') else None
+                cursor = decode_datapoint_cursor(params['cursor']) if params.get('cursor') else None
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if limit < 1 or (max_points is not None and max_points < 1):
+                return Response(
+                    {'error': 'limit et max_points doivent être positifs'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            fields = ('id', 'period', 'period_label', 'region', 'variable', 'dimensions', 'value')
+            next_cursor = None
+            if max_points:
+                # Un point sur `stride` de la plage filtrée, sans pagination
+                queryset = downsample_datapoints(queryset, max_points)
+                rows = list(queryset.values(*fields))
+            else:
+                if cursor:
+                    period, last_id = cursor
+                    queryset = queryset.filter(Q(period__gt=period) | Q(period=period, id__gt=last_id))
+                rows = list(queryset.order_by('period', 'id').values(*fields)[:limit + 1])
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = encode_datapoint_cursor(rows[-1]['period'], rows[-1]['id'])
+
+            datapoints = [
+                {
+                    'period': row['period'],
+                    # Libellé utilisé comme abscisse par les graphiques du front
+                    'year': row['period_label'] or row['period'].isoformat(),
+                    'region': row['region'],
+                    'variable': row['variable'],
+                    'dimensions': row['dimensions'],
+                    'value': row['value'],
+                }
+                for row in rows
+            ]
+            logger.info(f"Datapoints requested for indicator {indicator.id} ({len(datapoints)} points)")
+
+            response = Response(datapoints, status=status.HTTP_200_OK)
+            if next_cursor:
+                next_params = params.copy()
+                next_params['cursor'] = next_cursor
+                response['X-Next-Cursor'] = next_cursor
+                response['Link'] = f'<{request.build_absolute_uri(request.path)}?{next_params.urlencode()}>; rel="next"'
+            return response
 
         except Indicator.DoesNotExist:
             return Response(
                 {'error': 'Indicateur non trouvé'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except Http404:
+            raise
         except Exception as e:
             logger.error(f"Error fetching datapoints: {str(e)}")
             return Response(
@@ -330,38 +425,116 @@ class IndicatorViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def aggregate(self, request, pk=None):
+        """
+        Agrège les points de données d'un indicateur côté serveur.
+
+        Query params:
+        - group_by: region, variable et/ou dimensions.<clé> (séparés par des virgules)
+        - bucket: year, quarter ou month
+        - metrics: sum, avg (mean), min, max, count (défaut: toutes)
+        - percentiles: ex. 50,90
+        - period_start, period_end, region, variable: mêmes filtres que datapoints
+        """
+        try:
+            indicator = self.get_object()
+            params = request.query_params
+
+            cache_key = aggregate_cache_key(indicator, params)
+            data = cache.get(cache_key)
+            if data is None:
+                try:
+                    group_by = [key.strip() for key in params.get('group_by', '').split(',') if key.strip()]
+                    metrics = [metric.strip() for metric in params.get('metrics', '').split(',') if metric.strip()]
+                    percentiles = [float(q) for q in params.get('percentiles', '').split(',') if q.strip()]
+                    results = aggregate_datapoints(
+                        filter_datapoints(DataPoint.objects.filter(indicator=indicator), params),
+                        group_by=group_by,
+                        bucket=params.get('bucket') or None,
+                        metrics=metrics,
+                        percentiles=percentiles
+                    )
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+                data = {
+                    'indicator': indicator.id,
+                    'group_by': group_by,
+                    'bucket': params.get('bucket') or None,
+                    'results': results,
+                }
+                cache.set(cache_key, data, settings.CATALOG_AGGREGATE_CACHE_TTL)
+                logger.info(f"Aggregate computed for indicator {indicator.id} ({len(results)} groupes)")
+
+            return Response(data, status=status.HTTP_200_OK)
+
+        except Http404:
+            raise
+        except Exception as e:
+            logger.error(f"Error aggregating datapoints: {str(e)}")
+            return Response(
+                {'error': 'Erreur lors de l\'agrégation des données'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def preview(self, request, pk=None):
+        """
+        Aperçu des données d'un indicateur (colonnes typées et premières lignes).
+
+        Query params:
+        - columns: colonnes à afficher, séparées par des virgules
+        - limit: nombre de lignes (défaut 50, max 1000)
+        """
+        try:
+            indicator = self.get_object()
+            params = request.query_params
+            columns = [column.strip() for column in params.get('columns', '').split(',') if column.strip()]
+            try:
+                limit = max(1, min(int(params.get('limit', PREVIEW_ROWS)), PREVIEW_MAX_ROWS))
+                data = preview_data(indicator, columns or None, limit)
+            except (ValueError, FileNotFoundError) as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            
+            if data is None:
+                return Response(
+                    {'error': 'Aucune donnée à afficher pour cet indicateur'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return Response(data, status=status.HTTP_200_OK)
+
+        except Http404:
+            raise
+        except Exception as e:
+            logger.error(f"Error previewing indicator: {str(e)}")
+            return Response(
+                {'error': 'Erreur lors de l\'aperçu des données'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(
+        detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=[JSONRenderer, BrowsableAPIRenderer, CSVRenderer, JSONLinesRenderer, XLSXRenderer]
+    )
     def export(self, request, pk=None):
         """
-        Exporte les données d'un indicateur en CSV ou JSON.
+        Exporte les données d'un indicateur en flux (mémoire constante).
 
         Query params:
-        - format: 'csv' ou 'json' (défaut: json)
+        - format: 'csv', 'jsonl', 'xlsx', ou 'json' (métadonnées seules, défaut)
+        - source: 'datapoints' ou 'file' (défaut: points de données s'il y en a, sinon fichier)
+        - columns: colonnes à exporter, séparées par des virgules
+        - filter: filtre colonne:valeur (répétable)
+        - period_start / period_end: bornes de période (points de données)
+
+        Les exports CSV et JSON lines sont compressés en gzip si le client l'accepte.
         """
         try:
             indicator = self.get_object()
-            format_type = request.query_params.get('format', 'json').lower()
-
-            if format_type == 'csv':
-                # Export CSV
-                response = HttpResponse(content_type='text/csv; charset=utf-8')
-                response['Content-Disposition'] = f'attachment; filename="indicator_{indicator.id}_{indicator.title[:30]}.csv"'
-
-                writer = csv.writer(response)
-                writer.writerow(['ID', 'Titre', 'Description', 'Catégorie', 'Visibilité', 'Traité'])
-                writer.writerow([
-                    indicator.id,
-                    indicator.title,
-                    indicator.description,
-                    indicator.category.name if indicator.category else 'N/A',
-                    indicator.get_visibility_display(),
-                    'Oui' if indicator.is_processed else 'Non'
-                ])
-
-                logger.info(f"Indicator {indicator.id} exported as CSV by {request.user}")
-                return response
+            params = request.query_params
+            format_type = params.get('format', 'json').lower()
 
-            else:
-                # Export JSON
+            if format_type not in EXPORT_FORMATS:
                 data = {
                     'id': indicator.id,
                     'title': indicator.title,
@@ -377,13 +550,97 @@ class IndicatorViewSet(viewsets.ModelViewSet):
                 logger.info(f"Indicator {indicator.id} exported as JSON by {request.user}")
                 return Response(data, status=status.HTTP_200_OK)
 
-        except Indicator.DoesNotExist:
+            source = params.get('source')
+            if source is None:
+                has_file = bool(indicator.data_file) and os.path.exists(indicator.data_file.path)
+                if DataPoint.objects.filter(indicator=indicator).exists():
+                    source = 'datapoints'
+                elif has_file:
+                    source = 'file'
+            if source not in ('datapoints', 'file'):
+                return Response(
+                    {'error': 'Aucune donnée à exporter pour cet indicateur'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            try:
+                columns = [column.strip() for column in params.get('columns', '').split(',') if column.strip()]
+                filters = parse_filters(params.getlist('filter'))
+                if source == 'datapoints':
+                    columns, rows = datapoint_rows(indicator, params, columns, filters)
+                else:
+                    columns, rows = file_rows(indicator, columns, filters)
+            except (ValueError, FileNotFoundError) as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            content = STREAMERS[format_type](columns, rows)
+            gzip = format_type != 'xlsx' and accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            if gzip:
+                content = gzip_stream(content)
+
+            response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[format_type])
+            response['Content-Disposition'] = f'attachment; filename="indicator_{indicator.id}.{format_type}"'
+            patch_vary_headers(response, ['Accept-Encoding'])
+            if gzip:
+                response['Content-Encoding'] = 'gzip'
+
+            logger.info(f"Indicator {indicator.id} exported as {format_type} ({source}) by {request.user}")
+            return response
+
+        except Http404:
+            raise
+        except Exception as e:
+            logger.error(f"Error exporting indicator: {str(e)}")
             return Response(
-                {'error': 'Indicateur non trouvé'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': 'Erreur lors de l\'export'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    @action(detail=False, methods=['get'], url_path='bulk-export', permission_classes=[permissions.IsAuthenticated])
+    def bulk_export(self, request):
+        """
+        Exporte les données de plusieurs indicateurs dans une archive zip produite en flux,
+        avec un manifest.json.
+
+        Query params:
+        - category, data_model: identifiants
+        - visibility: PUBLIC ou PRIVATE
+        - ids: identifiants d'indicateurs séparés par des virgules
+        """
+        try:
+            params = request.query_params
+            queryset = self.get_queryset()
+            try:
+                if params.get('category'):
+                    queryset = queryset.filter(category_id=int(params['category']))
+                if params.get('data_model'):
+                    queryset = queryset.filter(data_model_id=int(params['data_model']))
+                if params.get('ids'):
+                    queryset = queryset.filter(pk__in=[int(pk) for pk in params['ids'].split(',') if pk.strip()])
+            except ValueError:
+                return Response({'error': 'Identifiant invalide'}, status=status.HTTP_400_BAD_REQUEST)
+            if params.get('visibility'):
+                queryset = queryset.filter(visibility=params['visibility'].upper())
+
+            limit = settings.CATALOG_BULK_EXPORT_MAX_INDICATORS
+            indicators = list(queryset[:limit + 1])
+            if not indicators:
+                return Response({'error': 'Aucun indicateur à exporter'}, status=status.HTTP_404_NOT_FOUND)
+            if len(indicators) > limit:
+                return Response(
+                    {'error': f'Trop d\'indicateurs à exporter (maximum {limit}), affinez les filtres'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            response = StreamingHttpResponse(bulk_export_stream(indicators), content_type='application/zip')
+            filename = f"catalogue_{timezone.localdate().isoformat()}.zip"
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+            logger.info(f"Bulk export of {len(indicators)} indicators by {request.user}")
+            return response
+
         except Exception as e:
-            logger.error(f"Error exporting indicator: {str(e)}")
+            logger.error(f"Error exporting indicators: {str(e)}")
             return Response(
                 {'error': 'Erreur lors de l\'export'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
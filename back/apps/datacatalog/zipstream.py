@@ -0,0 +1,152 @@
+"""
+Archive zip produite au fil de l'eau, sans fichier temporaire ni tampon complet.
+
+Les membres compressés à la volée sont suivis d'un descripteur de données
+(CRC et tailles connus après le contenu) ; les membres déjà compressés
+(cache) sont écrits tels quels avec leur en-tête complet. Le format zip64
+est utilisé au-delà de 4 Go ou de 65535 membres.
+"""
+import struct
+import zlib
+from collections import namedtuple
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+ZIP_DEFLATED = 8
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+# Créé sous Unix : les permissions des attributs externes sont lues par unzip
+VERSION_MADE_BY = (3 << 8) | VERSION_ZIP64
+EXTERNAL_ATTR = 0o100644 << 16
+
+LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+DATA_DESCRIPTOR_ZIP64 = struct.Struct('<IIQQ')
+END_RECORD = struct.Struct('<IHHHHIIH')
+END_RECORD_ZIP64 = struct.Struct('<IQHHIIQQQQ')
+END_LOCATOR_ZIP64 = struct.Struct('<IIQI')
+
+ZipMember = namedtuple('ZipMember', 'name crc size compressed_size offset date time flags zip64')
+
+
+def dos_datetime(value):
+    """Date et heure au format MS-DOS (résolution de 2 secondes, à partir de 1980)"""
+    if value.year < 1980:
+        return (1 << 5) | 1, 0
+    date = (value.year - 1980) << 9 | value.month << 5 | value.day
+    time = value.hour << 11 | value.minute << 5 | value.second // 2
+    return date, time
+
+
+def _zip64_extra(*values):
+    return struct.pack(f'<HH{len(values)}Q', 0x0001, 8 * len(values), *values)
+
+
+class ZipStream:
+    """
+    Écriture séquentielle d'une archive : chaque méthode est un générateur
+    d'octets, à enchaîner avec ``yield from`` ; ``write_stream`` et
+    ``write_compressed`` retournent le ZipMember écrit.
+    """
+
+    def __init__(self, compresslevel=6):
+        self.compresslevel = compresslevel
+        self.members = []
+        self._offset = 0
+
+    def _emit(self, data):
+        self._offset += len(data)
+        return data
+
+    def write_stream(self, name, chunks, date_time, sink=None):
+        """
+        Compresser à la volée un itérable d'octets.
+
+        ``sink`` (optionnel) reçoit une copie des données compressées,
+        pour les mettre en cache.
+        """
+        encoded = name.encode('utf-8')
+        date, time = dos_datetime(date_time)
+        flags = FLAG_DATA_DESCRIPTOR | FLAG_UTF8
+        offset = self._offset
+        # Tailles inconnues à l'avance : en-tête zip64 avec tailles à zéro
+        yield self._emit(LOCAL_HEADER.pack(
+            0x04034b50, VERSION_ZIP64, flags, ZIP_DEFLATED, time, date, 0,
+            ZIP64_LIMIT, ZIP64_LIMIT, len(encoded), 20
+        ) + encoded + _zip64_extra(0, 0))
+
+        compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        crc = size = compressed_size = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                compressed_size += len(data)
+                if sink is not None:
+                    sink.write(data)
+                yield self._emit(data)
+        data = compressor.flush()
+        compressed_size += len(data)
+        if sink is not None:
+            sink.write(data)
+        yield self._emit(data)
+
+        yield self._emit(DATA_DESCRIPTOR_ZIP64.pack(0x08074b50, crc, compressed_size, size))
+        member = ZipMember(name, crc, size, compressed_size, offset, date, time, flags, True)
+        self.members.append(member)
+        return member
+
+    def write_compressed(self, name, chunks, crc, size, compressed_size, date_time):
+        """Écrire un membre déjà compressé en deflate brut (CRC et tailles connus)"""
+        encoded = name.encode('utf-8')
+        date, time = dos_datetime(date_time)
+        zip64 = size > ZIP64_LIMIT or compressed_size > ZIP64_LIMIT
+        offset = self._offset
+        if zip64:
+            extra = _zip64_extra(size, compressed_size)
+            header_sizes = (ZIP64_LIMIT, ZIP64_LIMIT)
+        else:
+            extra = b''
+            header_sizes = (compressed_size, size)
+        yield self._emit(LOCAL_HEADER.pack(
+            0x04034b50, VERSION_ZIP64 if zip64 else VERSION_DEFAULT, FLAG_UTF8, ZIP_DEFLATED,
+            time, date, crc, *header_sizes, len(encoded), len(extra)
+        ) + encoded + extra)
+        for chunk in chunks:
+            yield self._emit(chunk)
+        member = ZipMember(name, crc, size, compressed_size, offset, date, time, FLAG_UTF8, zip64)
+        self.members.append(member)
+        return member
+
+    def finish(self):
+        """Répertoire central et fin d'archive"""
+        start = self._offset
+        for member in self.members:
+            encoded = member.name.encode('utf-8')
+            overflow = [
+                value for value in (member.size, member.compressed_size, member.offset)
+                if value > ZIP64_LIMIT
+            ]
+            extra = _zip64_extra(*overflow) if overflow else b''
+            yield self._emit(CENTRAL_HEADER.pack(
+                0x02014b50, VERSION_MADE_BY, VERSION_ZIP64 if member.zip64 or overflow else VERSION_DEFAULT,
+                member.flags, ZIP_DEFLATED, member.time, member.date, member.crc,
+                min(member.compressed_size, ZIP64_LIMIT), min(member.size, ZIP64_LIMIT),
+                len(encoded), len(extra), 0, 0, 0, EXTERNAL_ATTR, min(member.offset, ZIP64_LIMIT)
+            ) + encoded + extra)
+
+        count = len(self.members)
+        directory_size = self._offset - start
+        if count > ZIP64_COUNT_LIMIT or directory_size > ZIP64_LIMIT or start > ZIP64_LIMIT:
+            end_offset = self._offset
+            yield self._emit(END_RECORD_ZIP64.pack(
+                0x06064b50, 44, VERSION_MADE_BY, VERSION_ZIP64, 0, 0, count, count, directory_size, start
+            ))
+            yield self._emit(END_LOCATOR_ZIP64.pack(0x07064b50, 0, end_offset, 1))
+        yield self._emit(END_RECORD.pack(
+            0x06054b50, 0, 0, min(count, ZIP64_COUNT_LIMIT), min(count, ZIP64_COUNT_LIMIT),
+            min(directory_size, ZIP64_LIMIT), min(start, ZIP64_LIMIT), 0
+        ))
@@ -0,0 +1,93 @@
+"""
+Téléchargement des fichiers générés, avec validateurs HTTP et requêtes partielles.
+
+- ETag (taille + date de modification) et Last-Modified : If-None-Match
+  renvoie 304 sans relire le fichier ;
+- Range (une seule plage, ``bytes=a-b``, ``bytes=a-``, ``bytes=-n``) : 206
+  avec Content-Range, 416 si la plage est hors du fichier ; If-Range permet
+  de reprendre un téléchargement uniquement si le fichier n'a pas changé.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    Plage (début, fin incluse) demandée par l'en-tête Range.
+    None : en-tête ignoré (absent, invalide ou plages multiples) ; False : plage non satisfiable.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffixe : les n derniers octets
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            return False
+    if start >= size:
+        return False
+    return start, end
+
+
+def _iter_range(path, start, length):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            data = source.read(min(CHUNK_SIZE, length))
+            if not data:
+                return
+            length -= len(data)
+            yield data
+
+
+def ranged_file_response(request, path, filename, content_type):
+    """Réponse de téléchargement d'un fichier local (200, 206, 304 ou 416)"""
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]):
+        return HttpResponseNotModified(headers=headers)
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range.strip() in (etag, headers['Last-Modified']):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+
+    if byte_range is False:
+        return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{stat.st_size}'})
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_range(path, start, end - start + 1), status=206, content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -0,0 +1,110 @@
+"""
+Worker ETL : traite les uploads en file d'attente dans un pool de processus.
+À lancer avec: python manage.py etl_worker --concurrency 4
+"""
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.etl.services import jobs
+
+
+class Command(BaseCommand):
+    help = "Traite les uploads ETL en file d'attente (sans broker externe)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.ETL_WORKER_CONCURRENCY,
+            help='Nombre de fichiers traités en parallèle'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.ETL_WORKER_POLL_INTERVAL,
+            help='Délai en secondes entre deux consultations de la file'
+        )
+        parser.add_argument(
+            '--stale-timeout', type=int, default=settings.ETL_JOB_STALE_TIMEOUT,
+            help='Délai en secondes après lequel un job sans signal est relancé'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Vider la file d\'attente puis quitter'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        self.poll_interval = options['poll_interval']
+        self.stale_timeout = options['stale_timeout']
+        self.once = options['once']
+
+        self.stdout.write(f"Worker ETL démarré (concurrence: {concurrency})")
+        while True:
+            # Les processus du pool initialisent Django et ouvrent leurs propres connexions
+            connections.close_all()
+            pool = ProcessPoolExecutor(
+                max_workers=concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+            try:
+                if self._run(pool, concurrency):
+                    break
+            except KeyboardInterrupt:
+                self.stdout.write("Arrêt demandé, remise en file des jobs en cours...")
+                pool.shutdown(wait=True, cancel_futures=True)
+                jobs.requeue(self._interrupted(), 'Worker arrêté')
+                break
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS("Worker ETL arrêté"))
+
+    def _run(self, pool, concurrency):
+        """Boucle principale ; retourne True quand le worker doit s'arrêter"""
+        self.running = {}
+        while True:
+            jobs.recover_stale_jobs(self.stale_timeout)
+
+            for upload_id in jobs.claim_jobs(concurrency - len(self.running)):
+                self.running[pool.submit(jobs.run_job, upload_id)] = upload_id
+                self.stdout.write(f"Job {upload_id} démarré")
+
+            if not self.running:
+                if self.once:
+                    return True
+                time.sleep(self.poll_interval)
+                continue
+
+            done, _ = wait(self.running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                upload_id = self.running.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    # Un processus du pool a été tué : les jobs en cours sont relancés
+                    jobs.requeue([upload_id, *self._interrupted()], 'Processus du worker interrompu')
+                    self.stderr.write(f"Pool de processus interrompu pendant le job {upload_id}")
+                    return False
+                except Exception as e:
+                    jobs.requeue([upload_id], f'Erreur du worker: {str(e)}')
+                    self.stderr.write(f"Job {upload_id} en erreur: {str(e)}")
+                    continue
+
+                if result['success']:
+                    self.stdout.write(self.style.SUCCESS(f"Job {upload_id} terminé: {result['message']}"))
+                else:
+                    self.stdout.write(self.style.WARNING(f"Job {upload_id} échoué: {result['message']}"))
+
+            jobs.touch_heartbeat(self.running.values())
+
+    def _interrupted(self):
+        """Jobs du pool sans résultat (annulés, en erreur ou en cours) ; ceux qui ont abouti ne sont pas relancés"""
+        return [
+            upload_id for future, upload_id in self.running.items()
+            if not future.done() or future.cancelled() or future.exception() is not None
+        ]
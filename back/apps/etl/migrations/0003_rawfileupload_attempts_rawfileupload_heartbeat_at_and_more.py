@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0002_indicator_source_upload'),
+        ('etl', '0002_rawfileupload_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='visibility',
+            field=models.CharField(choices=[('PUBLIC', 'Public'), ('PRIVATE', 'Privé')], default='PRIVATE', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='rawfileupload',
+            index=models.Index(fields=['status', 'queued_at'], name='etl_rawfile_status_41b6ee_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0003_rawfileupload_attempts_rawfileupload_heartbeat_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='columnar_file',
+            field=models.FileField(blank=True, upload_to='etl/columnar/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0004_rawfileupload_columnar_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='header_row',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='sheet_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
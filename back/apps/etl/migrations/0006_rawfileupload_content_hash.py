@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:26
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    # Copie figée de apps.etl.services.storage.hash_file (qui charge les modèles courants)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_existing_uploads(apps, schema_editor):
+    """Empreinte des fichiers déjà importés (laissés à leur emplacement actuel)"""
+    RawFileUpload = apps.get_model('etl', 'RawFileUpload')
+    for raw_upload in RawFileUpload.objects.exclude(file='').iterator():
+        path = os.path.join(settings.MEDIA_ROOT, raw_upload.file.name)
+        if os.path.exists(path):
+            RawFileUpload.objects.filter(pk=raw_upload.pk).update(content_hash=hash_file(path))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datacatalog', '0008_indicator_columnar_file'),
+        ('etl', '0005_rawfileupload_header_row_rawfileupload_sheet_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='rawfileupload',
+            index=models.Index(fields=['category', 'content_hash'], name='etl_rawfile_categor_27be68_idx'),
+        ),
+        migrations.RunPython(hash_existing_uploads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0006_rawfileupload_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='ingest_mode',
+            field=models.CharField(choices=[('APPEND', 'Ajout'), ('UPSERT', 'Mise à jour (upsert)')], default='APPEND', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='natural_key',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0007_rawfileupload_ingest_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='progress',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
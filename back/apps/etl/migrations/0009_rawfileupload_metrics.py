@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0008_rawfileupload_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0009_rawfileupload_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='output_file',
+            field=models.FileField(blank=True, upload_to='etl/output/'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0010_rawfileupload_output_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('visibility', models.CharField(choices=[('PUBLIC', 'Public'), ('PRIVATE', 'Privé')], default='PRIVATE', max_length=10)),
+                ('ingest_mode', models.CharField(choices=[('APPEND', 'Ajout'), ('UPSERT', 'Mise à jour (upsert)')], default='APPEND', max_length=10)),
+                ('skipped', models.JSONField(blank=True, default=list)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Upload batches',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='rawfileupload',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploads', to='etl.uploadbatch'),
+        ),
+    ]
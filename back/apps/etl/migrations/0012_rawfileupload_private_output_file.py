@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:14
+
+import os
+
+import apps.etl.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_output_files(apps, schema_editor):
+    """Déplacer les classeurs de sortie déjà générés de MEDIA_ROOT vers PRIVATE_MEDIA_ROOT"""
+    RawFileUpload = apps.get_model('etl', 'RawFileUpload')
+    for name in RawFileUpload.objects.exclude(output_file='').values_list('output_file', flat=True).iterator():
+        source = os.path.join(settings.MEDIA_ROOT, name)
+        target = os.path.join(settings.PRIVATE_MEDIA_ROOT, name)
+        if os.path.exists(source) and not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl', '0011_uploadbatch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rawfileupload',
+            name='output_file',
+            field=models.FileField(blank=True, storage=apps.etl.models.PrivateMediaStorage(), upload_to='etl/output/'),
+        ),
+        migrations.RunPython(move_output_files, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,32 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth import get_user_model
 from apps.datacatalog.models import Category
 
 User = get_user_model()
 
+
+class PrivateMediaStorage(FileSystemStorage):
+    """Fichiers sous PRIVATE_MEDIA_ROOT : jamais servis sous MEDIA_URL, lus par les vues qui contrôlent l'accès"""
+
+    @property
+    def base_location(self):
+        return settings.PRIVATE_MEDIA_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    def url(self, name):
+        raise ValueError("Fichier privé : pas d'URL publique")
+
+
+private_storage = PrivateMediaStorage()
+
+
 class RawFileUpload(models.Model):
     STATUS_PENDING = 'PENDING'
     STATUS_PROCESSING = 'PROCESSING'
@@ -17,12 +40,36 @@ class RawFileUpload(models.Model):
         (STATUS_FAILED, 'Échoué'),
     ]
     
+    MODE_APPEND = 'APPEND'
+    MODE_UPSERT = 'UPSERT'
+    
+    MODE_CHOICES = [
+        (MODE_APPEND, 'Ajout'),
+        (MODE_UPSERT, 'Mise à jour (upsert)'),
+    ]
+    
     file = models.FileField(upload_to='etl/raw/')
     file_name = models.CharField(max_length=255)
+    # SHA-256 du contenu (calculé à l'upload) : détection des fichiers déjà importés
+    content_hash = models.CharField(max_length=64, blank=True)
     file_format = models.CharField(max_length=10, choices=[('CSV', 'CSV'), ('EXCEL', 'Excel')])
+    # Lecture du fichier : feuille Excel (première si vide) et ligne d'en-tête (à partir de 1)
+    sheet_name = models.CharField(max_length=255, blank=True)
+    header_row = models.PositiveIntegerField(default=1)
+    # Données nettoyées au format colonnaire (Arrow), écrites en fin de traitement
+    columnar_file = models.FileField(upload_to='etl/columnar/', blank=True)
+    # Classeur de résultats, généré une fois en fin de traitement et servi par /download/
+    # Liste des indicateurs (privés compris) : stockage privé, servi par l'action download (admin)
+    output_file = models.FileField(upload_to='etl/output/', storage=private_storage, blank=True)
+    # Ingestion : ajout simple ou mise à jour des indicateurs existants par clé naturelle
+    # (colonne du fichier ; titre normalisé si vide)
+    ingest_mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=MODE_APPEND)
+    natural_key = models.CharField(max_length=255, blank=True)
     
     # Catégorie pour le traitement
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploaded_files')
+    # Lot d'envoi (plusieurs fichiers ou zip envoyés ensemble)
+    batch = models.ForeignKey('UploadBatch', on_delete=models.SET_NULL, null=True, blank=True, related_name='uploads')
     
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploaded_files')
     uploaded_at = models.DateTimeField(auto_now_add=True)
@@ -31,6 +78,16 @@ class RawFileUpload(models.Model):
     processing_started_at = models.DateTimeField(null=True, blank=True)
     processing_completed_at = models.DateTimeField(null=True, blank=True)
     
+    # File d'attente du worker ETL (manage.py etl_worker)
+    visibility = models.CharField(max_length=10, choices=[('PUBLIC', 'Public'), ('PRIVATE', 'Privé')], default='PRIVATE')
+    queued_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Avancement du traitement en cours (voir services/progress.py)
+    progress = models.JSONField(default=dict, blank=True)
+    # Mesures par étape du dernier traitement (voir services/metrics.py)
+    metrics = models.JSONField(default=dict, blank=True)
+    
     # Rapport de traitement
     report = models.TextField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
@@ -45,6 +102,8 @@ class RawFileUpload(models.Model):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['uploaded_by']),
+            models.Index(fields=['status', 'queued_at']),
+            models.Index(fields=['category', 'content_hash']),
         ]
 
     def __str__(self):
@@ -60,4 +119,20 @@ class RawFileUpload(models.Model):
         return self.status == self.STATUS_COMPLETED
     
     def is_failed(self):
-        return self.status == self.STATUS_FAILED
\ No newline at end of file
+        return self.status == self.STATUS_FAILED
+
+class UploadBatch(models.Model):
+    """Lot de fichiers envoyés ensemble : chaque fichier est un upload traité en parallèle par le worker"""
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_batches')
+    created_at = models.DateTimeField(auto_now_add=True)
+    visibility = models.CharField(max_length=10, choices=[('PUBLIC', 'Public'), ('PRIVATE', 'Privé')], default='PRIVATE')
+    ingest_mode = models.CharField(max_length=10, choices=RawFileUpload.MODE_CHOICES, default=RawFileUpload.MODE_APPEND)
+    # Fichiers du lot non mis en file : format non supporté, contenu déjà importé
+    skipped = models.JSONField(default=list, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+        verbose_name_plural = "Upload batches"
+    
+    def __str__(self):
+        return f"Lot {self.id} ({self.created_at:%Y-%m-%d %H:%M})"
@@ -12,18 +12,23 @@ class RawFileUploadSerializer(serializers.ModelSerializer):
             'id', 'file', 'file_name', 'file_format', 'uploaded_by',
             'uploaded_by_user', 'uploaded_at', 'status', 'status_display',
             'processing_started_at', 'processing_completed_at', 'report',
-            'error_message', 'total_rows', 'processed_rows', 'failed_rows'
+            'error_message', 'total_rows', 'processed_rows', 'failed_rows',
+            'visibility', 'sheet_name', 'header_row', 'queued_at', 'heartbeat_at', 'attempts',
+            'content_hash', 'ingest_mode', 'natural_key', 'progress', 'metrics'
         ]
         read_only_fields = [
             'id', 'uploaded_by', 'uploaded_at', 'processing_started_at',
             'processing_completed_at', 'report', 'error_message',
-            'total_rows', 'processed_rows', 'failed_rows'
+            'total_rows', 'processed_rows', 'failed_rows',
+            'queued_at', 'heartbeat_at', 'attempts', 'content_hash', 'progress', 'metrics'
         ]
 
 class RawFileUploadCreateSerializer(serializers.ModelSerializer):
+    header_row = serializers.IntegerField(min_value=1, required=False)
+    
     class Meta:
         model = RawFileUpload
-        fields = ['file', 'file_name', 'file_format']
+        fields = ['file', 'file_name', 'file_format', 'visibility', 'sheet_name', 'header_row', 'ingest_mode', 'natural_key']
 
 class RawFileUploadDetailSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -35,12 +40,15 @@ class RawFileUploadDetailSerializer(serializers.ModelSerializer):
             'id', 'file', 'file_name', 'file_format', 'uploaded_by',
             'uploaded_by_user', 'uploaded_at', 'status', 'status_display',
             'processing_started_at', 'processing_completed_at', 'report',
-            'error_message', 'total_rows', 'processed_rows', 'failed_rows'
+            'error_message', 'total_rows', 'processed_rows', 'failed_rows',
+            'visibility', 'sheet_name', 'header_row', 'queued_at', 'heartbeat_at', 'attempts',
+            'content_hash', 'ingest_mode', 'natural_key', 'progress', 'metrics'
         ]
         read_only_fields = [
             'id', 'uploaded_by', 'uploaded_at', 'processing_started_at',
             'processing_completed_at', 'report', 'error_message',
-            'total_rows', 'processed_rows', 'failed_rows'
+            'total_rows', 'processed_rows', 'failed_rows',
+            'queued_at', 'heartbeat_at', 'attempts', 'content_hash', 'progress', 'metrics'
         ]
 
 class RawFileUploadListSerializer(serializers.ModelSerializer):
@@ -0,0 +1,138 @@
+"""
+Lots d'upload : plusieurs fichiers (ou une archive zip) envoyés en une requête.
+
+Chaque fichier devient un RawFileUpload du lot, mis en file d'attente : le
+worker ETL (manage.py etl_worker --concurrency N) les traite en parallèle
+dans son pool de processus, à tour de rôle avec les autres uploads.
+"""
+import fnmatch
+import os
+import zipfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Prefetch
+
+from apps.etl.models import RawFileUpload
+
+FILE_FORMATS = {'.csv': 'CSV', '.xlsx': 'EXCEL', '.xls': 'EXCEL'}
+
+
+def file_format_for(name):
+    return FILE_FORMATS.get(os.path.splitext(name)[1].lower())
+
+
+def expand_files(uploaded_files):
+    """
+    Fichiers du lot, archives zip dépliées : [(nom, fichier lisible par blocs)].
+    Les membres du zip sont lus en flux au moment du stockage.
+    """
+    entries = []
+    for uploaded_file in uploaded_files:
+        if os.path.splitext(uploaded_file.name)[1].lower() != '.zip':
+            entries.append((uploaded_file.name, uploaded_file))
+            continue
+        try:
+            archive = zipfile.ZipFile(uploaded_file)
+        except zipfile.BadZipFile:
+            raise ValueError(f"Archive zip invalide: {uploaded_file.name}")
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+            and not os.path.basename(info.filename).startswith('.')
+        ]
+        if sum(info.file_size for info in members) > settings.ETL_BATCH_MAX_BYTES:
+            raise ValueError(f"Archive trop volumineuse une fois décompressée: {uploaded_file.name}")
+        for info in members:
+            name = os.path.basename(info.filename)
+            entries.append((name, File(archive.open(info), name=name)))
+    if len(entries) > settings.ETL_BATCH_MAX_FILES:
+        raise ValueError(f"Trop de fichiers dans le lot ({len(entries)}, maximum {settings.ETL_BATCH_MAX_FILES})")
+    return entries
+
+
+def resolve_category(name, mapping, default=None):
+    """
+    Catégorie d'un fichier : nom exact, puis motif (``*sante*.xlsx``) de la
+    correspondance {nom ou motif: id de catégorie}, sinon la catégorie par défaut.
+    """
+    if name in mapping:
+        return mapping[name]
+    for pattern, category_id in mapping.items():
+        if fnmatch.fnmatch(name.lower(), pattern.lower()):
+            return category_id
+    return default
+
+
+def prefetch_batch_uploads(queryset):
+    """Précharger les uploads (et leur catégorie) des lots : deux requêtes au total"""
+    return queryset.prefetch_related(
+        Prefetch('uploads', queryset=RawFileUpload.objects.select_related('category'))
+    )
+
+
+def batch_report(batch):
+    """
+    Rapport agrégé d'un lot : statuts, lignes, temps total et temps cumulé des jobs.
+    Calculé sur les uploads du lot (au plus ETL_BATCH_MAX_FILES), préchargés
+    par ``prefetch_batch_uploads`` pour une liste de lots.
+    """
+    uploads = sorted(batch.uploads.all(), key=lambda upload: upload.id)
+    statuses = Counter(upload.status for upload in uploads)
+    started = [upload.processing_started_at for upload in uploads if upload.processing_started_at]
+    completed = [upload.processing_completed_at for upload in uploads if upload.processing_completed_at]
+    totals = {
+        'files': len(uploads),
+        'pending': statuses[RawFileUpload.STATUS_PENDING],
+        'processing': statuses[RawFileUpload.STATUS_PROCESSING],
+        'completed': statuses[RawFileUpload.STATUS_COMPLETED],
+        'failed': statuses[RawFileUpload.STATUS_FAILED],
+        'total_rows': sum(upload.total_rows or 0 for upload in uploads),
+        'processed_rows': sum(upload.processed_rows or 0 for upload in uploads),
+        'failed_rows': sum(upload.failed_rows or 0 for upload in uploads),
+        'started_at': min(started, default=None),
+        'completed_at': max(completed, default=None),
+    }
+    files = []
+    job_seconds = 0.0
+    for upload in uploads:
+        seconds = None
+        if upload.processing_started_at and upload.processing_completed_at:
+            seconds = round((upload.processing_completed_at - upload.processing_started_at).total_seconds(), 3)
+            job_seconds += seconds
+        files.append({
+            'id': upload.id,
+            'file_name': upload.file_name,
+            'category': upload.category.name if upload.category else None,
+            'status': upload.status,
+            'total_rows': upload.total_rows,
+            'processed_rows': upload.processed_rows,
+            'seconds': seconds,
+            'message': upload.error_message or upload.report,
+            'status_url': f'/api/etl/uploads/{upload.id}/',
+        })
+
+    finished = totals['files'] and totals['pending'] == 0 and totals['processing'] == 0
+    wall_seconds = None
+    if finished and totals['started_at'] and totals['completed_at']:
+        wall_seconds = round((totals['completed_at'] - totals['started_at']).total_seconds(), 3)
+    return {
+        'id': batch.id,
+        'created_at': batch.created_at,
+        'status': 'COMPLETED' if finished else 'PROCESSING' if totals['started_at'] else 'PENDING',
+        'files': totals['files'],
+        'pending': totals['pending'],
+        'processing': totals['processing'],
+        'completed': totals['completed'],
+        'failed': totals['failed'],
+        'total_rows': totals['total_rows'],
+        'processed_rows': totals['processed_rows'],
+        'failed_rows': totals['failed_rows'],
+        # Temps écoulé du premier démarrage à la dernière fin, et somme des durées des jobs :
+        # leur rapport mesure le parallélisme obtenu
+        'wall_seconds': wall_seconds,
+        'job_seconds': round(job_seconds, 3),
+        'skipped': batch.skipped,
+        'uploads': files,
+    }
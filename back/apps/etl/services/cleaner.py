@@ -1,24 +1,26 @@
-import pandas as pd
-import os
+from django.conf import settings
+
+from apps.etl.services.readers import iter_excel_chunks
 
 class DataCleaner:
-    def process_file(self, file_path):
+    def process_file(self, file_path, sheet_name=None, header_row=1):
         """
         Logique métier ETL : Lit le fichier, nettoie, valide.
         """
         try:
-            # Exemple simple : Lire Excel
-            df = pd.read_excel(file_path)
-            
-            # Nettoyage fictif : Supprimer lignes vides
-            initial_rows = len(df)
-            df.dropna(inplace=True)
-            cleaned_rows = len(df)
-            
-            # Sauvegarder version propre (optionnel)
+            # Lecture Excel en flux, bloc par bloc
+            initial_rows = 0
+            cleaned_rows = 0
             clean_path = file_path + "_cleaned.csv"
-            df.to_csv(clean_path, index=False)
-            
+            for position, df in enumerate(iter_excel_chunks(file_path, settings.ETL_CHUNK_SIZE, sheet_name, header_row)):
+                # Nettoyage fictif : Supprimer lignes vides
+                initial_rows += len(df)
+                df = df.dropna()
+                cleaned_rows += len(df)
+
+                # Sauvegarder version propre (optionnel)
+                df.to_csv(clean_path, mode='w' if position == 0 else 'a', header=position == 0, index=False)
+
             return {
                 "success": True,
                 "rows_raw": initial_rows,
@@ -26,4 +28,4 @@ class DataCleaner:
                 "clean_file": clean_path
             }
         except Exception as e:
-            return {"success": False, "error": str(e)}
\ No newline at end of file
+            return {"success": False, "error": str(e)}
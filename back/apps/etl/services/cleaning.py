@@ -0,0 +1,178 @@
+"""
+Pipeline de nettoyage vectorisé pour les blocs ETL.
+
+Chaque étape reçoit un DataFrame et retourne un DataFrame. Les étapes ne
+travaillent que sur les colonnes texte via les accesseurs ``.str`` et ne
+copient jamais l'ensemble du bloc.
+
+Configuration (Category.cleaning_steps ou DataModel.schema['cleaning_steps']) :
+une liste de noms d'étapes ou de dictionnaires ``{"step": nom, **options}``, par ex.
+    ["drop_empty_rows", "trim_whitespace", "normalize_headers",
+     {"step": "coerce_numeric", "columns": ["population"]},
+     {"step": "parse_dates", "columns": ["date"]}]
+"""
+import inspect
+import unicodedata
+
+import pandas as pd
+
+# Séparateurs de milliers des exports français (espaces, y compris insécables)
+THOUSANDS_SEPARATORS = r'\s'
+DATE_COLUMN_NAMES = ['date', 'période', 'periode', 'period', 'mois', 'month']
+# Proportion minimale de valeurs converties pour détecter automatiquement une colonne
+AUTO_DETECT_THRESHOLD = 0.9
+
+
+def _text_columns(df, columns=None):
+    """Colonnes texte (object/string) du bloc, éventuellement restreintes à ``columns``"""
+    text_columns = df.select_dtypes(include=['object', 'string']).columns
+    if columns is not None:
+        text_columns = [col for col in text_columns if col in columns]
+    return list(text_columns)
+
+
+def _strip_accents(value):
+    return unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
+
+
+def drop_empty_rows(df):
+    """Supprimer les lignes entièrement vides"""
+    keep = df.notna().any(axis=1)
+    if keep.all():
+        return df
+    return df.loc[keep]
+
+
+def trim_whitespace(df, empty_as_null=False):
+    """
+    Supprimer les espaces en début et fin de texte.
+
+    Seules les valeurs distinctes de chaque colonne sont traitées (libellés,
+    régions... se répètent beaucoup), puis redistribuées par leurs codes.
+    """
+    for col in _text_columns(df):
+        values = df[col].to_numpy()
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Series(uniques, dtype=object)
+        stripped = uniques.str.strip()
+        # .str retourne NaN pour les valeurs non textuelles : les conserver telles quelles
+        stripped = stripped.where(stripped.notna(), uniques)
+        if empty_as_null:
+            stripped = stripped.mask(stripped.eq(''))
+
+        result = stripped.to_numpy()[codes]
+        missing = codes < 0
+        if missing.any():
+            result[missing] = values[missing]
+        df[col] = pd.Series(result, index=df.index, dtype=object)
+    return df
+
+
+def normalize_headers(df, strip_accents=False):
+    """Mettre les noms de colonnes en minuscules, sans espaces superflus"""
+    columns = df.columns.astype(str).str.strip().str.lower()
+    if strip_accents:
+        columns = columns.map(_strip_accents)
+    df.columns = columns
+    return df
+
+
+def coerce_numeric(df, columns=None, decimal=',', threshold=AUTO_DETECT_THRESHOLD):
+    """
+    Convertir en nombres les colonnes texte au format numérique ("1 234,5").
+
+    Sans ``columns``, une colonne n'est convertie que si au moins ``threshold``
+    de ses valeurs renseignées sont numériques.
+    """
+    for col in _text_columns(df, columns):
+        values = df[col]
+        # Seules les cellules texte sont normalisées : .str donnerait NaN pour les nombres déjà lus
+        mask = values.map(type) == str
+        normalized = values.copy()
+        text = values[mask].str.replace(THOUSANDS_SEPARATORS, '', regex=True)
+        if decimal != '.':
+            text = text.str.replace(decimal, '.', regex=False)
+        normalized[mask] = text
+        converted = pd.to_numeric(normalized, errors='coerce')
+        if columns is None:
+            filled = values.notna().sum()
+            if not filled or converted.notna().sum() / filled < threshold:
+                continue
+        df[col] = converted
+    return df
+
+
+def parse_dates(df, columns=None, dayfirst=True, format=None, threshold=AUTO_DETECT_THRESHOLD):
+    """
+    Convertir en dates les colonnes indiquées.
+
+    Sans ``columns``, seules les colonnes nommées comme des dates (date, période, mois...)
+    sont candidates, et converties si au moins ``threshold`` de leurs valeurs sont valides.
+    """
+    if columns is None:
+        candidates = [col for col in _text_columns(df) if str(col).lower() in DATE_COLUMN_NAMES]
+    else:
+        candidates = _text_columns(df, columns)
+
+    for col in candidates:
+        values = df[col]
+        converted = pd.to_datetime(values, errors='coerce', dayfirst=dayfirst, format=format)
+        if columns is None:
+            filled = values.notna().sum()
+            if not filled or converted.notna().sum() / filled < threshold:
+                continue
+        df[col] = converted
+    return df
+
+
+CLEANING_STEPS = {
+    'drop_empty_rows': drop_empty_rows,
+    'trim_whitespace': trim_whitespace,
+    'normalize_headers': normalize_headers,
+    'coerce_numeric': coerce_numeric,
+    'parse_dates': parse_dates,
+}
+
+# Comportement historique de ETLProcessor._clean_data
+DEFAULT_STEPS = ['drop_empty_rows', 'trim_whitespace', 'normalize_headers']
+
+
+class CleaningPipeline:
+    """Suite ordonnée d'étapes de nettoyage"""
+
+    def __init__(self, steps=None):
+        self.steps = []
+        for step in DEFAULT_STEPS if steps is None else steps:
+            if isinstance(step, str):
+                name, options = step, {}
+            elif isinstance(step, dict) and 'step' in step:
+                options = dict(step)
+                name = options.pop('step')
+            else:
+                raise ValueError(f"Étape de nettoyage invalide: {step!r}")
+
+            if name not in CLEANING_STEPS:
+                raise ValueError(
+                    f"Étape de nettoyage inconnue: {name} "
+                    f"(disponibles: {', '.join(CLEANING_STEPS)})"
+                )
+            try:
+                inspect.signature(CLEANING_STEPS[name]).bind(None, **options)
+            except TypeError:
+                raise ValueError(f"Options invalides pour l'étape {name}: {options!r}")
+            self.steps.append((CLEANING_STEPS[name], options))
+
+    @classmethod
+    def for_sources(cls, *configs):
+        """Construire le pipeline à partir de la première configuration renseignée"""
+        for config in configs:
+            if config:
+                return cls(config)
+        return cls()
+
+    def run(self, df):
+        """Nettoyer un bloc ; seule une copie superficielle (sans les données) est faite"""
+        df = df.copy(deep=False)
+        for step, options in self.steps:
+            df = step(df, **options)
+        return df
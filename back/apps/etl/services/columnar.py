@@ -0,0 +1,226 @@
+"""
+Stockage colonnaire des données traitées (fichier Arrow IPC).
+
+Chaque upload traité (et chaque fichier de données d'indicateur) est
+enregistré une fois au format Arrow, typé colonne par colonne. Les lectures
+suivantes ouvrent le fichier en mémoire partagée (mmap) : seules les colonnes
+demandées sont converties, sans relire ni re-parser le CSV ou l'Excel.
+
+pyarrow est une dépendance optionnelle : sans lui, les lecteurs se replient
+sur le fichier d'origine.
+"""
+import logging
+import os
+import tempfile
+
+from django.core.files.storage import default_storage
+
+from apps.etl.services.readers import iter_file_chunks
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    pa = pc = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_AVAILABLE = pa is not None
+# Taille maximale des record batches écrits
+BATCH_SIZE = 64 * 1024
+PREVIEW_ROWS = 50
+PREVIEW_MAX_ROWS = 1000
+UPLOAD_COLUMNAR_NAME = 'etl/columnar/upload_{pk}.arrow'
+INDICATOR_COLUMNAR_NAME = 'indicators/columnar/indicator_{pk}.arrow'
+
+
+def _column_to_array(series):
+    try:
+        return pa.Array.from_pandas(series)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Colonne de types mélangés (nombres et textes) : stockée en texte
+        return pa.Array.from_pandas(series.astype(str).where(series.notna(), None))
+
+
+def dataframe_to_table(df):
+    """Convertir un bloc en table Arrow (noms de colonnes en texte, sans index)"""
+    return pa.Table.from_arrays(
+        [_column_to_array(df[column]) for column in df.columns],
+        names=[str(column) for column in df.columns]
+    )
+
+
+def _promote(current, new):
+    """Type commun à deux blocs : null < entiers < flottants, sinon texte"""
+    if current == new or pa.types.is_null(new):
+        return current
+    if pa.types.is_null(current):
+        return new
+    if pa.types.is_integer(current) and pa.types.is_integer(new):
+        return pa.int64()
+    if (pa.types.is_integer(current) or pa.types.is_floating(current)) and \
+            (pa.types.is_integer(new) or pa.types.is_floating(new)):
+        return pa.float64()
+    return pa.string()
+
+
+class ColumnarWriter:
+    """
+    Écriture bloc par bloc d'un fichier Arrow.
+
+    Un bloc peut changer le type d'une colonne (entier puis décimal, vide puis
+    texte...) : le type est alors élargi et le fichier déjà écrit est réécrit
+    une fois avec le nouveau schéma. Le fichier final n'apparaît qu'à close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.schema = None
+        self.rows = 0
+        self._writer = None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(handle)
+
+    def write(self, df):
+        table = dataframe_to_table(df)
+        if self.schema is None:
+            self.schema = table.schema
+            self._writer = pa.ipc.new_file(self._tmp_path, self.schema)
+        else:
+            if table.schema.names != self.schema.names:
+                raise ValueError('Les colonnes du bloc ne correspondent pas au fichier')
+            schema = pa.schema([
+                pa.field(field.name, _promote(field.type, new.type))
+                for field, new in zip(self.schema, table.schema)
+            ])
+            if schema != self.schema:
+                self._rewrite(schema)
+            table = table.cast(self.schema)
+        self._writer.write_table(table, max_chunksize=BATCH_SIZE)
+        self.rows += table.num_rows
+
+    def _rewrite(self, schema):
+        self._writer.close()
+        handle, path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        os.close(handle)
+        writer = pa.ipc.new_file(path, schema)
+        with pa.memory_map(self._tmp_path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                writer.write_table(pa.Table.from_batches([reader.get_batch(index)]).cast(schema))
+        os.remove(self._tmp_path)
+        self._tmp_path = path
+        self._writer = writer
+        self.schema = schema
+
+    def close(self):
+        if self._writer is None:
+            raise ValueError('Aucune donnée écrite')
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def storage_path(name):
+    return default_storage.path(name)
+
+
+def convert_file(source_path, file_format, target_path, chunk_size):
+    """Convertir un fichier CSV ou Excel en fichier Arrow"""
+    writer = ColumnarWriter(target_path)
+    try:
+        for chunk in iter_file_chunks(source_path, file_format, chunk_size):
+            writer.write(chunk)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.rows
+
+
+def ensure_indicator_columnar(indicator, chunk_size):
+    """
+    Chemin du fichier Arrow du fichier de données d'un indicateur, créé s'il
+    manque ou s'il est plus ancien que le fichier de données.
+    Retourne None si pyarrow est absent ou si l'indicateur n'a pas de fichier.
+    """
+    if not COLUMNAR_AVAILABLE or not indicator.data_file:
+        return None
+    source_path = indicator.data_file.path
+    if not os.path.exists(source_path):
+        return None
+
+    if indicator.columnar_file:
+        path = indicator.columnar_file.path
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source_path):
+            return path
+
+    name = INDICATOR_COLUMNAR_NAME.format(pk=indicator.pk)
+    path = storage_path(name)
+    convert_file(source_path, indicator.file_format, path, chunk_size)
+    type(indicator).objects.filter(pk=indicator.pk).update(columnar_file=name)
+    indicator.columnar_file.name = name
+    logger.info(f"Fichier colonnaire créé pour l'indicateur {indicator.pk}")
+    return path
+
+
+# Lecture
+
+def read_schema(path):
+    """Colonnes et types d'un fichier Arrow (lecture des seules métadonnées)"""
+    with pa.memory_map(path, 'r') as source:
+        schema = pa.ipc.open_file(source).schema
+    return [{'name': field.name, 'type': str(field.type)} for field in schema]
+
+
+def _filter_batch(batch, filters):
+    mask = None
+    for column, expected in filters:
+        condition = pc.equal(pc.cast(batch.column(column), pa.string()), expected)
+        mask = condition if mask is None else pc.and_(mask, condition)
+    return batch if mask is None else batch.filter(pc.fill_null(mask, False))
+
+
+def iter_columnar_batches(path, columns=None, filters=()):
+    """
+    Record batches d'un fichier Arrow en mmap : seules les colonnes demandées
+    (et celles des filtres colonne:valeur) sont lues.
+    """
+    with pa.memory_map(path, 'r') as source:
+        reader = pa.ipc.open_file(source)
+        names = reader.schema.names
+        unknown = [column for column in list(columns or []) + [c for c, _ in filters] if column not in names]
+        if unknown:
+            raise ValueError(f"Colonnes inconnues: {', '.join(unknown)}")
+        for index in range(reader.num_record_batches):
+            batch = _filter_batch(reader.get_batch(index), filters)
+            if batch.num_rows:
+                yield batch.select(columns) if columns else batch
+
+
+def iter_columnar_chunks(path, columns=None, filters=()):
+    """Blocs DataFrame d'un fichier Arrow (voir iter_columnar_batches)"""
+    for batch in iter_columnar_batches(path, columns, filters):
+        yield batch.to_pandas()
+
+
+def read_preview(path, columns=None, limit=PREVIEW_ROWS):
+    """Schéma, nombre total de lignes et premières lignes d'un fichier Arrow"""
+    with pa.memory_map(path, 'r') as source:
+        reader = pa.ipc.open_file(source)
+        total_rows = sum(reader.get_batch(index).num_rows for index in range(reader.num_record_batches))
+    rows = []
+    for batch in iter_columnar_batches(path, columns):
+        rows.extend(batch.slice(0, limit - len(rows)).to_pylist())
+        if len(rows) >= limit:
+            break
+    schema = read_schema(path)
+    if columns:
+        schema = [field for field in schema if field['name'] in columns]
+    return {'columns': schema, 'total_rows': total_rows, 'rows': rows}
@@ -0,0 +1,155 @@
+"""
+Extraction des points de données (séries temporelles) d'un bloc ETL.
+
+Deux dispositions sont reconnues, éventuellement combinées :
+- colonnes-périodes : une colonne par période (« 2019 », « 2020-T1 », « 2021-03 ») ;
+- format long : une colonne période (année, date...) et une colonne par variable numérique.
+La colonne région et les autres colonnes texte deviennent les dimensions du point.
+"""
+import re
+from datetime import date
+
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from apps.datacatalog.models import DataPoint
+
+PERIOD_COLUMN_NAMES = ['année', 'annee', 'year', 'période', 'periode', 'period', 'date', 'mois', 'month', 'trimestre']
+REGION_COLUMN_NAMES = ['région', 'region', 'zone', 'pays', 'country', 'province', 'département', 'departement', 'localité', 'localite']
+
+YEAR_PATTERN = re.compile(r'^(\d{4})$')
+QUARTER_PATTERN = re.compile(r'^(\d{4})[\s\-/]?[TQ]([1-4])$', re.IGNORECASE)
+MONTH_PATTERN = re.compile(r'^(\d{4})[\-/](\d{1,2})$')
+MIN_YEAR, MAX_YEAR = 1900, 2100
+
+
+def parse_period(value, strict=False):
+    """
+    Convertir une valeur en ``(date, libellé)`` ; None si ce n'est pas une période.
+
+    Années, trimestres (2020-T1, 2020Q1) et mois (2020-03) sont reconnus ;
+    hors mode ``strict`` (valeurs de cellules), toute date lisible l'est aussi.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.date(), value.date().isoformat()
+    if isinstance(value, date):
+        return value, value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+
+    text = str(value).strip()
+    match = YEAR_PATTERN.match(text)
+    if match:
+        year = int(match.group(1))
+        return (date(year, 1, 1), text) if MIN_YEAR <= year <= MAX_YEAR else None
+    match = QUARTER_PATTERN.match(text)
+    if match:
+        year, quarter = int(match.group(1)), int(match.group(2))
+        return date(year, 3 * (quarter - 1) + 1, 1), f'{year}-T{quarter}'
+    match = MONTH_PATTERN.match(text)
+    if match:
+        year, month = int(match.group(1)), int(match.group(2))
+        if not 1 <= month <= 12:
+            return None
+        return date(year, month, 1), f'{year}-{month:02d}'
+
+    if strict:
+        return None
+    parsed = pd.to_datetime(text, errors='coerce', dayfirst=True)
+    if pd.isna(parsed):
+        return None
+    return parsed.date(), parsed.date().isoformat()
+
+
+def _find_column(columns, names):
+    return next((col for col in columns if str(col).lower() in names), None)
+
+
+def _map_unique(series, func):
+    """Appliquer ``func`` une seule fois par valeur distincte de la série"""
+    codes, uniques = pd.factorize(series)
+    mapped = [func(value) for value in uniques]
+    return [mapped[code] if code >= 0 else None for code in codes]
+
+
+def extract_datapoints(df, indicator_ids, exclude=(), default_period=None):
+    """
+    Construire (sans les enregistrer) les DataPoint d'un bloc nettoyé.
+
+    ``indicator_ids`` associe l'index des lignes retenues à l'id de leur indicateur ;
+    ``exclude`` liste les colonnes déjà utilisées (titre, description).
+    """
+    if indicator_ids.empty:
+        return []
+
+    rows = df.loc[indicator_ids.index]
+    columns = [col for col in rows.columns if col not in exclude]
+    period_col = _find_column(columns, PERIOD_COLUMN_NAMES)
+    region_col = _find_column(columns, REGION_COLUMN_NAMES)
+
+    header_periods = {}
+    value_cols = []
+    dimension_cols = []
+    for col in columns:
+        if col in (period_col, region_col):
+            continue
+        period = parse_period(col, strict=True)
+        if period:
+            header_periods[col] = period
+            value_cols.append(col)
+        elif is_numeric_dtype(rows[col]) and not is_bool_dtype(rows[col]):
+            value_cols.append(col)
+        else:
+            dimension_cols.append(col)
+
+    if not value_cols:
+        return []
+
+    values = rows[value_cols].apply(pd.to_numeric, errors='coerce')
+    values.columns = range(len(value_cols))
+    long = values.melt(ignore_index=False, var_name='column', value_name='value').dropna(subset=['value'])
+    if long.empty:
+        return []
+
+    positions = rows.index.get_indexer(long.index)
+    ids = indicator_ids.to_numpy()[positions]
+
+    default = (default_period or date.today(), '')
+    if period_col:
+        row_periods = [period or default for period in _map_unique(rows[period_col], parse_period)]
+    else:
+        row_periods = [default] * len(rows)
+
+    if region_col:
+        regions = rows[region_col].astype(str).where(rows[region_col].notna(), '').str[:100].tolist()
+    else:
+        regions = [''] * len(rows)
+
+    if dimension_cols:
+        dimension_values = rows[dimension_cols].astype(str).where(rows[dimension_cols].notna(), None)
+        dimensions = [
+            {col: value for col, value in record.items() if value is not None}
+            for record in dimension_values.to_dict('records')
+        ]
+    else:
+        dimensions = [{}] * len(rows)
+
+    datapoints = []
+    for indicator_id, position, column, value in zip(ids, positions, long['column'].tolist(), long['value'].tolist()):
+        col = value_cols[column]
+        if col in header_periods:
+            (period, label), variable = header_periods[col], ''
+        else:
+            (period, label), variable = row_periods[position], str(col)[:100]
+        datapoints.append(DataPoint(
+            indicator_id=int(indicator_id),
+            variable=variable,
+            period=period,
+            period_label=label,
+            region=regions[position],
+            dimensions=dimensions[position],
+            value=value
+        ))
+    return datapoints
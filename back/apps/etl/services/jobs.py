@@ -0,0 +1,186 @@
+"""
+File d'attente des traitements ETL, portée uniquement par la base de données.
+
+Les uploads sont placés en file avec ``enqueue`` (statut PENDING + ``queued_at``),
+puis réservés et exécutés par la commande ``manage.py etl_worker``.
+"""
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.dashboard.stats import adjust_counters, deletion_deltas, record_transition
+from apps.datacatalog.models import DataPoint, Indicator
+from apps.datacatalog.search import unindex_indicators
+from apps.etl.models import RawFileUpload
+from apps.etl.services.processor import ETLProcessor
+
+logger = logging.getLogger(__name__)
+
+# Jobs en attente examinés à chaque réservation pour répartir le pool entre les lots
+CLAIM_WINDOW = 200
+
+
+def enqueue(raw_upload, visibility=None):
+    """Placer un upload dans la file d'attente du worker"""
+    raw_upload.status = RawFileUpload.STATUS_PENDING
+    raw_upload.queued_at = timezone.now()
+    raw_upload.heartbeat_at = None
+    raw_upload.progress = {}
+    update_fields = ['status', 'queued_at', 'heartbeat_at', 'progress']
+    if visibility:
+        raw_upload.visibility = visibility
+        update_fields.append('visibility')
+    raw_upload.save(update_fields=update_fields)
+    return raw_upload
+
+
+def fair_order(candidates):
+    """
+    Ordonner les jobs en attente [(id, lot)] à tour de rôle entre les lots :
+    un lot de plusieurs fichiers n'occupe pas tout le pool au détriment des
+    uploads envoyés après lui. L'ordre d'arrivée est conservé dans chaque lot.
+    """
+    groups = {}
+    for upload_id, batch_id in candidates:
+        groups.setdefault(batch_id if batch_id is not None else ('upload', upload_id), []).append(upload_id)
+    ordered = []
+    for position in range(max((len(ids) for ids in groups.values()), default=0)):
+        ordered.extend(ids[position] for ids in groups.values() if position < len(ids))
+    return ordered
+
+
+def claim_jobs(limit):
+    """
+    Réserver jusqu'à ``limit`` uploads en attente, du plus ancien au plus récent.
+
+    Les fichiers d'un même lot sont servis à tour de rôle avec les autres
+    uploads (``fair_order``). Les lignes candidates sont verrouillées avec
+    SELECT ... FOR UPDATE SKIP LOCKED quand le moteur le permet ; la mise à jour conditionnelle sur le statut
+    garantit dans tous les cas (y compris SQLite) qu'un job n'est réservé qu'une fois.
+    """
+    if limit <= 0:
+        return []
+
+    claimed = []
+    # Sous SQLite, une transaction qui lit puis écrit échoue immédiatement
+    # si un autre processus écrit : la mise à jour conditionnelle suffit
+    locking = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic() if locking else nullcontext():
+        queryset = RawFileUpload.objects.filter(
+            status=RawFileUpload.STATUS_PENDING,
+            queued_at__isnull=False
+        ).order_by('queued_at', 'id')
+        if locking:
+            queryset = queryset.select_for_update(skip_locked=True)
+
+        now = timezone.now()
+        candidates = list(queryset.values_list('id', 'batch_id')[:max(limit, CLAIM_WINDOW)])
+        for upload_id in fair_order(candidates)[:limit]:
+            updated = RawFileUpload.objects.filter(
+                pk=upload_id,
+                status=RawFileUpload.STATUS_PENDING
+            ).update(
+                status=RawFileUpload.STATUS_PROCESSING,
+                processing_started_at=now,
+                heartbeat_at=now,
+                attempts=F('attempts') + 1
+            )
+            if updated:
+                claimed.append(upload_id)
+
+    # Mise à jour en masse sans signal : compteurs du dashboard ajustés explicitement
+    record_transition('etl', 'pending', 'processing', len(claimed))
+    return claimed
+
+
+def touch_heartbeat(upload_ids):
+    """Signaler que les jobs en cours sont toujours vivants"""
+    upload_ids = list(upload_ids)
+    if not upload_ids:
+        return 0
+    return RawFileUpload.objects.filter(
+        pk__in=upload_ids,
+        status=RawFileUpload.STATUS_PROCESSING
+    ).update(heartbeat_at=timezone.now())
+
+
+def requeue(upload_ids, reason):
+    """
+    Remettre des jobs interrompus en file d'attente.
+
+    Seuls les jobs encore en PROCESSING sont concernés : un job terminé entre-temps
+    (arrêt du worker) garde ses données. Les indicateurs déjà insérés par la tentative
+    interrompue sont supprimés pour éviter les doublons ; au-delà de ETL_JOB_MAX_ATTEMPTS le job échoue.
+    """
+    upload_ids = list(upload_ids)
+    if not upload_ids:
+        return 0, 0
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Verrouiller les jobs toujours en cours avant de toucher à leurs données
+        upload_ids = list(RawFileUpload.objects.select_for_update().filter(
+            pk__in=upload_ids,
+            status=RawFileUpload.STATUS_PROCESSING
+        ).values_list('id', flat=True))
+        if not upload_ids:
+            return 0, 0
+        # Suppression directe, sans charger les lignes ni déclencher les signaux par instance :
+        # points, index de recherche et compteurs du dashboard traités en masse
+        DataPoint.objects.filter(indicator__source_upload_id__in=upload_ids).delete()
+        partial = Indicator.objects.filter(source_upload_id__in=upload_ids)
+        deltas = deletion_deltas(Indicator, partial)
+        unindex_indicators(partial.values_list('id', flat=True))
+        partial._raw_delete(partial.db)
+        adjust_counters(deltas)
+        interrupted = RawFileUpload.objects.filter(
+            pk__in=upload_ids,
+            status=RawFileUpload.STATUS_PROCESSING
+        )
+        failed = interrupted.filter(attempts__gte=settings.ETL_JOB_MAX_ATTEMPTS).update(
+            status=RawFileUpload.STATUS_FAILED,
+            error_message=f'{reason} (abandonné après {settings.ETL_JOB_MAX_ATTEMPTS} tentatives)',
+            processing_completed_at=now
+        )
+        retried = interrupted.update(
+            status=RawFileUpload.STATUS_PENDING,
+            heartbeat_at=None
+        )
+        record_transition('etl', 'processing', 'failed', failed)
+        record_transition('etl', 'processing', 'pending', retried)
+
+    if retried or failed:
+        logger.warning(f"Jobs ETL {upload_ids} interrompus ({reason}): {retried} relancés, {failed} abandonnés")
+    return retried, failed
+
+
+def recover_stale_jobs(timeout=None):
+    """Relancer les jobs restés en PROCESSING sans battement de cœur récent (worker planté)"""
+    timeout = timeout or settings.ETL_JOB_STALE_TIMEOUT
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale_ids = RawFileUpload.objects.filter(
+        status=RawFileUpload.STATUS_PROCESSING,
+        queued_at__isnull=False
+    ).filter(
+        Q(heartbeat_at__lt=cutoff) |
+        Q(heartbeat_at__isnull=True, processing_started_at__lt=cutoff)
+    ).values_list('id', flat=True)
+    return requeue(stale_ids, f'Aucun signal du worker depuis {timeout}s')
+
+
+def run_job(upload_id):
+    """Exécuter un job réservé ; appelé dans un processus du pool"""
+    close_old_connections()
+    raw_upload = RawFileUpload.objects.select_related('category', 'uploaded_by').get(pk=upload_id)
+    processor = ETLProcessor(raw_upload, visibility=raw_upload.visibility)
+    result = processor.process()
+    return {
+        'id': upload_id,
+        'success': result['success'],
+        'message': result.get('message') or result.get('error'),
+    }
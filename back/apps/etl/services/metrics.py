@@ -0,0 +1,160 @@
+"""
+Instrumentation des étapes d'un traitement ETL.
+
+Pour chaque étape (lecture, nettoyage, validation, colonnaire, insertion,
+fichier de sortie), ``StageMetrics`` cumule sur l'ensemble des blocs :
+- temps réel et temps CPU du processus ;
+- nombre de lignes et de requêtes SQL ;
+- mémoire résidente (RSS) courante du processus en fin d'étape (maximum sur les
+  passages) et sa plus forte hausse pendant un passage : le pic ``ru_maxrss`` du
+  processus n'est pas utilisé, les processus du worker étant réutilisés d'un job à l'autre ;
+- pic d'allocation Python de l'étape (tracemalloc, si ETL_TRACEMALLOC).
+Le résultat est enregistré dans ``RawFileUpload.metrics`` ; ``aggregate_metrics``
+calcule les percentiles par étape pour /api/etl/metrics/.
+"""
+import math
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+try:
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError):  # pragma: no cover - indisponible sous Windows
+    PAGE_SIZE = None
+
+STAGES = ['read', 'clean', 'validate', 'columnar', 'insert', 'output']
+# Mesures agrégées par /api/etl/metrics/
+AGGREGATED_FIELDS = [
+    'wall_seconds', 'cpu_seconds', 'rows', 'rows_per_second', 'queries', 'rss_mb', 'rss_delta_mb', 'alloc_peak_mb'
+]
+
+
+def current_rss_mb():
+    """Mémoire résidente actuelle du processus, lue dans /proc (None si indisponible)"""
+    if PAGE_SIZE is None:
+        return None
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * PAGE_SIZE / (1024 * 1024)
+
+
+class StageMetrics:
+    def __init__(self, trace_memory=None):
+        self.trace_memory = settings.ETL_TRACEMALLOC if trace_memory is None else trace_memory
+        self.stages = {}
+        self.started = time.perf_counter()
+        self._queries = 0
+        self._tracing = False
+
+    def start(self):
+        self.started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    def stop(self):
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def _count_query(self, execute, sql, params, many, context):
+        self._queries += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Mesurer un passage dans une étape ; ``rows`` peut être complété via le dictionnaire renvoyé"""
+        counter = {'rows': rows or 0}
+        queries = self._queries
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        rss = current_rss_mb()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            allocated = tracemalloc.get_traced_memory()[0]
+        try:
+            with connection.execute_wrapper(self._count_query):
+                yield counter
+        finally:
+            stats = self.stages.setdefault(name, {
+                'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': 0, 'queries': 0,
+                'rss_mb': None, 'rss_delta_mb': None, 'alloc_peak_mb': None,
+            })
+            stats['calls'] += 1
+            stats['wall_seconds'] += time.perf_counter() - wall
+            stats['cpu_seconds'] += time.process_time() - cpu
+            stats['rows'] += counter['rows']
+            stats['queries'] += self._queries - queries
+            rss_after = current_rss_mb()
+            if rss is not None and rss_after is not None:
+                stats['rss_mb'] = round(max(rss_after, stats['rss_mb'] or 0), 1)
+                stats['rss_delta_mb'] = round(max(rss_after - rss, stats['rss_delta_mb'] or 0), 1)
+            if tracing:
+                peak = (tracemalloc.get_traced_memory()[1] - allocated) / (1024 * 1024)
+                stats['alloc_peak_mb'] = round(max(peak, stats['alloc_peak_mb'] or 0), 2)
+
+    def timed_chunks(self, chunks, name='read'):
+        """Itérer sur les blocs d'un lecteur en mesurant le temps passé à les produire"""
+        chunks = iter(chunks)
+        while True:
+            with self.stage(name) as counter:
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    counter['rows'] = len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+    def as_dict(self):
+        stages = {}
+        for name in sorted(self.stages, key=lambda stage: STAGES.index(stage) if stage in STAGES else len(STAGES)):
+            stats = dict(self.stages[name])
+            stats['wall_seconds'] = round(stats['wall_seconds'], 4)
+            stats['cpu_seconds'] = round(stats['cpu_seconds'], 4)
+            stats['rows_per_second'] = round(stats['rows'] / stats['wall_seconds'], 1) if stats['wall_seconds'] and stats['rows'] else None
+            stages[name] = stats
+        return {
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'rss_mb': max((stats['rss_mb'] for stats in stages.values() if stats['rss_mb'] is not None), default=None),
+            'tracemalloc': self.trace_memory,
+            'stages': stages,
+        }
+
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche d'une liste triée"""
+    if not values:
+        return None
+    rank = min(max(math.ceil(fraction * len(values)), 1), len(values))
+    return values[rank - 1]
+
+
+def _distribution(values):
+    values = sorted(values)
+    return {'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95), 'max': values[-1]} if values else None
+
+
+def aggregate_metrics(job_metrics):
+    """p50/p95/max de chaque mesure, par étape, sur une liste de ``RawFileUpload.metrics``"""
+    samples = {}
+    totals = []
+    for metrics in job_metrics:
+        if (metrics or {}).get('total_seconds') is not None:
+            totals.append(metrics['total_seconds'])
+        for name, stats in (metrics or {}).get('stages', {}).items():
+            for field in AGGREGATED_FIELDS:
+                if stats.get(field) is not None:
+                    samples.setdefault(name, {}).setdefault(field, []).append(stats[field])
+    stages = {}
+    for name in sorted(samples, key=lambda stage: STAGES.index(stage) if stage in STAGES else len(STAGES)):
+        stages[name] = {field: _distribution(values) for field, values in samples[name].items()}
+        stages[name]['jobs'] = max(len(values) for values in samples[name].values())
+    return {'total_seconds': _distribution(totals), 'stages': stages}
@@ -2,51 +2,136 @@
 Service de traitement ETL pour les fichiers uploadés
 """
 import pandas as pd
-import io
-from django.core.files.base import ContentFile
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
-from apps.datacatalog.models import Indicator, Category, DataModel
+from openpyxl import Workbook
+from apps.datacatalog.models import Indicator, Category, DataModel, DataPoint, normalize_key
+from apps.datacatalog.search import index_indicators
 from apps.accounts.models import User
+from apps.dashboard.prometheus import record_etl_job, record_etl_rows
+from apps.dashboard.stats import record_created, record_updated
+from apps.etl.models import RawFileUpload
+from apps.etl.services.cleaning import CleaningPipeline
+from apps.etl.services.columnar import COLUMNAR_AVAILABLE, UPLOAD_COLUMNAR_NAME, ColumnarWriter, storage_path
+from apps.etl.services.datapoints import extract_datapoints
+from apps.etl.services.metrics import StageMetrics
+from apps.etl.services.progress import (
+    STAGE_CLEANING, STAGE_COMPLETED, STAGE_FAILED, STAGE_FINALIZING, STAGE_INSERTING, STAGE_READING,
+    ProgressReporter
+)
+from apps.etl.services.readers import estimate_rows, iter_file_chunks
+
+logger = logging.getLogger(__name__)
 
 
 class ETLProcessor:
     """Classe pour traiter les fichiers ETL"""
     
-    def __init__(self, raw_upload, visibility='PRIVATE'):
+    def __init__(self, raw_upload, visibility='PRIVATE', batch_size=None, chunk_size=None):
         self.raw_upload = raw_upload
         self.category = raw_upload.category
         self.user = raw_upload.uploaded_by
         self.visibility = visibility  # PUBLIC ou PRIVATE
-        self.processed_data = None
+        self.batch_size = batch_size or settings.ETL_BULK_BATCH_SIZE
+        self.chunk_size = chunk_size or settings.ETL_CHUNK_SIZE
+        self.data_model = None
+        self.cleaning_pipeline = None
         self.output_file = None
+        self.batch_timings = []
+        self.datapoint_count = 0
+        self.columnar_writer = None
+        self.upsert = raw_upload.ingest_mode == RawFileUpload.MODE_UPSERT
+        # Lignes insérées / mises à jour / inchangées (mode upsert) / doublons de clé ignorés
+        self.row_counts = Counter()
+        self.progress = ProgressReporter(raw_upload)
+        self.metrics = StageMetrics()
     
     def process(self):
-        """Traiter le fichier et créer les indicateurs"""
+        """Traiter le fichier bloc par bloc et créer les indicateurs"""
         try:
-            # Lire le fichier
-            self.processed_data = self._read_file()
+            total_rows = 0
+            processed_rows = 0
+            self.metrics.start()
+            self._open_columnar()
+            self.progress.start(estimate_rows(
+                self.raw_upload.file.path, self.raw_upload.file_format,
+                self.raw_upload.sheet_name, self.raw_upload.header_row
+            ))
             
-            # Nettoyer les données
-            self.processed_data = self._clean_data()
+            # Lire le fichier par blocs : lecture -> nettoyage -> validation -> insertion
+            # (chaque étape est mesurée : temps, CPU, mémoire, requêtes)
+            for chunk in self.metrics.timed_chunks(self._read_chunks()):
+                rows_read = len(chunk)
+                self.progress.update(STAGE_CLEANING, rows_read=rows_read)
+                
+                # Nettoyer les données
+                with self.metrics.stage('clean', rows_read):
+                    chunk = self._clean_data(chunk)
+                self.progress.update(STAGE_INSERTING, rows_cleaned=len(chunk))
+                
+                # Valider les données
+                with self.metrics.stage('validate', len(chunk)):
+                    validation_result = self._validate_data(chunk)
+                if not validation_result['valid']:
+                    raise ValueError(f"Validation échouée: {validation_result['errors']}")
+                
+                with self.metrics.stage('columnar', len(chunk)):
+                    self._write_columnar(chunk)
+                
+                # Créer les indicateurs
+                with self.metrics.stage('insert', len(chunk)):
+                    created_indicators = self._create_indicators(chunk)
+                
+                total_rows += len(chunk)
+                processed_rows += len(created_indicators)
+                record_etl_rows(len(created_indicators), len(chunk) - len(created_indicators))
+                self._save_statistics(total_rows, processed_rows)
+                self.progress.update(STAGE_READING, rows_done=rows_read)
             
-            # Valider les données
-            validation_result = self._validate_data()
-            if not validation_result['valid']:
-                raise ValueError(f"Validation échouée: {validation_result['errors']}")
+            if total_rows == 0:
+                raise ValueError("Validation échouée: ['Le fichier est vide']")
+            self.progress.update(STAGE_FINALIZING, force=True)
             
-            # Créer les indicateurs
-            created_indicators = self._create_indicators()
+            # Invalider les agrégats mis en cache pendant l'ingestion des points
+            Indicator.objects.filter(last_upload=self.raw_upload).update(data_version=F('data_version') + 1)
             
             # Générer le fichier XLS de sortie
-            self.output_file = self._generate_output_file()
+            with self.metrics.stage('output'):
+                self.output_file = self._generate_output_file()
+            with self.metrics.stage('columnar'):
+                self._close_columnar()
             
             # Mettre à jour le statut
             self.raw_upload.status = self.raw_upload.STATUS_COMPLETED
             self.raw_upload.processing_completed_at = timezone.now()
-            self.raw_upload.total_rows = len(self.processed_data)
-            self.raw_upload.processed_rows = len(created_indicators)
-            self.raw_upload.failed_rows = len(self.processed_data) - len(created_indicators)
-            self.raw_upload.report = f"Traitement complété: {len(created_indicators)} indicateurs créés"
+            self.raw_upload.total_rows = total_rows
+            self.raw_upload.processed_rows = processed_rows
+            self.raw_upload.failed_rows = total_rows - processed_rows
+            insert_seconds = sum(timing['seconds'] for timing in self.batch_timings)
+            if self.upsert:
+                summary = (
+                    f"{self.row_counts['inserted']} indicateurs créés, {self.row_counts['updated']} mis à jour, "
+                    f"{self.row_counts['unchanged']} inchangés"
+                )
+                if self.row_counts['duplicates']:
+                    summary += f", {self.row_counts['duplicates']} doublons de clé ignorés"
+            else:
+                summary = f"{processed_rows} indicateurs créés"
+            self.raw_upload.report = (
+                f"Traitement complété: {summary} "
+                f"({len(self.batch_timings)} lots, {insert_seconds:.2f}s d'insertion), "
+                f"{self.datapoint_count} points de données"
+            )
+            self.progress.finish(STAGE_COMPLETED)
+            self.raw_upload.metrics = self._finish_metrics()
             self.raw_upload.save()
             
             return {
@@ -54,14 +139,24 @@ class ETLProcessor:
                 'total_rows': self.raw_upload.total_rows,
                 'processed_rows': self.raw_upload.processed_rows,
                 'failed_rows': self.raw_upload.failed_rows,
-                'output_file': self.output_file,
+                'batch_timings': self.batch_timings,
+                'datapoints': self.datapoint_count,
+                'metrics': self.raw_upload.metrics,
+                'inserted': self.row_counts['inserted'],
+                'updated': self.row_counts['updated'],
+                'unchanged': self.row_counts['unchanged'],
+                'output_file': self.raw_upload.output_file.name,
                 'message': self.raw_upload.report
             }
         
         except Exception as e:
+            if self.columnar_writer is not None:
+                self.columnar_writer.abort()
+            self.progress.finish(STAGE_FAILED, error=str(e))
             self.raw_upload.status = self.raw_upload.STATUS_FAILED
             self.raw_upload.error_message = str(e)
             self.raw_upload.processing_completed_at = timezone.now()
+            self.raw_upload.metrics = self._finish_metrics()
             self.raw_upload.save()
             
             return {
@@ -69,78 +164,109 @@ class ETLProcessor:
                 'error': str(e)
             }
     
-    def _read_file(self):
-        """Lire le fichier (CSV ou Excel)"""
-        file_path = self.raw_upload.file.path
-        
-        if self.raw_upload.file_format == 'CSV':
-            # Essayer différents séparateurs
-            try:
-                # Essayer d'abord avec virgule
-                df = pd.read_csv(file_path, encoding='utf-8', sep=',')
-            except Exception:
-                try:
-                    # Essayer avec point-virgule
-                    df = pd.read_csv(file_path, encoding='utf-8', sep=';')
-                except Exception:
-                    try:
-                        # Essayer avec tabulation
-                        df = pd.read_csv(file_path, encoding='utf-8', sep='\t')
-                    except Exception:
-                        # Utiliser la détection automatique
-                        df = pd.read_csv(file_path, encoding='utf-8', sep=None, engine='python')
-        elif self.raw_upload.file_format == 'EXCEL':
-            df = pd.read_excel(file_path)
-        else:
-            raise ValueError(f"Format non supporté: {self.raw_upload.file_format}")
-        
-        return df
+    def _finish_metrics(self):
+        """Mesures par étape du traitement, journalisées et enregistrées sur l'upload"""
+        self.metrics.stop()
+        metrics = self.metrics.as_dict()
+        record_etl_job(self.raw_upload.status, metrics)
+        logger.info(f"Upload {self.raw_upload.id}: " + ', '.join(
+            f"{name} {stats['wall_seconds']:.2f}s/{stats['queries']} req" for name, stats in metrics['stages'].items()
+        ))
+        return metrics
     
-    def _clean_data(self):
-        """Nettoyer les données"""
-        df = self.processed_data.copy()
-        
-        # Supprimer les lignes vides
-        df = df.dropna(how='all')
-        
-        # Supprimer les espaces inutiles
-        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        
-        # Renommer les colonnes en minuscules
-        df.columns = df.columns.str.lower().str.strip()
-        
-        return df
+    def _read_chunks(self):
+        """Lire le fichier (CSV ou Excel) par blocs de ETL_CHUNK_SIZE lignes"""
+        return iter_file_chunks(
+            self.raw_upload.file.path,
+            self.raw_upload.file_format,
+            self.chunk_size,
+            sheet_name=self.raw_upload.sheet_name,
+            header_row=self.raw_upload.header_row
+        )
     
-    def _validate_data(self):
+    def _open_columnar(self):
+        """Préparer l'écriture des données nettoyées au format colonnaire (si pyarrow est installé)"""
+        if COLUMNAR_AVAILABLE:
+            self.columnar_writer = ColumnarWriter(storage_path(UPLOAD_COLUMNAR_NAME.format(pk=self.raw_upload.pk)))
+    
+    def _write_columnar(self, chunk):
+        """Ajouter un bloc nettoyé ; le fichier colonnaire n'est qu'une copie, une erreur n'interrompt pas l'ingestion"""
+        if self.columnar_writer is None:
+            return
+        try:
+            self.columnar_writer.write(chunk)
+        except Exception as e:
+            logger.warning(f"Upload {self.raw_upload.id}: stockage colonnaire abandonné ({str(e)})")
+            self.columnar_writer.abort()
+            self.columnar_writer = None
+    
+    def _close_columnar(self):
+        if self.columnar_writer is None:
+            return
+        self.columnar_writer.close()
+        self.columnar_writer = None
+        self.raw_upload.columnar_file.name = UPLOAD_COLUMNAR_NAME.format(pk=self.raw_upload.pk)
+    
+    def _save_statistics(self, total_rows, processed_rows):
+        """Enregistrer les statistiques cumulées après chaque bloc"""
+        RawFileUpload.objects.filter(pk=self.raw_upload.pk).update(
+            total_rows=total_rows,
+            processed_rows=processed_rows,
+            failed_rows=total_rows - processed_rows
+        )
+    
+    def _get_cleaning_pipeline(self):
+        """Pipeline de nettoyage configuré sur la catégorie, sinon sur le modèle de données"""
+        if self.cleaning_pipeline is None:
+            self.cleaning_pipeline = CleaningPipeline.for_sources(
+                self.category.cleaning_steps,
+                (self._get_data_model().schema or {}).get('cleaning_steps')
+            )
+        return self.cleaning_pipeline
+    
+    def _clean_data(self, df):
+        """Nettoyer les données (étapes vectorisées, voir services/cleaning.py)"""
+        return self._get_cleaning_pipeline().run(df)
+    
+    def _validate_data(self, df):
         """Valider les données - Très flexible, accepte n'importe quel format"""
         errors = []
         
         # Vérifier qu'il y a au moins une colonne
-        if len(self.processed_data.columns) == 0:
+        if len(df.columns) == 0:
             errors.append("Le fichier n'a pas de colonnes")
         
-        # Vérifier qu'il y a au moins une ligne
-        if len(self.processed_data) == 0:
-            errors.append("Le fichier est vide")
-        
+        # Le contrôle du fichier vide est fait sur l'ensemble des blocs dans process()
         # C'est tout ! Accepter n'importe quel format
         return {
             'valid': len(errors) == 0,
             'errors': errors
         }
     
-    def _create_indicators(self):
-        """Créer les indicateurs en base de données - Très flexible"""
+    def _get_data_model(self):
+        """Obtenir ou créer le modèle de données (une seule fois par traitement)"""
+        if self.data_model is None:
+            self.data_model, _ = DataModel.objects.get_or_create(
+                name=self.category.name,
+                defaults={'description': f'Modèle pour {self.category.name}'}
+            )
+        return self.data_model
+    
+    def _create_indicators(self, df):
+        """Créer les indicateurs en base de données - Très flexible
+
+        Les lignes sont construites colonne par colonne à partir du DataFrame
+        puis insérées par lots avec ``bulk_create`` (une transaction par lot).
+        En mode upsert, les lignes dont la clé naturelle existe déjà dans la
+        catégorie mettent à jour l'indicateur existant (voir ``_upsert_existing``).
+        """
         created_indicators = []
         
         # Obtenir ou créer le modèle de données
-        data_model, _ = DataModel.objects.get_or_create(
-            name=self.category.name,
-            defaults={'description': f'Modèle pour {self.category.name}'}
-        )
+        data_model = self._get_data_model()
         
         # Obtenir toutes les colonnes
-        columns = self.processed_data.columns.tolist()
+        columns = df.columns.tolist()
         
         # Déterminer les colonnes à utiliser (très flexible)
         title_col = next((col for col in columns if col in ['title', 'nom', 'name', 'label', 'indicateur', 'indicator']), columns[0] if columns else None)
@@ -152,82 +278,239 @@ class ETLProcessor:
         if not desc_col and len(columns) > 1:
             desc_col = columns[1]
         
-        for idx, row in self.processed_data.iterrows():
+        # Récupérer les titres (obligatoires) en une seule opération vectorisée
+        if title_col:
+            titles = df[title_col].astype(str).str.strip()
+        else:
+            titles = pd.Series([f'Indicateur {idx}' for idx in df.index], index=df.index, dtype=object)
+        
+        # Récupérer les descriptions (optionnelles)
+        if desc_col:
+            descriptions = df[desc_col].astype(str).str.strip()
+        else:
+            # Utiliser les autres colonnes comme description
+            other_cols = [col for col in columns if col not in [title_col, desc_col]]
+            descriptions = pd.Series('', index=df.index, dtype=object)
+            for position, col in enumerate(other_cols[:3]):
+                part = f"{col}: " + df[col].astype(str)
+                descriptions = part if position == 0 else descriptions + ' | ' + part
+        
+        # Ignorer les lignes vides
+        keep = titles.ne('') & titles.str.lower().ne('nan')
+        
+        # Clé naturelle : colonne choisie à l'upload, sinon titre normalisé
+        keys = titles.map(normalize_key)
+        if self.raw_upload.natural_key:
+            key_col = self._natural_key_column(df.columns)
+            column_keys = df[key_col].astype(str).map(normalize_key)
+            keys = column_keys.where(column_keys.ne('') & column_keys.ne('nan'), keys)
+        if self.upsert:
+            # Une clé présente plusieurs fois dans le bloc : la dernière ligne l'emporte
+            duplicated = keys[keep].duplicated(keep='last')
+            self.row_counts['duplicates'] += int(duplicated.sum())
+            keep[duplicated.index[duplicated]] = False
+        
+        processing_notes = f'Créé via ETL le {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'
+        row_index = titles.index[keep]
+        # Empreinte de toute la ligne source : une ligne inchangée n'est pas réécrite
+        row_hashes = pd.util.hash_pandas_object(df.loc[row_index], index=False).map('{:016x}'.format)
+        indicators = [
+            Indicator(
+                title=title,
+                description=description,
+                category=self.category,
+                data_model=data_model,
+                visibility=self.visibility,  # Utiliser la visibilité spécifiée
+                file_format='EXCEL',
+                uploaded_by=self.user,
+                source_upload=self.raw_upload,
+                last_upload=self.raw_upload,
+                is_processed=True,
+                processing_notes=processing_notes,
+                natural_key=key,
+                row_hash=row_hash
+            )
+            for title, description, key, row_hash in zip(
+                titles[keep].tolist(), descriptions[keep].tolist(), keys[keep].tolist(), row_hashes.tolist()
+            )
+        ]
+        
+        processed = []
+        if self.upsert:
+            indicators, processed = self._upsert_existing(indicators, row_index, df, exclude=[title_col, desc_col])
+            row_index = pd.Index([indicator.row_index for indicator in indicators])
+        
+        for batch_number, start in enumerate(range(0, len(indicators), self.batch_size), start=len(self.batch_timings) + 1):
+            batch = indicators[start:start + self.batch_size]
+            started = time.perf_counter()
             try:
-                # Récupérer le titre (obligatoire)
-                if title_col:
-                    title = str(row.get(title_col, '')).strip()
-                else:
-                    title = f'Indicateur {idx}'
-                
-                # Récupérer la description (optionnelle)
-                if desc_col:
-                    description = str(row.get(desc_col, '')).strip()
-                else:
-                    # Utiliser les autres colonnes comme description
-                    other_cols = [col for col in columns if col not in [title_col, desc_col]]
-                    description = ' | '.join([f"{col}: {row.get(col, '')}" for col in other_cols[:3]])
-                
-                # Ignorer les lignes vides
-                if not title or title.lower() == 'nan':
-                    continue
-                
-                # Créer l'indicateur avec la visibilité spécifiée
-                indicator = Indicator.objects.create(
-                    title=title,
-                    description=description,
-                    category=self.category,
-                    data_model=data_model,
-                    visibility=self.visibility,  # Utiliser la visibilité spécifiée
-                    file_format='EXCEL',
-                    uploaded_by=self.user,
-                    is_processed=True,
-                    processing_notes=f'Créé via ETL le {timezone.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                )
-                
-                created_indicators.append(indicator)
-            
+                with transaction.atomic():
+                    created = Indicator.objects.bulk_create(batch)
+                    # bulk_create n'émet pas de signal : compteurs du dashboard et index de recherche mis à jour ici
+                    record_created(Indicator, created)
+                    index_indicators(created)
             except Exception as e:
-                print(f"Erreur lors de la création de l'indicateur {idx}: {str(e)}")
-                continue
+                logger.warning(f"Lot {batch_number} rejeté ({str(e)}), insertion ligne par ligne")
+                created = self._insert_rowwise(batch)
+            elapsed = time.perf_counter() - started
+            
+            created_indicators.extend(created)
+            self.row_counts['inserted'] += len(created)
+            self.progress.update(rows_inserted=len(created))
+            self.batch_timings.append({
+                'batch': batch_number,
+                'rows': len(batch),
+                'created': len(created),
+                'seconds': round(elapsed, 4),
+            })
+            logger.debug(f"Upload {self.raw_upload.id}: lot {batch_number} ({len(created)}/{len(batch)} lignes) en {elapsed:.3f}s")
+        
+        # Les indicateurs non insérés (lignes rejetées) n'ont pas de clé primaire ;
+        # les points des indicateurs mis à jour sont déjà remplacés par _upsert_existing
+        indicator_ids = pd.Series(
+            [indicator.pk for indicator in indicators], index=row_index, dtype=object
+        ).dropna()
+        self._create_datapoints(df, indicator_ids, exclude=[title_col, desc_col])
         
-        return created_indicators
+        return created_indicators + processed
     
-    def _generate_output_file(self):
-        """Générer le fichier XLS de sortie"""
-        # Créer un DataFrame avec les résultats
-        output_data = {
-            'Title': [],
-            'Description': [],
-            'Category': [],
-            'Status': [],
-            'Created At': []
-        }
+    def _natural_key_column(self, columns):
+        """
+        Colonne de clé naturelle choisie à l'upload. Les en-têtes ayant pu être
+        normalisés par le nettoyage, la comparaison ignore casse, accents et espaces.
+        """
+        wanted = normalize_key(self.raw_upload.natural_key)
+        for column in columns:
+            if normalize_key(column) == wanted:
+                return column
+        raise ValueError(f"Colonne de clé naturelle introuvable: {self.raw_upload.natural_key}")
+    
+    def _upsert_existing(self, indicators, row_index, df, exclude):
+        """
+        Rapprocher les lignes du bloc des indicateurs existants de la catégorie (par clé naturelle).
+
+        Les indicateurs existants sont lus par lots ; seules les lignes dont l'empreinte
+        ou la visibilité a changé sont écrites (``bulk_update``), et leurs points remplacés
+        dans la même transaction : une empreinte enregistrée a toujours ses points.
+        Retourne (nouveaux indicateurs à insérer, indicateurs mis à jour ou inchangés) ;
+        ``row_index`` de chaque indicateur est la ligne du bloc, None s'il est inchangé.
+        """
+        for indicator, index in zip(indicators, row_index):
+            indicator.row_index = index
         
-        # Récupérer les indicateurs créés
-        indicators = Indicator.objects.filter(
-            category=self.category,
-            uploaded_by=self.user,
-            created_at__gte=self.raw_upload.processing_started_at
-        )
+        keys = [indicator.natural_key for indicator in indicators]
+        existing = {}
+        for start in range(0, len(keys), self.batch_size):
+            matches = Indicator.objects.filter(
+                category=self.category, natural_key__in=keys[start:start + self.batch_size]
+            ).only('id', 'natural_key', 'row_hash', 'visibility', 'is_processed').order_by('id')
+            # Plusieurs indicateurs pour une clé (anciens imports en ajout) : le plus récent est mis à jour
+            existing.update((indicator.natural_key, indicator) for indicator in matches)
         
+        new, changes, unchanged = [], [], []
         for indicator in indicators:
-            output_data['Title'].append(indicator.title)
-            output_data['Description'].append(indicator.description)
-            output_data['Category'].append(indicator.category.name)
-            output_data['Status'].append('Créé')
-            output_data['Created At'].append(indicator.created_at.strftime("%Y-%m-%d %H:%M:%S"))
+            current = existing.get(indicator.natural_key)
+            if current is None:
+                new.append(indicator)
+            elif current.row_hash == indicator.row_hash and current.visibility == indicator.visibility:
+                indicator.pk = current.pk
+                indicator.row_index = None
+                unchanged.append(indicator)
+            else:
+                indicator.pk = current.pk
+                changes.append((current, indicator))
         
-        df_output = pd.DataFrame(output_data)
+        updated = [indicator for _, indicator in changes]
+        now = timezone.now()
+        for indicator in updated:
+            indicator.updated_at = now
+            indicator.processing_notes = f'Mis à jour via ETL le {now.strftime("%Y-%m-%d %H:%M:%S")}'
+        for start in range(0, len(changes), self.batch_size):
+            batch = changes[start:start + self.batch_size]
+            batch_updated = [indicator for _, indicator in batch]
+            with transaction.atomic():
+                # source_upload n'est pas réécrit : il reste l'upload qui a créé l'indicateur
+                Indicator.objects.bulk_update(batch_updated, [
+                    'title', 'description', 'data_model', 'visibility', 'last_upload',
+                    'is_processed', 'processing_notes', 'row_hash', 'updated_at'
+                ])
+                # Les points des lignes modifiées sont recréés à partir du bloc
+                DataPoint.objects.filter(indicator_id__in=[indicator.pk for indicator in batch_updated]).delete()
+                datapoints = self._extract_datapoints(df, pd.Series(
+                    [indicator.pk for indicator in batch_updated],
+                    index=[indicator.row_index for indicator in batch_updated], dtype=object
+                ), exclude)
+                DataPoint.objects.bulk_create(datapoints)
+                self.datapoint_count += len(datapoints)
+                # bulk_update n'émet pas de signal : compteurs et index de recherche mis à jour ici
+                record_updated(Indicator, batch)
+                index_indicators(batch_updated)
         
-        # Créer le fichier Excel
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df_output.to_excel(writer, sheet_name='Résultats', index=False)
+        self.row_counts['updated'] += len(updated)
+        self.row_counts['unchanged'] += len(unchanged)
+        self.progress.update(rows_inserted=len(updated) + len(unchanged))
+        return new, updated + unchanged
+    
+    def _create_datapoints(self, df, indicator_ids, exclude):
+        """Enregistrer par lots les valeurs numériques du bloc (voir services/datapoints.py)"""
+        datapoints = self._extract_datapoints(df, indicator_ids, exclude)
+        for start in range(0, len(datapoints), self.batch_size):
+            with transaction.atomic():
+                DataPoint.objects.bulk_create(datapoints[start:start + self.batch_size])
+        self.datapoint_count += len(datapoints)
+    
+    def _extract_datapoints(self, df, indicator_ids, exclude):
+        return extract_datapoints(
+            df, indicator_ids, exclude=exclude,
+            default_period=self.raw_upload.uploaded_at.date()
+        )
+    
+    def _insert_rowwise(self, batch):
+        """Insérer un lot rejeté ligne par ligne pour isoler les lignes invalides"""
+        created = []
+        for indicator in batch:
+            try:
+                with transaction.atomic():
+                    indicator.save(force_insert=True)
+                created.append(indicator)
+            except Exception as e:
+                logger.error(f"Erreur lors de la création de l'indicateur '{indicator.title}': {str(e)}")
+        return created
+    
+    def _generate_output_file(self):
+        """
+        Générer le classeur de sortie (indicateurs créés ou mis à jour par ce job)
+        et l'enregistrer sur l'upload : les téléchargements servent ce fichier.
+        """
+        started_at = self.raw_upload.processing_started_at
+        category_name = self.category.name if self.category else ''
+        indicators = Indicator.objects.filter(last_upload=self.raw_upload).order_by('id').values_list(
+            'title', 'description', 'created_at'
+        )
         
-        output.seek(0)
+        # Classeur écrit en flux (write_only) dans un fichier temporaire
+        handle, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        try:
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet('Résultats')
+            sheet.append(['Title', 'Description', 'Category', 'Status', 'Created At'])
+            for title, description, created_at in indicators.iterator(chunk_size=2000):
+                created = started_at is None or created_at >= started_at
+                sheet.append([
+                    title, description, category_name, 'Créé' if created else 'Mis à jour',
+                    created_at.strftime("%Y-%m-%d %H:%M:%S")
+                ])
+            workbook.save(path)
+            
+            # Un seul fichier par job : une version précédente (job relancé) est remplacée
+            output_file = self.raw_upload.output_file
+            filename = f'etl_output_{self.raw_upload.id}.xlsx'
+            for previous in {output_file.name, output_file.field.generate_filename(self.raw_upload, filename)} - {''}:
+                output_file.storage.delete(previous)
+            with open(path, 'rb') as source:
+                output_file.save(filename, File(source), save=False)
+        finally:
+            os.remove(path)
         
-        return ContentFile(
-            output.getvalue(),
-            name=f'etl_output_{self.raw_upload.id}.xlsx'
-        )
+        return self.raw_upload.output_file
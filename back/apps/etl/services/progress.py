@@ -0,0 +1,140 @@
+"""
+Avancement d'un traitement ETL en cours.
+
+``ProgressReporter`` tient les compteurs du traitement (lignes lues, nettoyées,
+insérées), l'étape courante, le débit et l'ETA, et les enregistre dans
+``RawFileUpload.progress`` au plus une fois toutes les ETL_PROGRESS_INTERVAL
+secondes (sauf écriture forcée et fin du traitement).
+
+``progress_events`` relit cet état pour le diffuser en server-sent events.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from apps.etl.models import RawFileUpload
+
+STAGE_READING = 'reading'
+STAGE_CLEANING = 'cleaning'
+STAGE_INSERTING = 'inserting'
+STAGE_FINALIZING = 'finalizing'
+STAGE_COMPLETED = 'completed'
+STAGE_FAILED = 'failed'
+
+COUNTERS = ('rows_read', 'rows_cleaned', 'rows_inserted')
+
+
+class ProgressReporter:
+    def __init__(self, raw_upload, interval=None):
+        self.raw_upload = raw_upload
+        self.interval = settings.ETL_PROGRESS_INTERVAL if interval is None else interval
+        self.stage = STAGE_READING
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        # Lignes passées par toutes les étapes : base du pourcentage, du débit et de l'ETA
+        self.rows_done = 0
+        self.total_rows = None
+        self.started = time.monotonic()
+        self.started_at = timezone.now()
+        self.last_write = None
+        self.writes = 0
+
+    def start(self, total_rows=None):
+        self.total_rows = total_rows
+        self.started = time.monotonic()
+        self.started_at = timezone.now()
+        self._write()
+
+    def update(self, stage=None, rows_done=0, force=False, **counts):
+        """Ajouter des lignes aux compteurs ; l'écriture est limitée par l'intervalle"""
+        for name, value in counts.items():
+            self.counts[name] += value
+        self.rows_done += rows_done
+        if stage is not None:
+            self.stage = stage
+        if force or self.last_write is None or time.monotonic() - self.last_write >= self.interval:
+            self._write()
+
+    def finish(self, stage=STAGE_COMPLETED, **extra):
+        self.stage = stage
+        if stage == STAGE_COMPLETED:
+            self.total_rows = self.rows_done
+        self._write(**extra)
+
+    def snapshot(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.rows_done / elapsed if elapsed > 0 else 0
+        percent = eta = None
+        if self.stage == STAGE_COMPLETED:
+            percent, eta = 100.0, 0
+        elif self.total_rows:
+            # Estimation : le total n'est connu qu'approximativement avant la fin
+            percent = round(min(self.rows_done / self.total_rows * 100, 99.0), 1)
+            if rate:
+                eta = round(max(self.total_rows - self.rows_done, 0) / rate, 1)
+        return {
+            'stage': self.stage,
+            **self.counts,
+            'total_rows_estimate': self.total_rows,
+            'percent': percent,
+            'rows_per_second': round(rate, 1),
+            'eta_seconds': eta,
+            'elapsed_seconds': round(elapsed, 1),
+            'started_at': self.started_at.isoformat(),
+            'updated_at': timezone.now().isoformat(),
+        }
+
+    def _write(self, **extra):
+        self.last_write = time.monotonic()
+        self.writes += 1
+        progress = {**self.snapshot(), **extra}
+        self.raw_upload.progress = progress
+        RawFileUpload.objects.filter(pk=self.raw_upload.pk).update(progress=progress)
+
+
+# Diffusion
+
+KEEPALIVE_SECONDS = 15
+
+
+def progress_payload(raw_upload):
+    return {'id': raw_upload.id, 'status': raw_upload.status, **(raw_upload.progress or {})}
+
+
+def _event(name, payload):
+    return f'event: {name}\ndata: {json.dumps(payload, cls=DjangoJSONEncoder)}\n\n'
+
+
+def progress_events(upload_id, poll_interval=None, timeout=None):
+    """
+    Flux SSE de l'avancement d'un upload : un événement ``progress`` à chaque
+    changement, un commentaire keepalive sinon, puis ``end`` en fin de traitement.
+    Le flux est coupé après ETL_PROGRESS_STREAM_TIMEOUT secondes ; le navigateur
+    (EventSource) se reconnecte alors de lui-même.
+    """
+    poll_interval = settings.ETL_PROGRESS_INTERVAL if poll_interval is None else poll_interval
+    timeout = settings.ETL_PROGRESS_STREAM_TIMEOUT if timeout is None else timeout
+    started = last_sent = time.monotonic()
+    last = None
+    yield f'retry: {int(max(poll_interval, 1) * 1000)}\n\n'
+    while True:
+        raw_upload = RawFileUpload.objects.filter(pk=upload_id).only('id', 'status', 'progress').first()
+        if raw_upload is None:
+            yield _event('end', {'id': upload_id, 'status': None})
+            return
+        payload = progress_payload(raw_upload)
+        now = time.monotonic()
+        if payload != last:
+            yield _event('progress', payload)
+            last, last_sent = payload, now
+        elif now - last_sent >= KEEPALIVE_SECONDS:
+            yield ': keepalive\n\n'
+            last_sent = now
+        if raw_upload.status in (RawFileUpload.STATUS_COMPLETED, RawFileUpload.STATUS_FAILED):
+            yield _event('end', payload)
+            return
+        if now - started >= timeout:
+            return
+        time.sleep(poll_interval)
@@ -0,0 +1,244 @@
+"""
+Lecteurs en flux pour les fichiers ETL.
+
+Les fichiers sont produits par blocs (DataFrame) de taille fixe : la mémoire
+utilisée dépend de la taille des blocs et non de celle du fichier.
+"""
+import codecs
+import csv
+import itertools
+from datetime import date, datetime, time
+
+import pandas as pd
+from django.conf import settings
+from openpyxl import load_workbook
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    CalamineWorkbook = None
+
+# Taille de l'échantillon utilisé pour détecter l'encodage et le séparateur
+SNIFF_SIZE = 64 * 1024
+CSV_DELIMITERS = [',', ';', '\t', '|']
+
+
+def _detect_encoding(sample):
+    """Détecter l'encodage d'un échantillon d'octets (UTF-8 sinon Windows-1252)"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # Décodeur incrémental : tolère un caractère multi-octets coupé en fin d'échantillon
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode('cp1252')
+        return 'cp1252'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _detect_delimiter(text):
+    """Détecter le séparateur à partir des premières lignes d'un CSV"""
+    try:
+        return csv.Sniffer().sniff(text, delimiters=''.join(CSV_DELIMITERS)).delimiter
+    except csv.Error:
+        # Repli : le séparateur le plus fréquent sur la ligne d'en-tête
+        header = text.split('\n', 1)[0]
+        counts = {delimiter: header.count(delimiter) for delimiter in CSV_DELIMITERS}
+        delimiter = max(counts, key=counts.get)
+        return delimiter if counts[delimiter] else ','
+
+
+def sniff_csv(file_path, sample_size=SNIFF_SIZE):
+    """
+    Détecter une seule fois l'encodage et le séparateur d'un CSV
+    à partir de ses premiers Ko.
+    """
+    with open(file_path, 'rb') as handle:
+        sample = handle.read(sample_size)
+
+    encoding = _detect_encoding(sample)
+    text = sample.decode(encoding, errors='ignore')
+    if len(sample) == sample_size:
+        # La dernière ligne de l'échantillon est probablement tronquée
+        text = text.rsplit('\n', 1)[0]
+
+    return {
+        'encoding': encoding,
+        'delimiter': _detect_delimiter(text),
+    }
+
+
+def iter_csv_chunks(file_path, chunk_size, dialect=None, header_row=1):
+    """Lire un CSV par blocs de ``chunk_size`` lignes (en-tête sur la ligne ``header_row``)"""
+    dialect = dialect or sniff_csv(file_path)
+    with pd.read_csv(
+        file_path,
+        sep=dialect['delimiter'],
+        encoding=dialect['encoding'],
+        # L'encodage est détecté sur les premiers Ko : un octet invalide plus loin est remplacé
+        encoding_errors='replace',
+        header=header_row - 1,
+        chunksize=chunk_size
+    ) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def _header_names(values):
+    """Noms de colonnes à la manière de pandas : 'Unnamed: i' si vide, suffixe .n si doublon"""
+    names = []
+    seen = {}
+    for position, value in enumerate(values):
+        name = f'Unnamed: {position}' if value is None or str(value).strip() == '' else value
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _sheet_error(sheet_name, sheet_names):
+    return ValueError(f"Feuille introuvable: {sheet_name} (feuilles: {', '.join(sheet_names)})")
+
+
+def _openpyxl_rows(file_path, sheet_name):
+    """Lignes d'une feuille en flux (openpyxl read_only/values_only)"""
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if sheet_name and sheet_name not in workbook.sheetnames:
+            raise _sheet_error(sheet_name, workbook.sheetnames)
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _calamine_cell(value):
+    # Mêmes valeurs qu'openpyxl : calamine renvoie '' pour une cellule vide,
+    # des flottants pour les entiers et des dates sans heure
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if type(value) is date:
+        return datetime.combine(value, time())
+    return value
+
+
+def _calamine_rows(file_path, sheet_name):
+    """Lignes d'une feuille lues par calamine (Rust), aux mêmes positions qu'avec openpyxl"""
+    workbook = CalamineWorkbook.from_path(file_path)
+    try:
+        if sheet_name and sheet_name not in workbook.sheet_names:
+            raise _sheet_error(sheet_name, workbook.sheet_names)
+        sheet = workbook.get_sheet_by_name(sheet_name) if sheet_name else workbook.get_sheet_by_index(0)
+        # Les lignes sont numérotées depuis le haut de la feuille, mais les
+        # colonnes commencent à la première colonne non vide
+        padding = (None,) * (sheet.start or (0, 0))[1]
+        for row in sheet.iter_rows():
+            yield padding + tuple(_calamine_cell(value) for value in row)
+    finally:
+        workbook.close()
+
+
+def excel_engine():
+    """Moteur de lecture Excel (ETL_EXCEL_ENGINE) ; 'auto' : calamine s'il est installé"""
+    engine = settings.ETL_EXCEL_ENGINE
+    if engine == 'auto':
+        return 'calamine' if CalamineWorkbook is not None else 'openpyxl'
+    if engine == 'calamine' and CalamineWorkbook is None:
+        raise ValueError("Moteur Excel 'calamine' demandé mais python-calamine n'est pas installé")
+    return engine
+
+
+def iter_excel_chunks(file_path, chunk_size, sheet_name=None, header_row=1, engine=None):
+    """
+    Lire un classeur Excel (.xlsx) par blocs de ``chunk_size`` lignes.
+
+    - openpyxl en mode read_only/values_only lit la feuille en flux sans
+      construire le modèle objet des cellules : la mémoire dépend de la
+      taille des blocs ;
+    - calamine (optionnel) est plusieurs fois plus rapide mais garde la
+      feuille en mémoire native pendant la lecture.
+    Les lignes entièrement vides sont ignorées.
+    """
+    engine = engine or excel_engine()
+    sheet_rows = (_calamine_rows if engine == 'calamine' else _openpyxl_rows)(file_path, sheet_name)
+    try:
+        rows = itertools.islice(sheet_rows, header_row - 1, None)
+        header = next(rows, None)
+        if header is None:
+            return
+        # Colonnes vides en fin d'en-tête (dimensions de feuille mal renseignées)
+        width = len(header)
+        while width and header[width - 1] is None:
+            width -= 1
+        columns = _header_names(header[:width])
+
+        rows = (
+            row[:width] + (None,) * (width - len(row))
+            for row in rows
+            if any(value is not None for value in row[:width])
+        )
+        while True:
+            batch = list(itertools.islice(rows, chunk_size))
+            if not batch:
+                return
+            yield pd.DataFrame.from_records(batch, columns=columns, coerce_float=True)
+    finally:
+        # Fermer le classeur même si la lecture est interrompue
+        sheet_rows.close()
+
+
+def iter_legacy_excel_chunks(file_path, chunk_size, sheet_name=None, header_row=1):
+    """Classeurs .xls (format binaire non lu par openpyxl) : lecture complète par pandas"""
+    df = pd.read_excel(file_path, sheet_name=sheet_name or 0, header=header_row - 1)
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def iter_file_chunks(file_path, file_format, chunk_size, sheet_name=None, header_row=1):
+    """Lire un fichier CSV ou Excel par blocs"""
+    if file_format == 'CSV':
+        return iter_csv_chunks(file_path, chunk_size, header_row=header_row)
+    if file_format == 'EXCEL':
+        if str(file_path).lower().endswith('.xls'):
+            return iter_legacy_excel_chunks(file_path, chunk_size, sheet_name, header_row)
+        return iter_excel_chunks(file_path, chunk_size, sheet_name, header_row)
+    raise ValueError(f"Format non supporté: {file_format}")
+
+
+def estimate_rows(file_path, file_format, sheet_name=None, header_row=1):
+    """
+    Nombre approximatif de lignes de données, pour estimer l'avancement d'un traitement.
+
+    CSV : nombre de fins de ligne (lecture rapide en binaire) ; Excel : dimensions
+    déclarées de la feuille. None si l'estimation n'est pas possible.
+    """
+    try:
+        if file_format == 'CSV':
+            lines = 0
+            last = b'\n'
+            with open(file_path, 'rb') as source:
+                for block in iter(lambda: source.read(1024 * 1024), b''):
+                    lines += block.count(b'\n')
+                    last = block[-1:]
+            if last != b'\n':
+                lines += 1
+            return max(lines - header_row, 0)
+        if file_format == 'EXCEL' and not str(file_path).lower().endswith('.xls'):
+            workbook = load_workbook(file_path, read_only=True)
+            try:
+                sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+                return max(sheet.max_row - header_row, 0) if sheet.max_row else None
+            finally:
+                workbook.close()
+    except (OSError, KeyError, ValueError):
+        return None
+    return None
@@ -0,0 +1,67 @@
+"""
+Stockage des fichiers bruts adressé par leur contenu.
+
+Le SHA-256 est calculé pendant l'écriture sur disque ; le fichier est rangé
+sous etl/raw/<2 premiers caractères>/<sha256><extension> : un même contenu
+n'est stocké qu'une fois, quel que soit le nombre d'uploads qui le réfèrent.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import default_storage
+
+from apps.etl.models import RawFileUpload
+
+RAW_UPLOAD_DIR = 'etl/raw'
+# Options de lecture et d'ingestion : un même fichier traité autrement n'est pas un doublon
+DUPLICATE_OPTIONS = ('sheet_name', 'header_row', 'ingest_mode', 'natural_key')
+
+
+def store_upload(uploaded_file):
+    """Enregistrer un fichier uploadé ; retourne (nom dans le stockage, sha256)"""
+    directory = default_storage.path(RAW_UPLOAD_DIR)
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.part', delete=False) as output:
+        try:
+            for chunk in uploaded_file.chunks():
+                digest.update(chunk)
+                output.write(chunk)
+        except BaseException:
+            output.close()
+            os.remove(output.name)
+            raise
+
+    content_hash = digest.hexdigest()
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    name = f'{RAW_UPLOAD_DIR}/{content_hash[:2]}/{content_hash}{extension}'
+    path = default_storage.path(name)
+    if os.path.exists(path):
+        # Contenu déjà stocké : la copie temporaire est abandonnée
+        os.remove(output.name)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(output.name, path)
+    return name, content_hash
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_duplicate(category, content_hash, options, exclude_pk=None):
+    """Dernier upload non échoué du même contenu, dans la même catégorie et avec les mêmes options"""
+    if not content_hash:
+        return None
+    duplicates = RawFileUpload.objects.filter(
+        category=category, content_hash=content_hash,
+        **{field: options.get(field, RawFileUpload._meta.get_field(field).get_default()) for field in DUPLICATE_OPTIONS}
+    ).exclude(status=RawFileUpload.STATUS_FAILED)
+    if exclude_pk is not None:
+        duplicates = duplicates.exclude(pk=exclude_pk)
+    return duplicates.order_by('-uploaded_at', '-id').first()
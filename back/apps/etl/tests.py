@@ -1,3 +1,576 @@
-from django.test import TestCase
+"""
+Tests unitaires pour le traitement ETL
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.dashboard.stats import rebuild_counters
+from apps.datacatalog.models import Category, DataPoint, Indicator
+from apps.datacatalog.search import search_indicators
+from apps.etl.models import RawFileUpload, UploadBatch
+from apps.etl.services import jobs
+from apps.etl.services.cleaning import CleaningPipeline
+from apps.etl.services.columnar import COLUMNAR_AVAILABLE, read_preview
+from apps.etl.services.metrics import current_rss_mb
+from apps.etl.services.processor import ETLProcessor
+from apps.etl.services.readers import SNIFF_SIZE, CalamineWorkbook, iter_csv_chunks, iter_excel_chunks, sniff_csv
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+PRIVATE_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PRIVATE_MEDIA_ROOT=PRIVATE_MEDIA_ROOT)
+class ETLProcessorTestCase(TestCase):
+    """Tests pour le service ETLProcessor"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(PRIVATE_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='admin@ins.org',
+            email='admin@ins.org',
+            password='testpass123',
+            role=User.IS_ADMIN
+        )
+        self.category = Category.objects.create(name='Santé')
+
+    def _create_upload(self, content, name='data.csv', file_format='CSV', encoding='utf-8'):
+        return RawFileUpload.objects.create(
+            file=SimpleUploadedFile(name, content.encode(encoding)),
+            file_name=name,
+            file_format=file_format,
+            category=self.category,
+            uploaded_by=self.admin_user,
+            status=RawFileUpload.STATUS_PROCESSING,
+            processing_started_at=timezone.now()
+        )
+
+    def test_bulk_insert_in_batches(self):
+        """Test l'insertion par lots et les statistiques de l'upload"""
+        rows = '\n'.join(f'Indicateur {i}, Description {i}' for i in range(25))
+        raw_upload = self._create_upload(f'nom,description\n{rows}\n , vide\n')
+
+        rebuild_counters()
+        result = ETLProcessor(raw_upload, batch_size=10).process()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(rebuild_counters(), {})
+        self.assertEqual(Indicator.objects.filter(category=self.category).count(), 25)
+        # Les indicateurs insérés en masse sont indexés pour la recherche
+        self.assertEqual(search_indicators(Indicator.objects.all(), 'indicateur 7').get().title, 'Indicateur 7')
+        self.assertEqual([timing['rows'] for timing in result['batch_timings']], [10, 10, 5])
+
+        raw_upload.refresh_from_db()
+        self.assertEqual(raw_upload.status, RawFileUpload.STATUS_COMPLETED)
+        self.assertEqual(raw_upload.total_rows, 26)
+        self.assertEqual(raw_upload.processed_rows, 25)
+        self.assertEqual(raw_upload.failed_rows, 1)
+
+    def test_upsert_reingestion(self):
+        """Test la ré-ingestion en mode upsert : seules les lignes modifiées sont réécrites"""
+        raw_upload = self._create_upload('nom,description,2020\nTaux A,Alpha,1\nTaux B,Beta,2\nTaux C,Gamma,3\n')
+        self.assertTrue(ETLProcessor(raw_upload).process()['success'])
+        first_ids = dict(Indicator.objects.values_list('title', 'id'))
+        rebuild_counters()
+
+        refresh = self._create_upload(
+            'nom,description,2020\ntaux  a,Alpha,1\nTaux B,Beta révisé,2\nTaux C,Gamma,30\nTaux D,Delta,4\nTaux D,Delta bis,5\n'
+        )
+        refresh.ingest_mode = RawFileUpload.MODE_UPSERT
+        refresh.save()
+        result = ETLProcessor(refresh, visibility='PRIVATE').process()
+
+        self.assertTrue(result['success'])
+        self.assertEqual((result['inserted'], result['updated'], result['unchanged']), (1, 3, 0))
+        self.assertIn('1 doublons de clé ignorés', result['message'])
+        self.assertEqual(Indicator.objects.count(), 4)
+        self.assertEqual(rebuild_counters(), {})
+        beta = Indicator.objects.get(pk=first_ids['Taux B'])
+        # L'indicateur reste rattaché à l'upload qui l'a créé
+        self.assertEqual((beta.description, beta.source_upload_id, beta.last_upload_id), ('Beta révisé', raw_upload.id, refresh.id))
+        self.assertEqual(DataPoint.objects.get(indicator_id=first_ids['Taux C']).value, 30)
+        self.assertEqual(Indicator.objects.get(natural_key='taux d').description, 'Delta bis')
+
+        # Même fichier une seconde fois : rien n'est réécrit
+        again = self._create_upload('nom,description,2020\ntaux  a,Alpha,1\nTaux B,Beta révisé,2\n')
+        again.ingest_mode = RawFileUpload.MODE_UPSERT
+        again.save()
+        result = ETLProcessor(again, visibility='PRIVATE').process()
+        self.assertEqual((result['inserted'], result['updated'], result['unchanged']), (0, 0, 2))
+        self.assertEqual(Indicator.objects.get(pk=first_ids['Taux B']).data_version, 2)
+
+        # Un job terminé n'est pas repris : ses données sont conservées
+        self.assertEqual(jobs.requeue([refresh.id], 'Reprise'), (0, 0))
+        self.assertEqual(Indicator.objects.count(), 4)
+        # Reprise du job de mise à jour interrompu : seuls les indicateurs qu'il a créés sont supprimés
+        RawFileUpload.objects.filter(pk=refresh.id).update(status=RawFileUpload.STATUS_PROCESSING)
+        jobs.requeue([refresh.id], 'Reprise')
+        self.assertEqual(set(Indicator.objects.values_list('id', flat=True)), set(first_ids.values()))
+
+    def test_upsert_rolls_back_hash_without_datapoints(self):
+        """Test qu'une empreinte n'est pas enregistrée si ses points n'ont pu être recréés"""
+        raw_upload = self._create_upload('nom,description,2020\nTaux A,Alpha,1\n')
+        self.assertTrue(ETLProcessor(raw_upload).process()['success'])
+        before = Indicator.objects.get().row_hash
+
+        refresh = self._create_upload('nom,description,2020\nTaux A,Alpha,10\n')
+        refresh.ingest_mode = RawFileUpload.MODE_UPSERT
+        refresh.save()
+        with mock.patch.object(DataPoint.objects, 'bulk_create', side_effect=RuntimeError('échec')):
+            self.assertFalse(ETLProcessor(refresh).process()['success'])
+
+        self.assertEqual(Indicator.objects.get().row_hash, before)
+        self.assertEqual(DataPoint.objects.get().value, 1)
+
+    def test_upsert_natural_key_column(self):
+        """Test la clé naturelle choisie par son en-tête d'origine (normalisé par le nettoyage)"""
+        raw_upload = self._create_upload('Code,nom,2020\nA1,Taux A,1\nB2,Taux B,2\n')
+        raw_upload.ingest_mode = RawFileUpload.MODE_UPSERT
+        raw_upload.natural_key = 'Code'
+        raw_upload.save()
+        self.assertTrue(ETLProcessor(raw_upload).process()['success'])
+        self.assertEqual(sorted(Indicator.objects.values_list('natural_key', flat=True)), ['a1', 'b2'])
+
+    def test_streaming_csv_with_sniffed_dialect(self):
+        """Test la lecture par blocs d'un CSV Windows-1252 séparé par des points-virgules"""
+        rows = '\n'.join(f'Région {i};Taux d\'accès {i}' for i in range(7))
+        raw_upload = self._create_upload(f'Libellé;Définition\n{rows}\n', encoding='cp1252')
+
+        self.assertEqual(sniff_csv(raw_upload.file.path), {'encoding': 'cp1252', 'delimiter': ';'})
+
+        result = ETLProcessor(raw_upload, chunk_size=3).process()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['total_rows'], 7)
+        self.assertEqual(result['processed_rows'], 7)
+        self.assertEqual(len(result['batch_timings']), 3)
+        self.assertTrue(Indicator.objects.filter(title='Région 6', description="Taux d'accès 6").exists())
+
+    def test_csv_invalid_byte_after_sniff_sample(self):
+        """Test la lecture d'un CSV UTF-8 contenant un octet invalide au-delà de l'échantillon de détection"""
+        rows = b''.join(b'Taux %d,Ligne %d\n' % (i, i) for i in range(SNIFF_SIZE // 10))
+        raw_upload = self._create_upload('')
+        with open(raw_upload.file.path, 'wb') as handle:
+            handle.write(b'nom,description\n' + rows + b'Taux final,D\xe9c\xe8s\n')
+
+        self.assertEqual(sniff_csv(raw_upload.file.path)['encoding'], 'utf-8')
+        chunks = list(iter_csv_chunks(raw_upload.file.path, chunk_size=5000))
+
+        self.assertEqual(chunks[-1]['description'].iloc[-1], 'D\ufffdc\ufffds')
+
+    def test_category_cleaning_steps(self):
+        """Test l'application des étapes de nettoyage configurées sur la catégorie"""
+        self.category.cleaning_steps = [
+            {'step': 'trim_whitespace', 'empty_as_null': True},
+            'drop_empty_rows',
+            {'step': 'normalize_headers', 'strip_accents': True},
+        ]
+        self.category.save()
+        raw_upload = self._create_upload('Nom ,Définition\n  Taux brut  , Décès \n , \n')
+
+        result = ETLProcessor(raw_upload).process()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['processed_rows'], 1)
+        self.assertTrue(Indicator.objects.filter(title='Taux brut', description='Décès').exists())
+
+    def test_datapoints_from_period_columns(self):
+        """Test l'extraction des colonnes-périodes et des variables du format long"""
+        raw_upload = self._create_upload(
+            'indicateur,description,région,2019,2020,2021-T1\n'
+            'Taux de scolarisation,Primaire,Dakar,81.5,83,\n'
+            'Taux de scolarisation,Primaire,Thiès,74,76.5,77\n'
+        )
+        result = ETLProcessor(raw_upload).process()
+        self.assertTrue(result['success'])
+        self.assertEqual(result['datapoints'], 5)
+        points = DataPoint.objects.filter(indicator__source_upload=raw_upload, region='Thiès')
+        self.assertEqual(
+            [(point.period_label, point.value) for point in points],
+            [('2019', 74.0), ('2020', 76.5), ('2021-T1', 77.0)]
+        )
+        
+        raw_upload = self._create_upload('nom,description,année,valeur\nNaissances,Total,2018,1200\n')
+        result = ETLProcessor(raw_upload).process()
+        point = DataPoint.objects.get(indicator__source_upload=raw_upload)
+        self.assertEqual((point.variable, point.period.year, point.value), ('valeur', 2018, 1200.0))
+
+    def test_excel_sheet_and_header_row(self):
+        """Test la lecture Excel en flux d'une feuille choisie avec l'en-tête sur la deuxième ligne"""
+        workbook = Workbook()
+        workbook.active.title = 'Notes'
+        sheet = workbook.create_sheet('Données')
+        sheet.append(['Annuaire statistique'])
+        sheet.append(['nom', 'description', 'date'])
+        sheet.append(['Naissances', 'Total', date(2020, 1, 1)])
+        sheet.append([])
+        sheet.append(['Décès', 'Total', None])
+        content = io.BytesIO()
+        workbook.save(content)
+        raw_upload = RawFileUpload.objects.create(
+            file=SimpleUploadedFile('annuaire.xlsx', content.getvalue()),
+            file_name='annuaire.xlsx',
+            file_format='EXCEL',
+            sheet_name='Données',
+            header_row=2,
+            category=self.category,
+            uploaded_by=self.admin_user,
+            status=RawFileUpload.STATUS_PROCESSING,
+            processing_started_at=timezone.now()
+        )
+
+        engines = ['openpyxl'] + (['calamine'] if CalamineWorkbook is not None else [])
+        for engine in engines:
+            with self.subTest(engine=engine):
+                chunks = list(iter_excel_chunks(raw_upload.file.path, 1, 'Données', 2, engine=engine))
+                self.assertEqual([len(chunk) for chunk in chunks], [1, 1])
+                self.assertEqual(chunks[0].columns.tolist(), ['nom', 'description', 'date'])
+                self.assertEqual(chunks[0]['date'].iloc[0], pd.Timestamp(2020, 1, 1))
+
+        result = ETLProcessor(raw_upload).process()
+
+        self.assertTrue(result['success'])
+        self.assertEqual(
+            sorted(Indicator.objects.filter(source_upload=raw_upload).values_list('title', flat=True)),
+            ['Décès', 'Naissances']
+        )
+
+        raw_upload.sheet_name = 'Inconnue'
+        result = ETLProcessor(raw_upload).process()
+        self.assertFalse(result['success'])
+        self.assertIn('Feuille introuvable', result['error'])
+
+    @skipUnless(COLUMNAR_AVAILABLE, 'pyarrow non installé')
+    def test_columnar_copy_of_cleaned_data(self):
+        """Test l'écriture du fichier colonnaire, avec élargissement des types entre blocs"""
+        raw_upload = self._create_upload('nom,valeur,code\nA,1,x\nB,2,y\nC,2.5,3\nD,,z\n')
+
+        result = ETLProcessor(raw_upload, chunk_size=2).process()
+
+        self.assertTrue(result['success'])
+        raw_upload.refresh_from_db()
+        preview = read_preview(raw_upload.columnar_file.path, ['valeur', 'code'], limit=3)
+        self.assertEqual(preview['columns'], [{'name': 'valeur', 'type': 'double'}, {'name': 'code', 'type': 'string'}])
+        self.assertEqual(preview['total_rows'], 4)
+        self.assertEqual(preview['rows'], [
+            {'valeur': 1.0, 'code': 'x'}, {'valeur': 2.0, 'code': 'y'}, {'valeur': 2.5, 'code': '3'}
+        ])
+
+    def test_empty_file_fails(self):
+        """Test qu'un fichier sans données est rejeté"""
+        raw_upload = self._create_upload('nom,description\n')
+
+        result = ETLProcessor(raw_upload).process()
+
+        self.assertFalse(result['success'])
+        self.assertIn('Le fichier est vide', result['error'])
+
+
+class CleaningPipelineTestCase(SimpleTestCase):
+    """Tests pour les étapes de nettoyage vectorisées"""
+
+    def test_default_steps(self):
+        """Test le nettoyage par défaut sans modifier le bloc d'origine"""
+        df = pd.DataFrame({' Nom ': ['  a ', None, 3], 'Valeur': [' 1 ', None, 2.5]})
+
+        cleaned = CleaningPipeline().run(df)
+
+        self.assertEqual(list(cleaned.columns), ['nom', 'valeur'])
+        self.assertEqual(cleaned['nom'].tolist(), ['a', 3])
+        self.assertEqual(cleaned['valeur'].tolist(), ['1', 2.5])
+        self.assertEqual(df[' Nom '].tolist()[0], '  a ')
+
+    def test_numeric_and_date_coercion(self):
+        """Test la conversion des nombres au format français et des dates"""
+        df = pd.DataFrame({
+            'date': ['31/01/2023', '28/02/2023'],
+            'population': ['1 234,5', '12'],
+            'region': ['Dakar', 'Thiès'],
+        })
+
+        cleaned = CleaningPipeline(['coerce_numeric', 'parse_dates']).run(df)
+
+        self.assertEqual(cleaned['population'].tolist(), [1234.5, 12.0])
+        self.assertEqual(cleaned['date'].dt.month.tolist(), [1, 2])
+        self.assertEqual(cleaned['region'].tolist(), ['Dakar', 'Thiès'])
+
+    def test_numeric_coercion_mixed_column(self):
+        """Test la conversion d'une colonne mêlant nombres déjà lus et texte"""
+        df = pd.DataFrame({'valeur': [5, 7.5, '1 234,5']})
+
+        cleaned = CleaningPipeline([{'step': 'coerce_numeric', 'columns': ['valeur']}]).run(df)
+
+        self.assertEqual(cleaned['valeur'].tolist(), [5.0, 7.5, 1234.5])
+
+    def test_invalid_configuration(self):
+        """Test le rejet des étapes inconnues ou mal configurées"""
+        with self.assertRaises(ValueError):
+            CleaningPipeline(['unknown_step'])
+        with self.assertRaises(ValueError):
+            CleaningPipeline([{'step': 'trim_whitespace', 'unknown_option': True}])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PRIVATE_MEDIA_ROOT=PRIVATE_MEDIA_ROOT, ETL_JOB_MAX_ATTEMPTS=2)
+class ETLJobQueueTestCase(APITestCase):
+    """Tests pour la file d'attente des traitements ETL"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username='admin@ins.org',
+            email='admin@ins.org',
+            password='testpass123',
+            role=User.IS_ADMIN,
+            is_staff=True
+        )
+        self.category = Category.objects.create(name='Éducation')
+        self.client.force_authenticate(user=self.admin_user)
+
+    def _upload(self):
+        response = self.client.post('/api/etl/upload/', {
+            'file': SimpleUploadedFile('ecoles.csv', b'nom,description\nEcoles,Nombre\nEleves,Effectifs\n'),
+            'file_format': 'CSV',
+            'category_id': self.category.id,
+            'visibility': 'PUBLIC'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response.data['job_id']
+
+    def test_upload_is_queued_then_processed(self):
+        """Test que l'upload est mis en file puis traité par le worker"""
+        job_id = self._upload()
+        self.assertEqual(RawFileUpload.objects.get(pk=job_id).status, RawFileUpload.STATUS_PENDING)
+        self.assertEqual(Indicator.objects.count(), 0)
+
+        self.assertEqual(jobs.claim_jobs(5), [job_id])
+        self.assertEqual(jobs.claim_jobs(5), [])
+
+        result = jobs.run_job(job_id)
+
+        self.assertTrue(result['success'])
+        raw_upload = RawFileUpload.objects.get(pk=job_id)
+        self.assertEqual(raw_upload.status, RawFileUpload.STATUS_COMPLETED)
+        self.assertEqual(raw_upload.attempts, 1)
+        self.assertEqual(
+            set(raw_upload.indicators.values_list('visibility', flat=True)),
+            {Indicator.VISIBILITY_PUBLIC}
+        )
+
+    def test_progress_endpoint_and_event_stream(self):
+        """Test l'avancement publié pendant le traitement, en JSON et en SSE"""
+        job_id = self._upload()
+        jobs.claim_jobs(1)
+        jobs.run_job(job_id)
+
+        response = self.client.get(f'/api/etl/uploads/{job_id}/progress/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], RawFileUpload.STATUS_COMPLETED)
+        self.assertEqual(response.data['stage'], 'completed')
+        self.assertEqual((response.data['rows_read'], response.data['rows_inserted']), (2, 2))
+        self.assertEqual((response.data['percent'], response.data['eta_seconds']), (100.0, 0))
+
+        response = self.client.get(f'/api/etl/uploads/{job_id}/progress/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = b''.join(response.streaming_content).decode()
+        self.assertIn('event: progress\ndata: {"id": %d, "status": "COMPLETED"' % job_id, events)
+        self.assertTrue(events.rstrip().startswith('retry:'))
+        self.assertIn('event: end', events)
+
+    def test_stage_metrics_and_endpoint(self):
+        """Test les mesures par étape d'un job et leur agrégation sur /api/etl/metrics/"""
+        job_id = self._upload()
+        jobs.claim_jobs(1)
+        jobs.run_job(job_id)
+
+        metrics = RawFileUpload.objects.get(pk=job_id).metrics
+        self.assertEqual(list(metrics['stages']), ['read', 'clean', 'validate', 'columnar', 'insert', 'output'])
+        self.assertEqual(metrics['stages']['read']['rows'], 2)
+        self.assertGreater(metrics['stages']['insert']['queries'], 0)
+        self.assertEqual(metrics['stages']['validate']['queries'], 0)
+        if current_rss_mb() is not None:
+            # Mémoire courante du processus par étape (et non le pic ru_maxrss de toute sa vie)
+            self.assertGreater(metrics['stages']['read']['rss_mb'], 0)
+            self.assertGreaterEqual(metrics['stages']['read']['rss_delta_mb'], 0)
+            self.assertEqual(metrics['rss_mb'], max(stats['rss_mb'] for stats in metrics['stages'].values()))
+
+        response = self.client.get('/api/etl/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['jobs'], 1)
+        insert = response.data['stages']['insert']
+        self.assertEqual(insert['queries']['p50'], metrics['stages']['insert']['queries'])
+        self.assertEqual(set(insert['wall_seconds']), {'p50', 'p95', 'max'})
+
+        response = self.client.get('/api/etl/metrics/', {'limit': 'tous'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_output_file_generated_once_and_served_with_ranges(self):
+        """Test le classeur de sortie enregistré en fin de job et son téléchargement (ETag, Range)"""
+        job_id = self._upload()
+        jobs.claim_jobs(1)
+        jobs.run_job(job_id)
+        raw_upload = RawFileUpload.objects.get(pk=job_id)
+        self.assertEqual(raw_upload.output_file.name, f'etl/output/etl_output_{job_id}.xlsx')
+        # Hors de MEDIA_ROOT : pas d'URL publique sous /media/
+        self.assertTrue(raw_upload.output_file.path.startswith(PRIVATE_MEDIA_ROOT))
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, raw_upload.output_file.name)))
+
+        url = f'/api/etl/uploads/{job_id}/download/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content)
+        sheet = load_workbook(io.BytesIO(content)).active
+        self.assertEqual(
+            [row[:4] for row in sheet.iter_rows(values_only=True)],
+            [('Title', 'Description', 'Category', 'Status'),
+             ('Ecoles', 'Nombre', 'Éducation', 'Créé'), ('Eleves', 'Effectifs', 'Éducation', 'Créé')]
+        )
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), content[:4])
+        self.assertEqual(response['Content-Range'], f'bytes 0-3/{len(content)}')
+
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(content)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_batch_upload_with_zip_and_category_mapping(self):
+        """Test l'envoi d'un lot (fichiers + zip), sa répartition équitable dans la file et son rapport"""
+        health = Category.objects.create(name='Santé')
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as bundle:
+            bundle.writestr('regions/sante_thies.csv', 'nom,description\nPaludisme,Cas\n')
+            bundle.writestr('regions/notes.txt', 'à lire')
+            bundle.writestr('__MACOSX/regions/._sante_thies.csv', 'x')
+        response = self.client.post('/api/etl/batches/', {
+            'files': [
+                SimpleUploadedFile('dakar.csv', b'nom,description\nClasses,Nombre\n'),
+                SimpleUploadedFile('regions.zip', archive.getvalue()),
+            ],
+            'category_id': self.category.id,
+            'categories': json.dumps({'sante_*.csv': health.id}),
+            'visibility': 'PUBLIC'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['files'], 2)
+        self.assertEqual(response.data['skipped'], [{'file_name': 'notes.txt', 'reason': 'Format non supporté'}])
+        self.assertEqual(
+            [(upload['file_name'], upload['category']) for upload in response.data['uploads']],
+            [('dakar.csv', 'Éducation'), ('sante_thies.csv', 'Santé')]
+        )
+        batch_id = response.data['id']
+        batch_jobs = [upload['id'] for upload in response.data['uploads']]
+
+        # Un upload envoyé après le lot n'attend pas la fin de tout le lot
+        single_job = self._upload()
+        claimed = jobs.claim_jobs(2)
+        self.assertEqual(claimed, [batch_jobs[0], single_job])
+        for job_id in claimed + jobs.claim_jobs(5):
+            jobs.run_job(job_id)
+
+        report = self.client.get(f'/api/etl/batches/{batch_id}/').data
+        self.assertEqual((report['status'], report['completed'], report['processed_rows']), ('COMPLETED', 2, 2))
+        self.assertIsNotNone(report['wall_seconds'])
+
+        response = self.client.post('/api/etl/batches/', {
+            'files': [SimpleUploadedFile('inconnu.csv', b'nom\nX\n')]
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['unmapped'], ['inconnu.csv'])
+
+        # Visibilité invalide : rien n'est écrit
+        batches = UploadBatch.objects.count()
+        response = self.client.post('/api/etl/batches/', {
+            'files': [SimpleUploadedFile('dakar.csv', b'nom\nX\n')],
+            'category_id': self.category.id,
+            'visibility': 'SECRET'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UploadBatch.objects.count(), batches)
+
+    def test_stale_job_is_requeued_then_failed(self):
+        """Test la reprise des jobs bloqués en PROCESSING après un plantage"""
+        job_id = self._upload()
+        long_ago = timezone.now() - timedelta(hours=1)
+        rebuild_counters()
+
+        jobs.claim_jobs(1)
+        for title in ('Partiel', 'Partiel public'):
+            Indicator.objects.create(
+                title=title, description='', category=self.category, source_upload_id=job_id,
+                visibility=Indicator.VISIBILITY_PUBLIC if 'public' in title else Indicator.VISIBILITY_PRIVATE
+            )
+        RawFileUpload.objects.filter(pk=job_id).update(heartbeat_at=long_ago)
+
+        self.assertEqual(jobs.recover_stale_jobs(60), (1, 0))
+        self.assertEqual(RawFileUpload.objects.get(pk=job_id).status, RawFileUpload.STATUS_PENDING)
+        self.assertFalse(Indicator.objects.filter(source_upload_id=job_id).exists())
+        self.assertEqual(search_indicators(Indicator.objects.all(), 'partiel').count(), 0)
+        self.assertEqual(rebuild_counters(), {})
+
+        jobs.claim_jobs(1)
+        RawFileUpload.objects.filter(pk=job_id).update(heartbeat_at=long_ago)
+
+        self.assertEqual(jobs.recover_stale_jobs(60), (0, 1))
+        self.assertEqual(RawFileUpload.objects.get(pk=job_id).status, RawFileUpload.STATUS_FAILED)
+        # Les transitions faites par QuerySet.update() sont reportées sur les compteurs
+        self.assertEqual(rebuild_counters(), {})
+
+    def test_identical_upload_is_deduplicated(self):
+        """Test qu'un contenu déjà importé renvoie au job existant, sauf force=true"""
+        job_id = self._upload()
+        raw_upload = RawFileUpload.objects.get(pk=job_id)
+        self.assertEqual(len(raw_upload.content_hash), 64)
+        self.assertIn(raw_upload.content_hash, raw_upload.file.name)
+
+        response = self.client.post('/api/etl/upload/', {
+            'file': SimpleUploadedFile('copie.csv', b'nom,description\nEcoles,Nombre\nEleves,Effectifs\n'),
+            'category_id': self.category.id
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['duplicate'])
+        self.assertEqual(response.data['job_id'], job_id)
+        self.assertEqual(RawFileUpload.objects.count(), 1)
+
+        # Même contenu lu ou ingéré autrement : nouveau job
+        response = self.client.post('/api/etl/upload/', {
+            'file': SimpleUploadedFile('copie.csv', b'nom,description\nEcoles,Nombre\nEleves,Effectifs\n'),
+            'category_id': self.category.id,
+            'ingest_mode': 'UPSERT'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        RawFileUpload.objects.filter(pk=response.data['job_id']).delete()
+
+        response = self.client.post('/api/etl/upload/', {
+            'file': SimpleUploadedFile('copie.csv', b'nom,description\nEcoles,Nombre\nEleves,Effectifs\n'),
+            'category_id': self.category.id,
+            'force': 'true'
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        forced = RawFileUpload.objects.get(pk=response.data['job_id'])
+        # Le contenu n'est stocké qu'une fois
+        self.assertEqual(forced.file.name, raw_upload.file.name)
@@ -1,12 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RawFileUploadViewSet, ETLUploadView, DirectUploadView
+from .views import RawFileUploadViewSet, UploadBatchViewSet, ETLUploadView, DirectUploadView, ETLMetricsView
 
 router = DefaultRouter()
 router.register(r'uploads', RawFileUploadViewSet, basename='raw-file-upload')
+router.register(r'batches', UploadBatchViewSet, basename='upload-batch')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('upload/', ETLUploadView.as_view(), name='etl-upload'),
     path('direct-upload/', DirectUploadView.as_view(), name='direct-upload'),
+    path('metrics/', ETLMetricsView.as_view(), name='etl-metrics'),
 ]
\ No newline at end of file
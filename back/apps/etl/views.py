@@ -1,21 +1,77 @@
 from rest_framework import viewsets, views, parsers, response, status, permissions
 from rest_framework.decorators import action
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.http import FileResponse
+from django.http import StreamingHttpResponse
+import json
 import logging
 
-from .models import RawFileUpload
+from .downloads import ranged_file_response
+from .models import RawFileUpload, UploadBatch
 from .serializers import (
     RawFileUploadSerializer, RawFileUploadCreateSerializer,
     RawFileUploadDetailSerializer, RawFileUploadListSerializer
 )
+from .services import jobs
+from .services.batches import batch_report, expand_files, file_format_for, prefetch_batch_uploads, resolve_category
+from .services.columnar import PREVIEW_MAX_ROWS, PREVIEW_ROWS, ensure_indicator_columnar, read_preview
+from .services.metrics import aggregate_metrics
 from .services.processor import ETLProcessor
+from .services.progress import progress_events, progress_payload
+from .services.storage import DUPLICATE_OPTIONS, find_duplicate, store_upload
 from apps.accounts.permissions import IsAdmin
+from apps.datacatalog.renderers import EventStreamRenderer
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _is_forced(request):
+    """Paramètre force : retraiter même si un contenu identique a déjà été importé"""
+    return str(request.data.get('force', request.query_params.get('force', ''))).lower() in ('1', 'true', 'yes')
+
+
+def _upload_options(request):
+    """Options de traitement communes aux uploads (ValueError si invalides)"""
+    # Feuille Excel et ligne d'en-tête (optionnelles)
+    try:
+        header_row = int(request.data.get('header_row') or 1)
+    except ValueError:
+        header_row = 0
+    if header_row < 1:
+        raise ValueError('La ligne d\'en-tête doit être un entier positif')
+    # Ingestion : ajout (défaut) ou upsert par clé naturelle (colonne optionnelle)
+    ingest_mode = str(request.data.get('ingest_mode') or RawFileUpload.MODE_APPEND).upper()
+    if ingest_mode not in dict(RawFileUpload.MODE_CHOICES):
+        raise ValueError('Mode d\'ingestion invalide (APPEND ou UPSERT)')
+    return {
+        # Visibilité des indicateurs créés (PUBLIC ou PRIVATE)
+        'visibility': request.data.get('visibility', 'PRIVATE'),
+        'sheet_name': request.data.get('sheet_name', ''),
+        'header_row': header_row,
+        'ingest_mode': ingest_mode,
+        'natural_key': request.data.get('natural_key', ''),
+    }
+
+
+def _duplicate_response(duplicate):
+    return response.Response({
+        'id': duplicate.id,
+        'job_id': duplicate.id,
+        'file_name': duplicate.file_name,
+        'status': duplicate.status,
+        'duplicate': True,
+        'message': 'Fichier identique déjà importé dans cette catégorie (force=true pour le retraiter)',
+        'status_url': f'/api/etl/uploads/{duplicate.id}/',
+        'progress_url': f'/api/etl/uploads/{duplicate.id}/progress/',
+        'output_file': f'/api/etl/uploads/{duplicate.id}/download/'
+    }, status=status.HTTP_200_OK)
+
+
 class RawFileUploadViewSet(viewsets.ModelViewSet):
     """ViewSet pour la gestion des uploads de fichiers bruts"""
     queryset = RawFileUpload.objects.all()
@@ -32,12 +88,13 @@ class RawFileUploadViewSet(viewsets.ModelViewSet):
         return RawFileUploadSerializer
     
     def perform_create(self, serializer):
-        """Créer un nouvel upload"""
-        serializer.save(uploaded_by=self.request.user)
+        """Créer un nouvel upload (fichier stocké par contenu)"""
+        name, content_hash = store_upload(serializer.validated_data['file'])
+        serializer.save(uploaded_by=self.request.user, file=name, content_hash=content_hash)
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def process(self, request, pk=None):
-        """Traiter un fichier brut et créer les indicateurs"""
+        """Placer un fichier brut en file d'attente de traitement"""
         raw_upload = self.get_object()
         
         if raw_upload.status != RawFileUpload.STATUS_PENDING:
@@ -52,46 +109,36 @@ class RawFileUploadViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            # Marquer comme en traitement
-            raw_upload.status = RawFileUpload.STATUS_PROCESSING
-            raw_upload.processing_started_at = timezone.now()
-            raw_upload.save()
-            
-            # Traiter le fichier avec le service ETL
-            processor = ETLProcessor(raw_upload)
-            result = processor.process()
-            
-            if result['success']:
-                return response.Response({
-                    'status': 'completed',
-                    'message': result['message'],
-                    'id': raw_upload.id,
-                    'total_rows': result['total_rows'],
-                    'processed_rows': result['processed_rows'],
-                    'failed_rows': result['failed_rows'],
-                    'output_file': f'/api/etl/uploads/{raw_upload.id}/download/'
-                }, status=status.HTTP_200_OK)
-            else:
-                return response.Response(
-                    {'error': result['error']},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        
-        except Exception as e:
-            raw_upload.status = RawFileUpload.STATUS_FAILED
-            raw_upload.error_message = str(e)
-            raw_upload.processing_completed_at = timezone.now()
-            raw_upload.save()
-            
+        if raw_upload.queued_at:
             return response.Response(
-                {'error': f'Erreur lors du traitement: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Fichier déjà en file d\'attente'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not _is_forced(request):
+            duplicate = find_duplicate(
+                raw_upload.category_id, raw_upload.content_hash,
+                {field: getattr(raw_upload, field) for field in DUPLICATE_OPTIONS}, exclude_pk=raw_upload.pk
             )
+            if duplicate:
+                return _duplicate_response(duplicate)
+        
+        # Le traitement est effectué par le worker ETL (python manage.py etl_worker)
+        jobs.enqueue(raw_upload, visibility=request.data.get('visibility'))
+        
+        return response.Response({
+            'status': 'queued',
+            'message': 'Fichier mis en file d\'attente pour traitement',
+            'id': raw_upload.id,
+            'job_id': raw_upload.id,
+            'status_url': f'/api/etl/uploads/{raw_upload.id}/',
+            'progress_url': f'/api/etl/uploads/{raw_upload.id}/progress/',
+            'output_file': f'/api/etl/uploads/{raw_upload.id}/download/'
+        }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def download(self, request, pk=None):
-        """Télécharger le fichier de sortie XLS"""
+        """Télécharger le fichier de sortie XLS (généré en fin de traitement ; ETag et Range)"""
         raw_upload = self.get_object()
         
         if raw_upload.status != RawFileUpload.STATUS_COMPLETED:
@@ -101,14 +148,16 @@ class RawFileUploadViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            # Générer le fichier XLS
-            processor = ETLProcessor(raw_upload)
-            output_file = processor._generate_output_file()
+            if not raw_upload.output_file or not raw_upload.output_file.storage.exists(raw_upload.output_file.name):
+                # Jobs traités avant l'enregistrement du fichier de sortie : généré une seule fois
+                ETLProcessor(raw_upload)._generate_output_file()
+                raw_upload.save(update_fields=['output_file'])
             
-            return FileResponse(
-                output_file.open('rb'),
-                as_attachment=True,
-                filename=f'etl_output_{raw_upload.id}.xlsx'
+            return ranged_file_response(
+                request,
+                raw_upload.output_file.path,
+                filename=f'etl_output_{raw_upload.id}.xlsx',
+                content_type=XLSX_CONTENT_TYPE
             )
         
         except Exception as e:
@@ -117,6 +166,45 @@ class RawFileUploadViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(
+        detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser],
+        renderer_classes=[JSONRenderer, BrowsableAPIRenderer, EventStreamRenderer]
+    )
+    def progress(self, request, pk=None):
+        """
+        Avancement du traitement : étape, lignes lues/nettoyées/insérées, débit et ETA.
+        ?format=sse (ou Accept: text/event-stream) pour un flux server-sent events.
+        """
+        raw_upload = self.get_object()
+        
+        if request.accepted_renderer.format == 'sse':
+            stream = StreamingHttpResponse(progress_events(raw_upload.pk), content_type='text/event-stream')
+            stream['Cache-Control'] = 'no-cache'
+            # Pas de mise en tampon par un proxy nginx
+            stream['X-Accel-Buffering'] = 'no'
+            return stream
+        
+        return response.Response(progress_payload(raw_upload))
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def preview(self, request, pk=None):
+        """Aperçu des données nettoyées d'un upload traité (fichier colonnaire)"""
+        raw_upload = self.get_object()
+        
+        if not raw_upload.columnar_file:
+            return response.Response(
+                {'error': 'Aucune donnée nettoyée disponible pour ce fichier'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        columns = [column.strip() for column in request.query_params.get('columns', '').split(',') if column.strip()]
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', PREVIEW_ROWS)), PREVIEW_MAX_ROWS))
+            data = read_preview(raw_upload.columnar_file.path, columns or None, limit)
+        except (ValueError, FileNotFoundError) as e:
+            return response.Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return response.Response(data)
+    
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def pending(self, request):
         """Lister les fichiers en attente"""
@@ -146,19 +234,21 @@ class RawFileUploadViewSet(viewsets.ModelViewSet):
         return response.Response(serializer.data)
 
 class ETLUploadView(views.APIView):
-    """Vue pour upload et traitement automatique de fichiers"""
+    """Vue pour upload de fichiers et mise en file d'attente du traitement"""
     parser_classes = [parsers.MultiPartParser, parsers.FormParser]
     permission_classes = [permissions.IsAdminUser]
 
     def post(self, request, format=None):
-        """Upload et traitement automatique du fichier"""
+        """Upload du fichier ; le traitement est asynchrone (202 + id du job)"""
         file_obj = request.FILES.get('file')
         file_name = request.data.get('file_name', file_obj.name if file_obj else 'unknown')
         file_format = request.data.get('file_format', 'CSV')
         # Accepter 'category' ou 'category_id'
         category_id = request.data.get('category') or request.data.get('category_id')
-        # Récupérer la visibilité (PUBLIC ou PRIVATE)
-        visibility = request.data.get('visibility', 'PRIVATE')
+        try:
+            options = _upload_options(request)
+        except ValueError as e:
+            return response.Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         if not file_obj:
             return response.Response(
@@ -178,43 +268,198 @@ class ETLUploadView(views.APIView):
             # Vérifier que la catégorie existe
             category = Category.objects.get(id=category_id)
             
-            # Créer l'upload
+            # Empreinte calculée pendant l'écriture : un contenu identique n'est stocké
+            # qu'une fois et, sauf force=true, renvoie au résultat existant
+            name, content_hash = store_upload(file_obj)
+            if not _is_forced(request):
+                duplicate = find_duplicate(category, content_hash, options)
+                if duplicate:
+                    logger.info(f"Duplicate upload of {file_name}: reusing job {duplicate.id}")
+                    return _duplicate_response(duplicate)
+            
+            # Créer l'upload et le placer en file d'attente : le traitement
+            # est effectué par le worker ETL (python manage.py etl_worker)
             raw_upload = RawFileUpload.objects.create(
-                file=file_obj,
+                file=name,
+                content_hash=content_hash,
                 file_name=file_name,
                 file_format=file_format,
                 category=category,
                 uploaded_by=request.user,
-                status=RawFileUpload.STATUS_PROCESSING,
-                processing_started_at=timezone.now()
+                **options,
+                status=RawFileUpload.STATUS_PENDING,
+                queued_at=timezone.now()
             )
             
-            # Traiter le fichier immédiatement avec la visibilité spécifiée
-            processor = ETLProcessor(raw_upload, visibility=visibility)
-            result = processor.process()
-            
-            if result['success']:
-                return response.Response({
-                    'id': raw_upload.id,
-                    'file_name': raw_upload.file_name,
-                    'status': raw_upload.status,
-                    'total_rows': result['total_rows'],
-                    'processed_rows': result['processed_rows'],
-                    'failed_rows': result['failed_rows'],
-                    'message': result['message'],
-                    'output_file': f'/api/etl/uploads/{raw_upload.id}/download/'
-                }, status=status.HTTP_201_CREATED)
-            else:
-                return response.Response(
-                    {'error': result['error']},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            return response.Response({
+                'id': raw_upload.id,
+                'job_id': raw_upload.id,
+                'file_name': raw_upload.file_name,
+                'status': raw_upload.status,
+                'message': 'Fichier mis en file d\'attente pour traitement',
+                'status_url': f'/api/etl/uploads/{raw_upload.id}/',
+                'progress_url': f'/api/etl/uploads/{raw_upload.id}/progress/',
+                'output_file': f'/api/etl/uploads/{raw_upload.id}/download/'
+            }, status=status.HTTP_202_ACCEPTED)
         
         except Exception as e:
             return response.Response(
                 {'error': f'Erreur lors de l\'upload ou du traitement: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+class UploadBatchViewSet(viewsets.GenericViewSet):
+    """Lots d'upload : plusieurs fichiers (ou un zip) mis en file en une seule requête"""
+    queryset = UploadBatch.objects.all()
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [parsers.MultiPartParser, parsers.FormParser]
+    
+    def get_queryset(self):
+        return prefetch_batch_uploads(super().get_queryset())
+    
+    def list(self, request):
+        """Lots récents et leur avancement (sans le détail des fichiers)"""
+        page = self.paginate_queryset(self.get_queryset())
+        reports = []
+        for batch in page:
+            report = batch_report(batch)
+            report.pop('uploads')
+            reports.append(report)
+        return self.get_paginated_response(reports)
+    
+    def retrieve(self, request, pk=None):
+        """Rapport agrégé du lot : statuts, lignes, temps écoulé et temps cumulé des jobs"""
+        return response.Response(batch_report(self.get_object()))
+    
+    def create(self, request):
+        """
+        Mettre en file plusieurs fichiers ; ils sont traités en parallèle par le worker ETL.
+        
+        Paramètres:
+        - files: fichiers CSV/Excel, ou archives zip (dépliées)
+        - category / category_id: catégorie par défaut
+        - categories: correspondance JSON {nom de fichier ou motif: id de catégorie}
+        - visibility, sheet_name, header_row, ingest_mode, natural_key, force: comme /api/etl/upload/
+        """
+        from apps.datacatalog.models import Category
+        
+        try:
+            options = _upload_options(request)
+            mapping = request.data.get('categories') or {}
+            if isinstance(mapping, str):
+                mapping = json.loads(mapping)
+            if not isinstance(mapping, dict):
+                raise ValueError('categories doit être un objet JSON {fichier: catégorie}')
+            files = request.FILES.getlist('files') or request.FILES.getlist('file')
+            if not files:
+                raise ValueError('Aucun fichier fourni')
+            entries = expand_files(files)
+        except ValueError as e:
+            return response.Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        default_category = request.data.get('category') or request.data.get('category_id')
+        skipped, queued, unmapped = [], [], []
+        for file_name, file_obj in entries:
+            file_format = file_format_for(file_name)
+            if file_format is None:
+                skipped.append({'file_name': file_name, 'reason': 'Format non supporté'})
+                continue
+            category_id = resolve_category(file_name, mapping, default_category)
+            if category_id is None:
+                unmapped.append(file_name)
+            queued.append((file_name, file_obj, file_format, category_id))
+        if unmapped:
+            return response.Response(
+                {'error': f'Catégorie non indiquée pour: {", ".join(unmapped)}', 'unmapped': unmapped},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        category_ids = {str(entry[3]) for entry in queued}
+        categories = Category.objects.in_bulk([int(pk) for pk in category_ids if pk.isdigit()])
+        missing = sorted(pk for pk in category_ids if not pk.isdigit() or int(pk) not in categories)
+        if missing:
+            return response.Response(
+                {'error': f'Catégorie introuvable: {", ".join(missing)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Chaque fichier est validé (visibilité, nom, format...) avant toute écriture du lot
+        RawFileUploadCreateSerializer(data=[
+            {'file_name': file_name, 'file_format': file_format, **options}
+            for file_name, _, file_format, _ in queued
+        ], many=True, partial=True).is_valid(raise_exception=True)
+        
+        batch = UploadBatch.objects.create(
+            created_by=request.user,
+            visibility=options['visibility'],
+            ingest_mode=options['ingest_mode']
+        )
+        forced = _is_forced(request)
+        created = 0
+        for file_name, file_obj, file_format, category_id in queued:
+            category = categories[int(category_id)]
+            name, content_hash = store_upload(file_obj)
+            duplicate = None if forced else find_duplicate(category, content_hash, options)
+            if duplicate:
+                skipped.append({'file_name': file_name, 'reason': 'Fichier identique déjà importé', 'duplicate_of': duplicate.id})
+                continue
+            RawFileUpload.objects.create(
+                file=name,
+                content_hash=content_hash,
+                file_name=file_name,
+                file_format=file_format,
+                category=category,
+                uploaded_by=request.user,
+                batch=batch,
+                **options,
+                status=RawFileUpload.STATUS_PENDING,
+                queued_at=timezone.now()
+            )
+            created += 1
+        batch.skipped = skipped
+        batch.save(update_fields=['skipped'])
+        logger.info(f"Batch {batch.id}: {created} files queued by {request.user}")
+        
+        return response.Response({
+            **batch_report(self.get_queryset().get(pk=batch.pk)),
+            'message': 'Fichiers mis en file d\'attente pour traitement',
+            'status_url': f'/api/etl/batches/{batch.id}/'
+        }, status=status.HTTP_202_ACCEPTED)
+
+class ETLMetricsView(views.APIView):
+    """Mesures par étape (temps, CPU, mémoire, requêtes) des traitements ETL récents"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, format=None):
+        """
+        p50/p95/max par étape sur les derniers jobs terminés.
+        
+        Paramètres: limit (nombre de jobs, défaut ETL_METRICS_RECENT_JOBS), status (COMPLETED ou FAILED)
+        """
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', settings.ETL_METRICS_RECENT_JOBS)), 1000))
+        except ValueError:
+            return response.Response(
+                {'error': 'Le paramètre limit doit être un entier'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        statuses = [RawFileUpload.STATUS_COMPLETED, RawFileUpload.STATUS_FAILED]
+        requested_status = request.query_params.get('status')
+        if requested_status:
+            if requested_status not in statuses:
+                return response.Response(
+                    {'error': 'Statut invalide (COMPLETED ou FAILED)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            statuses = [requested_status]
+        
+        jobs_metrics = list(
+            RawFileUpload.objects.filter(status__in=statuses).exclude(metrics={})
+            .order_by('-processing_completed_at', '-id')
+            .values_list('metrics', flat=True)[:limit]
+        )
+        return response.Response({'jobs': len(jobs_metrics), **aggregate_metrics(jobs_metrics)})
+
 class DirectUploadView(views.APIView):
     """
     Vue pour téléversement direct de données déjà structurées.
@@ -310,6 +555,12 @@ class DirectUploadView(views.APIView):
                 processing_notes=f"Téléversement direct - Année: {year if year else 'N/A'} - Source: {source if source else 'N/A'}"
             )
             
+            # Copie colonnaire créée dès l'upload : les lectures suivantes ne re-parsent plus le fichier
+            try:
+                ensure_indicator_columnar(indicator, settings.ETL_CHUNK_SIZE)
+            except Exception as e:
+                logger.warning(f"Columnar copy failed for indicator {indicator.id}: {str(e)}")
+            
             logger.info(f"Direct upload successful: Indicator {indicator.id} created by {request.user}")
             
             return response.Response({
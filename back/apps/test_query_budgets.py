@@ -0,0 +1,243 @@
+"""
+Budgets de requêtes SQL et de latence de toutes les routes de l'API.
+
+Un jeu de données réaliste (milliers d'indicateurs, utilisateurs, uploads,
+demandes d'accès) est créé une fois ; chaque route GET de back/urls.py est
+appelée en administrateur, partenaire et anonyme. Le nombre de requêtes et la
+durée sont comparés au référentiel versionné query_budgets.json : un
+dépassement affiche les requêtes exécutées, les requêtes répétées (N+1) en tête.
+
+Après une modification voulue, régénérer le référentiel :
+    UPDATE_QUERY_BUDGETS=1 python manage.py test apps.test_query_budgets
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.access_request.models import AccessRequest
+from apps.dashboard.stats import rebuild_counters
+from apps.datacatalog.models import Category, DataModel, DataPoint, Indicator
+from apps.datacatalog.search import rebuild_index
+from apps.etl.models import RawFileUpload, UploadBatch
+from apps.etl.services.columnar import COLUMNAR_AVAILABLE, UPLOAD_COLUMNAR_NAME, convert_file, storage_path
+
+User = get_user_model()
+
+BUDGETS_FILE = Path(__file__).with_name('query_budgets.json')
+UPDATE_BUDGETS = os.environ.get('UPDATE_QUERY_BUDGETS') == '1'
+# Budget de latence enregistré : durée mesurée x LATENCY_FACTOR + LATENCY_MARGIN_MS
+LATENCY_FACTOR = 5
+LATENCY_MARGIN_MS = 200
+
+# Taille du jeu de données
+INDICATORS = 3000
+USERS = 60
+UPLOADS = 300
+ACCESS_REQUESTS = 300
+BATCHES = 4
+DATAPOINTS = 600
+
+# Routes sans requête GET pertinente
+SKIPPED_ROUTES = {'token_obtain_pair', 'token_refresh', 'api-root'}
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def api_routes():
+    """Routes GET de l'API : [(nom, motif)] (hors admin Django, médias et suffixes de format)"""
+    def walk(patterns, prefix=''):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns, prefix + str(pattern.pattern))
+            elif isinstance(pattern, URLPattern):
+                yield pattern, prefix + str(pattern.pattern)
+
+    routes = {}
+    for pattern, route in walk(get_resolver().url_patterns):
+        if not route.startswith('api/') or '(?P<format>' in route or pattern.name in SKIPPED_ROUTES:
+            continue
+        callback = pattern.callback
+        actions = getattr(callback, 'actions', None)
+        view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+        allows_get = 'get' in actions if actions is not None else hasattr(view_class, 'get')
+        if allows_get:
+            routes.setdefault(pattern.name, route)
+    return sorted(routes.items())
+
+
+def _sql_shape(sql):
+    """Requête sans ses valeurs littérales, pour repérer les requêtes répétées"""
+    return re.sub(r"'[^']*'|\b\d+\b", '?', sql)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, PRIVATE_MEDIA_ROOT=os.path.join(MEDIA_ROOT, 'private'))
+class QueryBudgetTestCase(APITestCase):
+    """Budgets de requêtes et de latence de chaque route, par rôle"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.admin = User.objects.create_user(
+            username='admin@ins.org', email='admin@ins.org', password='x', role=User.IS_ADMIN, is_staff=True
+        )
+        cls.partner = User.objects.create_user(
+            username='partner@ins.org', email='partner@ins.org', password='x', role=User.IS_PARTNER
+        )
+        User.objects.bulk_create([
+            User(username=f'user{i}@ins.org', email=f'user{i}@ins.org', role=[User.IS_PARTNER, User.IS_PUBLIC][i % 2])
+            for i in range(USERS)
+        ])
+        users = list(User.objects.all())
+
+        categories = Category.objects.bulk_create([Category(name=f'Catégorie {i}') for i in range(12)])
+        data_models = DataModel.objects.bulk_create([
+            DataModel(name=f'Modèle {i}', description='', schema={'fields': []}) for i in range(6)
+        ])
+        batches = UploadBatch.objects.bulk_create([UploadBatch(created_by=cls.admin) for _ in range(BATCHES)])
+        uploads = RawFileUpload.objects.bulk_create([
+            RawFileUpload(
+                file=f'etl/raw/fichier_{i}.csv', file_name=f'fichier_{i}.csv', file_format='CSV',
+                category=categories[i % len(categories)], uploaded_by=cls.admin, batch=batches[i % BATCHES] if i < 20 else None,
+                status=[RawFileUpload.STATUS_COMPLETED, RawFileUpload.STATUS_FAILED, RawFileUpload.STATUS_PENDING][i % 3],
+                processing_started_at=now, processing_completed_at=now, total_rows=100, processed_rows=90,
+                metrics={'total_seconds': 1.0, 'stages': {'read': {'wall_seconds': 0.5, 'queries': 0, 'rows': 100}}}
+            )
+            for i in range(UPLOADS)
+        ])
+        uploads[0].file.save('regions.csv', SimpleUploadedFile('regions.csv', b'region,2020\nDakar,10\nThies,20\n'))
+        if COLUMNAR_AVAILABLE:
+            columnar_name = UPLOAD_COLUMNAR_NAME.format(pk=uploads[0].pk)
+            convert_file(uploads[0].file.path, 'CSV', storage_path(columnar_name), chunk_size=1000)
+            RawFileUpload.objects.filter(pk=uploads[0].pk).update(columnar_file=columnar_name)
+        Indicator.objects.bulk_create([
+            Indicator(
+                title=f'Taux de scolarisation {i}', description=f'Indicateur de test {i}',
+                category=categories[i % len(categories)], data_model=data_models[i % len(data_models)],
+                visibility=[Indicator.VISIBILITY_PUBLIC, Indicator.VISIBILITY_PRIVATE][i % 2],
+                uploaded_by=users[i % len(users)], source_upload=uploads[i % len(uploads)],
+                is_processed=i % 5 != 0, data_file=f'indicators/indicateur_{i}.csv'
+            )
+            for i in range(INDICATORS)
+        ])
+        rebuild_index(Indicator.objects.all())
+
+        cls.indicator = Indicator.objects.create(
+            title='Population par région', description='Recensement', category=categories[0],
+            visibility=Indicator.VISIBILITY_PUBLIC, uploaded_by=cls.admin, is_processed=True,
+            data_file=SimpleUploadedFile('population.csv', b'region,2020\nDakar,10\nThies,20\n')
+        )
+        DataPoint.objects.bulk_create([
+            DataPoint(
+                indicator=cls.indicator, period=date(2000, 1, 1) + timedelta(days=30 * i),
+                region=['Dakar', 'Thiès', 'Kaolack'][i % 3], value=float(i)
+            )
+            for i in range(DATAPOINTS)
+        ])
+        AccessRequest.objects.bulk_create([
+            AccessRequest(
+                requester_full_name=f'Demandeur {i}', requester_email=f'demandeur{i}@example.com',
+                requester_phone='000', organization_name=f'Organisation {i % 40}', motivation='Recherche',
+                official_letter='access_requests/letters/lettre.pdf',
+                status=[AccessRequest.STATUS_PENDING, AccessRequest.STATUS_APPROVED][i % 2]
+            )
+            for i in range(ACCESS_REQUESTS)
+        ])
+        rebuild_counters()
+
+        cls.objects = {
+            'user': cls.partner.pk,
+            'category': categories[0].pk,
+            'data-model': data_models[0].pk,
+            'indicator': cls.indicator.pk,
+            'access-request': AccessRequest.objects.order_by('id').first().pk,
+            'raw-file-upload': uploads[0].pk,
+            'upload-batch': batches[0].pk,
+        }
+        cls.query_params = {
+            'indicator-by-category': {'category_id': categories[0].pk},
+            'indicator-by-data-model': {'data_model_id': data_models[0].pk},
+            'indicator-search': {'q': 'taux scolarisation'},
+            'indicator-bulk-export': {'ids': ','.join(str(pk) for pk in Indicator.objects.values_list('pk', flat=True)[:20])},
+        }
+
+    def _url(self, name, route):
+        """URL concrète d'une route : les paramètres de chemin reçoivent un objet du jeu de données"""
+        basename = next((prefix for prefix in sorted(self.objects, key=len, reverse=True) if name.startswith(prefix)), None)
+        url = '/' + re.sub(r'\(\?P<pk>[^)]*\)', str(self.objects.get(basename, 0)), route)
+        return url.replace('^', '').replace('$', '')
+
+    def _measure(self, url, params, user):
+        self.client.force_authenticate(user=user)
+        # Mesure à froid : caches vidés avant chaque appel
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        return response.status_code, queries.captured_queries, elapsed_ms
+
+    def _report(self, key, queries):
+        repeated = Counter(_sql_shape(query['sql']) for query in queries)
+        lines = [f'{key}: {len(queries)} requêtes']
+        lines += [f'  x{count} {shape}' for shape, count in repeated.most_common() if count > 1]
+        lines += [f'  {index + 1}. {query["sql"]}' for index, query in enumerate(queries)]
+        return '\n'.join(lines)
+
+    def test_query_and_latency_budgets(self):
+        budgets = json.loads(BUDGETS_FILE.read_text()) if BUDGETS_FILE.exists() else {}
+        measured = {}
+        failures = []
+        roles = [('admin', self.admin), ('partner', self.partner), ('anonymous', None)]
+
+        for name, route in api_routes():
+            url = self._url(name, route)
+            for role, user in roles:
+                key = f'{name} {role}'
+                status_code, queries, elapsed_ms = self._measure(url, self.query_params.get(name, {}), user)
+                self.assertLess(status_code, 500, f'{key} ({url}): erreur {status_code}')
+                measured[key] = {
+                    'status': status_code,
+                    'queries': len(queries),
+                    'ms': int(elapsed_ms * LATENCY_FACTOR + LATENCY_MARGIN_MS),
+                }
+                budget = budgets.get(key)
+                if UPDATE_BUDGETS:
+                    continue
+                if budget is None:
+                    failures.append(f'{key}: aucun budget (UPDATE_QUERY_BUDGETS=1 pour l\'ajouter)')
+                elif status_code != budget['status']:
+                    # Un 403 ou un 404 inattendu ferait moins de requêtes et passerait le budget
+                    failures.append(f"{key} ({url}): statut {status_code} au lieu de {budget['status']}")
+                elif len(queries) > budget['queries']:
+                    failures.append(f"Budget de {budget['queries']} requêtes dépassé\n" + self._report(key, queries))
+                elif elapsed_ms > budget['ms']:
+                    failures.append(f"{key}: {elapsed_ms:.0f} ms pour un budget de {budget['ms']} ms")
+
+        if UPDATE_BUDGETS:
+            BUDGETS_FILE.write_text(json.dumps(measured, indent=2, sort_keys=True) + '\n')
+            return
+        if failures:
+            self.fail('\n\n'.join(failures))
@@ -1,13 +1,28 @@
 """
 Tests unitaires pour l'application HISWACA
 """
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
 from apps.access_request.models import AccessRequest
-from apps.datacatalog.models import Category, Indicator, DataModel
+from apps.dashboard.models import StatsCounter
+from apps.dashboard.prometheus import PROMETHEUS_AVAILABLE
+from apps.dashboard.stats import rebuild_counters, record_created
+from apps.datacatalog.models import Category, Indicator, DataModel, DataPoint
 from apps.etl.models import RawFileUpload
 
 User = get_user_model()
@@ -145,6 +160,33 @@ class IndicatorTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
     
+    def test_public_indicators_cursor_pagination(self):
+        """Test la pagination par curseur des indicateurs publics, sans COUNT"""
+        Indicator.objects.bulk_create([
+            Indicator(
+                title=f'Indicateur {i}',
+                description='',
+                category=self.category,
+                visibility=Indicator.VISIBILITY_PUBLIC,
+                data_file='test.csv'
+            )
+            for i in range(25)
+        ])
+        
+        titles = []
+        url = '/api/catalog/indicators/public/?page_size=10'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles.extend(indicator['title'] for indicator in response.data['results'])
+            url = response.data['next']
+        
+        self.assertEqual(titles, [f'Indicateur {i}' for i in reversed(range(25))])
+        
+        response = self.client.get('/api/catalog/indicators/public/', {'cursor': 'invalide'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
     def test_create_indicator_requires_admin(self):
         """Test que seul un admin peut créer un indicateur"""
         response = self.client.post('/api/catalog/indicators/', {
@@ -157,6 +199,238 @@ class IndicatorTestCase(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+class DataPointTestCase(APITestCase):
+    """Tests pour les points de données d'un indicateur"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(
+            username='admin@ins.org',
+            email='admin@ins.org',
+            password='testpass123',
+            role=User.IS_ADMIN
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        self.indicator = Indicator.objects.create(
+            title='Population',
+            description='Population par région',
+            category=Category.objects.create(name='Démographie'),
+            data_file='test.csv'
+        )
+        DataPoint.objects.bulk_create([
+            DataPoint(
+                indicator=self.indicator,
+                period=date(2000 + year, 1, 1),
+                period_label=str(2000 + year),
+                region=region,
+                value=year
+            )
+            for year in range(20)
+            for region in ('Dakar', 'Thiès')
+        ])
+        self.url = f'/api/catalog/indicators/{self.indicator.id}/datapoints/'
+        cache.clear()
+    
+    def test_filters_and_cursor_pagination(self):
+        """Test les filtres période/région et la pagination par curseur"""
+        params = {'region': 'Dakar', 'period_start': '2005', 'period_end': '2014', 'limit': 4}
+        years = []
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            years.extend(point['year'] for point in response.data)
+            if 'X-Next-Cursor' not in response:
+                break
+            response = self.client.get(self.url, {**params, 'cursor': response['X-Next-Cursor']})
+        
+        self.assertEqual(years, [str(year) for year in range(2005, 2015)])
+    
+    def test_downsampling(self):
+        """Test le sous-échantillonnage avec max_points"""
+        response = self.client.get(self.url, {'region': 'Thiès', 'max_points': 5})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([point['value'] for point in response.data], [0, 4, 8, 12, 16])
+    
+    def test_aggregate_by_region(self):
+        """Test l'agrégation par région avec percentiles et regroupement par année"""
+        url = f'/api/catalog/indicators/{self.indicator.id}/aggregate/'
+        response = self.client.get(url, {'group_by': 'region', 'metrics': 'sum,count,max', 'percentiles': '50'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'region': 'Dakar', 'sum': 190.0, 'count': 20, 'max': 19.0, 'p50': 9.5},
+            {'region': 'Thiès', 'sum': 190.0, 'count': 20, 'max': 19.0, 'p50': 9.5},
+        ])
+        
+        response = self.client.get(url, {'bucket': 'year', 'metrics': 'avg', 'period_end': '2001'})
+        self.assertEqual(
+            [(row['period'], row['avg']) for row in response.data['results']],
+            [(date(2000, 1, 1), 0.0), (date(2001, 1, 1), 1.0)]
+        )
+    
+    def test_aggregate_cache_invalidated_on_ingestion(self):
+        """Test l'invalidation du cache des agrégats quand la version des données change"""
+        url = f'/api/catalog/indicators/{self.indicator.id}/aggregate/'
+        self.assertEqual(self.client.get(url, {'metrics': 'count'}).data['results'], [{'count': 40}])
+        
+        DataPoint.objects.create(indicator=self.indicator, period=date(2020, 1, 1), value=1)
+        self.assertEqual(self.client.get(url, {'metrics': 'count'}).data['results'], [{'count': 40}])
+        
+        Indicator.objects.filter(pk=self.indicator.pk).update(data_version=1)
+        self.assertEqual(self.client.get(url, {'metrics': 'count'}).data['results'], [{'count': 41}])
+        
+        response = self.client.get(url, {'group_by': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_invalid_period(self):
+        """Test le rejet d'une période invalide"""
+        response = self.client.get(self.url, {'period_start': 'hier'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_export_datapoints_csv(self):
+        """Test l'export CSV en flux des points de données (colonnes, filtres, gzip)"""
+        url = f'/api/catalog/indicators/{self.indicator.id}/export/'
+        params = {'format': 'csv', 'columns': 'period_label,value', 'filter': 'region:Dakar', 'period_end': '2002'}
+        response = self.client.get(url, params)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertEqual(content.splitlines(), ['period_label,value', '2000,0.0', '2001,1.0', '2002,2.0'])
+        
+        response = self.client.get(url, {**params, 'format': 'jsonl'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(lines[0], '{"period_label": "2000", "value": 0.0}')
+        
+        # gzip refusé explicitement (q=0) : réponse non compressée
+        response = self.client.get(url, params, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        
+        response = self.client.get(url, {'format': 'csv', 'columns': 'inconnue'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_export_data_file_xlsx(self):
+        """Test l'export XLSX d'un indicateur sans points de données, depuis son fichier"""
+        from openpyxl import load_workbook
+        
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            indicator = Indicator.objects.create(
+                title='Écoles',
+                category=self.indicator.category,
+                data_file=SimpleUploadedFile('ecoles.csv', b'region,ecoles\nDakar,120\nThi\xc3\xa8s,80\n')
+            )
+            response = self.client.get(
+                f'/api/catalog/indicators/{indicator.id}/export/',
+                {'format': 'xlsx', 'filter': 'region:Thiès'}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            content = b''.join(response.streaming_content)
+            
+            response = self.client.get(f'/api/catalog/indicators/{indicator.id}/preview/', {'limit': 1})
+            self.assertEqual(response.data['rows'], [{'region': 'Dakar', 'ecoles': 120}])
+        
+        with tempfile.TemporaryFile() as output:
+            output.write(content)
+            rows = list(load_workbook(output, read_only=True).active.values)
+        self.assertEqual(rows, [('region', 'ecoles'), ('Thiès', 80)])
+    
+    def test_bulk_export_zip(self):
+        """Test l'archive zip de plusieurs indicateurs et le cache des membres compressés"""
+        media_root = tempfile.mkdtemp()
+        private_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, private_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root, PRIVATE_MEDIA_ROOT=private_root):
+            schools = Indicator.objects.create(
+                title='Écoles',
+                category=self.indicator.category,
+                data_file=SimpleUploadedFile('ecoles.csv', b'region,ecoles\nDakar,120\n')
+            )
+            url = '/api/catalog/indicators/bulk-export/'
+            params = {'category': self.indicator.category.id, 'ids': f'{self.indicator.id},{schools.id}'}
+            archives = []
+            for _ in range(2):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response['Content-Type'], 'application/zip')
+                archives.append(zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))))
+            
+            self.assertEqual(self.client.get(url, {'ids': 'abc'}).status_code, status.HTTP_400_BAD_REQUEST)
+        
+        first, second = archives
+        names = [f'{schools.id}-ecoles.csv', f'{self.indicator.id}-population.csv', 'manifest.json']
+        self.assertEqual(first.namelist(), names)
+        self.assertIsNone(second.testzip())
+        self.assertEqual(second.read(names[0]), b'region,ecoles\nDakar,120\n')
+        self.assertEqual(len(second.read(names[1]).decode('utf-8-sig').splitlines()), 41)
+        # Second export : membres relus depuis le cache, sans descripteur de données
+        self.assertTrue(first.getinfo(names[0]).flag_bits & 0x08)
+        self.assertFalse(second.getinfo(names[0]).flag_bits & 0x08)
+        manifest = json.loads(second.read('manifest.json'))
+        self.assertEqual([entry['source'] for entry in manifest['indicators']], ['file', 'datapoints'])
+        # Cache hors de MEDIA_ROOT (non servi sous /media/)
+        self.assertTrue(os.listdir(os.path.join(private_root, 'exports_cache')))
+        self.assertFalse(os.path.exists(os.path.join(media_root, 'exports_cache')))
+
+class IndicatorSearchTestCase(APITestCase):
+    """Tests pour la recherche plein texte des indicateurs"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Santé')
+        self.mortality = self._create('Taux de mortalité infantile', 'Décès avant un an')
+        self.vaccination = self._create('Couverture vaccinale', 'Enfants vaccinés contre la rougeole (mortalité évitée)')
+        self._create('Effectifs scolaires', 'Élèves inscrits', visibility=Indicator.VISIBILITY_PRIVATE)
+    
+    def _create(self, title, description, visibility=Indicator.VISIBILITY_PUBLIC):
+        return Indicator.objects.create(
+            title=title,
+            description=description,
+            category=self.category,
+            visibility=visibility,
+            data_file='test.csv'
+        )
+    
+    def _search(self, query):
+        response = self.client.get('/api/catalog/indicators/search/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [indicator['title'] for indicator in response.data['results']]
+    
+    def test_accent_insensitive_prefix_search_ranked_by_title(self):
+        """Test la recherche sans accents, en préfixe, avec le titre mieux classé"""
+        self.assertEqual(self._search('MORTALITE'), ['Taux de mortalité infantile', 'Couverture vaccinale'])
+        self.assertEqual(self._search('morta infant'), ['Taux de mortalité infantile'])
+        self.assertEqual(self._search('enfant vacciné'), ['Couverture vaccinale'])
+        # Les indicateurs privés ne sont pas visibles sans authentification
+        self.assertEqual(self._search('élèves'), [])
+        
+        # ?search= de la liste standard passe aussi par l'index
+        partner = User.objects.create_user(
+            username='partner@ins.org', email='partner@ins.org',
+            password='testpass123', role=User.IS_PARTNER
+        )
+        self.client.force_authenticate(user=partner)
+        response = self.client.get('/api/catalog/indicators/', {'search': 'eleves'})
+        self.assertEqual([indicator['title'] for indicator in response.data['results']], ['Effectifs scolaires'])
+    
+    def test_index_follows_updates_and_deletes(self):
+        """Test la mise à jour de l'index à la modification et à la suppression"""
+        self.mortality.title = 'Espérance de vie'
+        self.mortality.save()
+        self.assertEqual(self._search('espérance'), ['Espérance de vie'])
+        
+        self.mortality.delete()
+        self.assertEqual(self._search('espérance'), [])
+        
+        response = self.client.get('/api/catalog/indicators/search/', {'q': 'a'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 class DashboardTestCase(APITestCase):
     """Tests pour le dashboard"""
     
@@ -188,3 +462,201 @@ class DashboardTestCase(APITestCase):
         self.assertIn('recent_access_requests', response.data)
         self.assertIn('recent_uploads', response.data)
         self.assertIn('recent_indicators', response.data)
+
+class DashboardStatsCacheTestCase(APITestCase):
+    """Tests pour le calcul et le cache des statistiques du dashboard"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            username='staff@ins.org',
+            email='staff@ins.org',
+            password='testpass123',
+            role=User.IS_ADMIN,
+            is_staff=True
+        )
+        self.client.force_authenticate(user=self.staff_user)
+        cache.clear()
+    
+    def test_stats_queries_and_invalidation(self):
+        """Test la lecture des compteurs en une requête, le cache puis sa mise à jour par signal"""
+        Category.objects.create(name='Santé')
+        rebuild_counters()
+        
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['users'], {'total': 1, 'admins': 1, 'partners': 0, 'public': 0, 'active': 1})
+        self.assertEqual(response.data['catalog']['categories'], 1)
+        
+        with self.assertNumQueries(0):
+            self.client.get('/api/dashboard/stats/')
+        
+        AccessRequest.objects.create(
+            requester_full_name='Marie Dupont',
+            requester_email='marie@example.com',
+            organization_name='Ministère de la Santé',
+            motivation='Accès aux données'
+        )
+        response = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(response.data['access_requests']['pending'], 1)
+    
+    def test_counters_follow_transitions_and_bulk_writes(self):
+        """Test les compteurs après changement de statut, insertion en masse et suppression"""
+        rebuild_counters()
+        access_request = AccessRequest.objects.create(
+            requester_full_name='Marie Dupont',
+            requester_email='marie@example.com',
+            organization_name='Ministère de la Santé',
+            motivation='Accès aux données'
+        )
+        access_request.status = AccessRequest.STATUS_APPROVED
+        access_request.save()
+        
+        category = Category.objects.create(name='Santé')
+        indicators = Indicator.objects.bulk_create([
+            Indicator(title=f'Indicateur {i}', description='', category=category, data_file='test.csv')
+            for i in range(3)
+        ])
+        record_created(Indicator, indicators)
+        indicators[0].delete()
+        
+        stats = self.client.get('/api/dashboard/stats/').data
+        self.assertEqual(stats['access_requests'], {'total': 1, 'pending': 0, 'approved': 1, 'rejected': 0})
+        self.assertEqual(stats['indicators']['total'], 2)
+        self.assertEqual(stats['indicators']['unprocessed'], 2)
+        self.assertEqual(rebuild_counters(), {})
+        
+        StatsCounter.objects.filter(key='indicators.total').update(value=10)
+        self.assertEqual(rebuild_counters(), {'indicators.total': (10, 2)})
+
+
+class DashboardPerfTestCase(APITestCase):
+    """Tests pour le profilage des requêtes et /api/dashboard/perf/"""
+    
+    def setUp(self):
+        self.staff_user = User.objects.create_user(
+            username='staff@ins.org', email='staff@ins.org', password='testpass123',
+            role=User.IS_ADMIN, is_staff=True
+        )
+        self.client.force_authenticate(user=self.staff_user)
+        Indicator.objects.create(
+            title='Population', description='Recensement', category=Category.objects.create(name='Démographie'),
+            uploaded_by=self.staff_user, data_file='indicators/population.csv'
+        )
+        cache.clear()
+    
+    @override_settings(PERF_PROFILING_ENABLED=True, PERF_PROFILING_SAMPLE_RATE=0, PERF_PROFILING_TOKEN='secret')
+    def test_profiled_requests_are_aggregated_per_route(self):
+        """Test le profilage sur en-tête (Server-Timing), l'agrégat par route et l'accès réservé aux admins"""
+        response = self.client.get('/api/catalog/indicators/')
+        self.assertNotIn('Server-Timing', response)
+        # Sans le secret, l'en-tête est ignoré
+        response = self.client.get('/api/catalog/indicators/', HTTP_X_PROFILE='1')
+        self.assertNotIn('Server-Timing', response)
+        
+        for _ in range(2):
+            response = self.client.get('/api/catalog/indicators/', HTTP_X_PROFILE='secret')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = dict(item.split(';dur=') for item in response['Server-Timing'].split(', '))
+        self.assertGreater(float(timings['sql']), 0)
+        self.assertGreaterEqual(float(timings['total']), float(timings['view']))
+        
+        response = self.client.get('/api/dashboard/perf/', {'route': 'indicator-list'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [route] = response.data['routes']
+        self.assertEqual(route['route'], 'GET indicator-list')
+        self.assertEqual(route['count'], 2)
+        self.assertEqual(sum(route['histogram'].values()), 2)
+        self.assertGreaterEqual(route['sql_queries_mean'], 1)
+        self.assertGreater(route['components_ms_mean']['serializer'], 0)
+        self.assertGreater(route['components_ms_mean']['render'], 0)
+        self.assertTrue(route['hot_frames'])
+        self.assertLessEqual(route['latency_ms']['p50'], route['latency_ms']['max'])
+        
+        partner = User.objects.create_user(username='partner@ins.org', password='testpass123', role=User.IS_PARTNER)
+        self.client.force_authenticate(user=partner)
+        self.assertEqual(self.client.get('/api/dashboard/perf/').status_code, status.HTTP_403_FORBIDDEN)
+
+
+
+@skipUnless(PROMETHEUS_AVAILABLE, 'prometheus_client non installé')
+class MetricsTestCase(APITestCase):
+    """Tests pour /metrics"""
+    
+    def setUp(self):
+        Category.objects.create(name='Démographie')
+        self.user = User.objects.create_user(username='admin@ins.org', password='testpass123', role=User.IS_ADMIN)
+        self.client.force_authenticate(user=self.user)
+        RawFileUpload.objects.create(file='etl/raw/a.csv', file_format='CSV', uploaded_by=self.user)
+        cache.clear()
+    
+    def sample(self, name, **labels):
+        from prometheus_client import REGISTRY
+        return REGISTRY.get_sample_value(name, labels) or 0
+    
+    def test_metrics_exposition(self):
+        """Test les compteurs HTTP, le hit/miss du cache des listes, le SQL et les jauges ETL"""
+        requests_before = self.sample('http_requests_total', method='GET', route='category-list', status='200')
+        misses = self.sample('cache_page_requests_total', view='category-list', result='miss')
+        hits = self.sample('cache_page_requests_total', view='category-list', result='hit')
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/catalog/categories/').status_code, status.HTTP_200_OK)
+        
+        self.assertEqual(self.sample('http_requests_total', method='GET', route='category-list', status='200'), requests_before + 2)
+        self.assertEqual(self.sample('cache_page_requests_total', view='category-list', result='miss'), misses + 1)
+        self.assertEqual(self.sample('cache_page_requests_total', view='category-list', result='hit'), hits + 1)
+        
+        # Sans jeton configuré, fermé hors DEBUG
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_401_UNAUTHORIZED)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{', body)
+        self.assertIn('db_query_duration_seconds_count{alias="default",operation="SELECT"}', body)
+        self.assertIn('etl_jobs{status="PENDING"} 1.0', body)
+        self.assertIn('etl_queue_oldest_seconds', body)
+
+class GenerateDatasetTestCase(TestCase):
+    def test_generate_dataset_is_deterministic(self):
+        """Test la génération synthétique : volumes demandés, fichiers d'upload et mêmes données à graine égale"""
+        from django.core.management import call_command
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        options = [
+            '--categories', '3', '--indicators-per-category', '4', '--datapoints', '6',
+            '--users-per-role', '2', '--access-requests', '5', '--uploads', '2', '--upload-format', 'both',
+            '--upload-rows', '5', '--upload-columns', '3', '--workers', '1', '--seed', '7'
+        ]
+        with override_settings(MEDIA_ROOT=media_root):
+            call_command('generate_dataset', *options, stdout=io.StringIO())
+            first_ids = list(Indicator.objects.order_by('id').values_list('id', flat=True))
+            call_command('generate_dataset', *options, stdout=io.StringIO())
+
+            self.assertEqual(Category.objects.count(), 3)
+            self.assertEqual(User.objects.filter(role=User.IS_ADMIN, is_staff=True).count(), 2)
+            self.assertEqual(AccessRequest.objects.count(), 10)
+            uploads = RawFileUpload.objects.order_by('id')
+            self.assertEqual([upload.file_format for upload in uploads[:2]], ['CSV', 'EXCEL'])
+            with uploads[0].file.open('rb') as f:
+                self.assertEqual(f.read().decode('utf-8').splitlines()[0], 'title,description,region,2000,2001,2002')
+            self.assertEqual(uploads[0].content_hash, uploads[2].content_hash)
+
+        indicators = Indicator.objects.order_by('id')
+        first = indicators.filter(id__in=first_ids)
+        second = indicators.exclude(id__in=first_ids)
+        self.assertEqual(len(first), 12)
+        self.assertEqual([i.title for i in first], [i.title for i in second])
+        self.assertEqual(DataPoint.objects.count(), 2 * 12 * 6)
+        def values(queryset):
+            return list(
+                DataPoint.objects.filter(indicator__in=queryset)
+                .order_by('indicator_id', 'period').values_list('period', 'region', 'value')
+            )
+        self.assertEqual(values(first), values(second))
+        self.assertEqual(StatsCounter.objects.get(key='indicators.total').value, 24)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 from decouple import config, Csv
 from datetime import timedelta
@@ -53,6 +54,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Profilage à la demande (inactif sauf PERF_PROFILING_ENABLED), en tête pour mesurer toute la chaîne
+    'apps.dashboard.profiling.RequestProfilingMiddleware',
+    # Métriques Prometheus (/metrics) : durée et statut par route, durée des requêtes SQL
+    'apps.dashboard.prometheus.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -90,6 +95,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Attendre le verrou d'écriture plutôt qu'échouer (worker ETL concurrent)
+        'OPTIONS': {'timeout': 20},
     }
 }
 
@@ -203,6 +210,8 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@hiswaca.org')
 # Configuration Media Files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Fichiers privés, jamais servis sous MEDIA_URL : lus uniquement par les vues qui contrôlent l'accès
+PRIVATE_MEDIA_ROOT = config('PRIVATE_MEDIA_ROOT', default=str(BASE_DIR / 'private_media'))
 
 # Logging amélioré
 LOGGING = {
@@ -270,6 +279,69 @@ CACHES = {
     }
 }
 
+# Configuration ETL
+# Nombre d'indicateurs insérés par requête bulk_create (une transaction par lot)
+ETL_BULK_BATCH_SIZE = config('ETL_BULK_BATCH_SIZE', default=1000, cast=int)
+# Nombre de lignes lues par bloc : borne la mémoire utilisée par un traitement
+ETL_CHUNK_SIZE = config('ETL_CHUNK_SIZE', default=50000, cast=int)
+# Lecture Excel : 'openpyxl' (flux, mémoire constante), 'calamine' (plus rapide, python-calamine) ou 'auto'
+ETL_EXCEL_ENGINE = config('ETL_EXCEL_ENGINE', default='auto')
+# Worker ETL (python manage.py etl_worker)
+ETL_WORKER_CONCURRENCY = config('ETL_WORKER_CONCURRENCY', default=2, cast=int)
+ETL_WORKER_POLL_INTERVAL = config('ETL_WORKER_POLL_INTERVAL', default=2.0, cast=float)
+# Un job en traitement sans signal du worker depuis ce délai (secondes) est relancé
+ETL_JOB_STALE_TIMEOUT = config('ETL_JOB_STALE_TIMEOUT', default=300, cast=int)
+ETL_JOB_MAX_ATTEMPTS = config('ETL_JOB_MAX_ATTEMPTS', default=3, cast=int)
+# Lots d'upload (/api/etl/batches/) : nombre de fichiers et taille décompressée maximale des zip
+ETL_BATCH_MAX_FILES = config('ETL_BATCH_MAX_FILES', default=50, cast=int)
+ETL_BATCH_MAX_BYTES = config('ETL_BATCH_MAX_BYTES', default=2 * 1024 * 1024 * 1024, cast=int)
+# Avancement des traitements : intervalle minimal (secondes) entre deux écritures en base,
+# durée maximale d'un flux SSE (le navigateur se reconnecte ensuite) : un flux occupe un
+# worker WSGI, la durée doit rester courte et inférieure au timeout du serveur (gunicorn)
+ETL_PROGRESS_INTERVAL = config('ETL_PROGRESS_INTERVAL', default=0.5, cast=float)
+ETL_PROGRESS_STREAM_TIMEOUT = config('ETL_PROGRESS_STREAM_TIMEOUT', default=25, cast=int)
+# Mesure des allocations Python par étape (tracemalloc) : ralentit le traitement, à activer ponctuellement
+ETL_TRACEMALLOC = config('ETL_TRACEMALLOC', default=False, cast=bool)
+# /api/etl/metrics/ : nombre de jobs récents agrégés par défaut
+ETL_METRICS_RECENT_JOBS = config('ETL_METRICS_RECENT_JOBS', default=100, cast=int)
+
+# Configuration catalogue
+# Durée de vie (secondes) des agrégats d'indicateurs en cache ; invalidés à chaque ingestion
+CATALOG_AGGREGATE_CACHE_TTL = config('CATALOG_AGGREGATE_CACHE_TTL', default=600, cast=int)
+# Export groupé (zip) : nombre maximal d'indicateurs par archive
+CATALOG_BULK_EXPORT_MAX_INDICATORS = config('CATALOG_BULK_EXPORT_MAX_INDICATORS', default=500, cast=int)
+# Cache des membres déjà compressés (défaut: PRIVATE_MEDIA_ROOT/exports_cache) ; 0 octet désactive le cache
+CATALOG_EXPORT_CACHE_DIR = config('CATALOG_EXPORT_CACHE_DIR', default='')
+CATALOG_EXPORT_CACHE_MAX_BYTES = config('CATALOG_EXPORT_CACHE_MAX_BYTES', default=50 * 1024 * 1024, cast=int)
+
+# Configuration dashboard
+# Durée de vie (secondes) des statistiques en cache ; invalidées à chaque modification
+DASHBOARD_STATS_CACHE_TTL = config('DASHBOARD_STATS_CACHE_TTL', default=30, cast=int)
+# Profilage des requêtes (apps/dashboard/profiling.py, /api/dashboard/perf/) : requêtes portant
+# l'en-tête PERF_PROFILING_HEADER avec le secret PERF_PROFILING_TOKEN (vide = en-tête ignoré)
+# et échantillon aléatoire des autres (0.01 = 1 %)
+PERF_PROFILING_ENABLED = config('PERF_PROFILING_ENABLED', default=False, cast=bool)
+PERF_PROFILING_HEADER = config('PERF_PROFILING_HEADER', default='X-Profile')
+PERF_PROFILING_TOKEN = config('PERF_PROFILING_TOKEN', default='')
+PERF_PROFILING_SAMPLE_RATE = config('PERF_PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+# Fonctions les plus coûteuses conservées par route
+PERF_PROFILING_TOP_FRAMES = config('PERF_PROFILING_TOP_FRAMES', default=15, cast=int)
+# Fenêtre glissante des histogrammes et durée d'une tranche (secondes)
+PERF_PROFILING_WINDOW = config('PERF_PROFILING_WINDOW', default=3600, cast=int)
+PERF_PROFILING_SLOT = config('PERF_PROFILING_SLOT', default=60, cast=int)
+
+# Configuration métriques
+# /metrics au format Prometheus (apps/dashboard/prometheus.py, nécessite prometheus_client)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Jeton exigé du collecteur (Authorization: Bearer <token>) ; vide = /metrics fermé hors DEBUG
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Répertoire partagé des valeurs en mode multiprocessus (gunicorn, workers ETL) ;
+# lu par prometheus_client dans l'environnement, à vider au démarrage (gunicorn_config.py)
+PROMETHEUS_MULTIPROC_DIR = config('PROMETHEUS_MULTIPROC_DIR', default='')
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', PROMETHEUS_MULTIPROC_DIR)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
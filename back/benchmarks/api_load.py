@@ -0,0 +1,377 @@
+"""
+Test de charge de l'API REST, application démarrée dans le processus.
+À lancer depuis back/ avec: python -m benchmarks.api_load --indicators 20000 --clients 16 --duration 30
+
+Un jeu de données est généré dans une base de test temporaire (fichier SQLite,
+ou base de test PostgreSQL selon la configuration), supprimée à la fin.
+L'application est servie par un serveur WSGI multi-thread local ; des clients
+concurrents (partenaires et administrateurs) enchaînent connexion, navigation
+et recherche dans le catalogue, détail, export, upload ETL et consultation du
+tableau de bord.
+
+Le rapport JSON donne, par endpoint : débit, latences p50/p95/p99, erreurs et
+temps passé en base (mesuré côté serveur). Comparer deux exécutions sur la même
+machine, avec les mêmes paramètres, pour mesurer l'effet d'une modification.
+Le throttling DRF est désactivé pendant le test.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'back.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from apps.dashboard.stats import rebuild_counters  # noqa: E402
+from apps.datacatalog import synthetic  # noqa: E402
+from apps.datacatalog.models import Indicator  # noqa: E402
+from apps.datacatalog.search import rebuild_index  # noqa: E402
+from apps.etl.services.metrics import percentile  # noqa: E402
+
+PASSWORD = 'bench-password'
+SEARCHES = ['taux scolarisation', 'mortalité infantile', 'population urbaine', 'accès eau potable', 'emploi']
+CATEGORIES = 20
+INDICATORS_WITH_POINTS = 100
+POINTS_PER_INDICATOR = 120
+
+# Parcours des clients : (endpoint, poids)
+PARTNER_MIX = [('browse', 30), ('search', 25), ('detail', 20), ('categories', 10), ('export', 10), ('datapoints', 5)]
+ADMIN_MIX = [('dashboard_stats', 30), ('dashboard_activity', 20), ('uploads', 15), ('upload', 10), ('upload_progress', 10), ('browse', 15)]
+
+
+# Jeu de données
+
+def generate(indicators, partners, admins, seed=0):
+    """Jeu de données de manage.py generate_dataset, à l'échelle du test"""
+    synthetic.generate_users(max(partners, admins), PASSWORD, seed)
+    categories = synthetic.generate_categories(CATEGORIES)
+    indicator_ids = synthetic.generate_indicators(categories, -(-indicators // CATEGORIES), seed)
+    with_points = indicator_ids[:INDICATORS_WITH_POINTS]
+    datapoints = synthetic.generate_datapoints(with_points, POINTS_PER_INDICATOR, seed)
+    rebuild_index(Indicator.objects.all())
+    rebuild_counters()
+    public = Indicator.objects.filter(visibility=Indicator.VISIBILITY_PUBLIC)
+    return {
+        'indicators': len(indicator_ids),
+        'datapoints': datapoints,
+        'public_ids': list(public.values_list('id', flat=True)),
+        'datapoint_ids': list(public.filter(id__in=with_points).values_list('id', flat=True)),
+        'category_ids': [category.id for category in categories],
+    }
+
+
+# Serveur
+
+class DatabaseTimer:
+    """Application WSGI enveloppée : temps et nombre de requêtes SQL par endpoint, côté serveur"""
+
+    def __init__(self, app):
+        self.app = app
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        timing = {'seconds': 0.0, 'queries': 0}
+
+        def timed_execute(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                timing['seconds'] += time.perf_counter() - started
+                timing['queries'] += 1
+
+        with connection.execute_wrapper(timed_execute):
+            result = self.app(environ, start_response)
+            try:
+                # Les réponses en flux interrogent la base pendant l'itération
+                body = list(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        with self.lock:
+            self.samples[environ.get('HTTP_X_BENCH_ENDPOINT', 'other')].append((timing['seconds'], timing['queries']))
+        return body
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(app):
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=False)
+    server.set_app(app)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+# Clients
+
+def multipart(fields, file_field, file_name, content):
+    boundary = uuid.uuid4().hex
+    parts = [
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{file_name}"\r\n'
+        f'Content-Type: text/csv\r\n\r\n'.encode() + content + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Client:
+    """Client virtuel : se connecte puis enchaîne les endpoints de son parcours jusqu'à l'échéance"""
+
+    def __init__(self, base_url, username, mix, dataset, results, seed):
+        self.base_url = base_url
+        self.username = username
+        self.endpoints, self.weights = zip(*mix)
+        self.dataset = dataset
+        self.results = results
+        self.rng = random.Random(seed)
+        self.token = None
+        self.upload_ids = []
+        # Page suivante du parcours du catalogue (pagination par curseur : lien ``next``)
+        self.browse_next = None
+
+    def request(self, endpoint, method, path, body=None, content_type=None, accept='application/json'):
+        headers = {'X-Bench-Endpoint': endpoint, 'Accept': accept}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if content_type:
+            headers['Content-Type'] = content_type
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                status, payload = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except OSError:
+            status, payload = 0, b''
+        self.results.record(endpoint, time.perf_counter() - started, status)
+        return status, payload
+
+    def login(self):
+        body = json.dumps({'username': self.username, 'password': PASSWORD}).encode()
+        status, payload = self.request('login', 'POST', '/api/token/', body, 'application/json')
+        if status == 200:
+            self.token = json.loads(payload)['access']
+        return status == 200
+
+    def run(self, deadline):
+        if not self.login():
+            return
+        while time.perf_counter() < deadline:
+            endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+            getattr(self, f'do_{endpoint}')()
+
+    def do_browse(self):
+        status, payload = self.request('browse', 'GET', self.browse_next or '/api/catalog/indicators/public/')
+        next_url = json.loads(payload).get('next') if status == 200 else None
+        # Dernière page atteinte (ou erreur) : le parcours reprend au début
+        self.browse_next = None
+        if next_url:
+            parts = urllib.parse.urlsplit(next_url)
+            self.browse_next = f'{parts.path}?{parts.query}'
+
+    def do_search(self):
+        query = urllib.parse.quote(self.rng.choice(SEARCHES))
+        self.request('search', 'GET', f'/api/catalog/indicators/search/?q={query}')
+
+    def do_detail(self):
+        self.request('detail', 'GET', f'/api/catalog/indicators/{self.rng.choice(self.dataset["public_ids"])}/')
+
+    def do_categories(self):
+        self.request('categories', 'GET', '/api/catalog/categories/')
+
+    def do_export(self):
+        self.request('export', 'GET', f'/api/catalog/indicators/{self.rng.choice(self.dataset["public_ids"])}/export/?format=csv', accept='text/csv')
+
+    def do_datapoints(self):
+        indicator_id = self.rng.choice(self.dataset['datapoint_ids'])
+        self.request('datapoints', 'GET', f'/api/catalog/indicators/{indicator_id}/datapoints/')
+
+    def do_dashboard_stats(self):
+        self.request('dashboard_stats', 'GET', '/api/dashboard/stats/')
+
+    def do_dashboard_activity(self):
+        self.request('dashboard_activity', 'GET', '/api/dashboard/activity/')
+
+    def do_uploads(self):
+        self.request('uploads', 'GET', '/api/etl/uploads/')
+
+    def do_upload(self):
+        # Contenu unique : un fichier identique serait dédupliqué
+        lines = [f'indicateur,region,valeur,{uuid.uuid4().hex}'] + [
+            f'Indicateur {n},{self.rng.choice(synthetic.REGIONS)},{self.rng.random() * 100:.2f},' for n in range(200)
+        ]
+        body, content_type = multipart(
+            {'category': self.rng.choice(self.dataset['category_ids']), 'file_format': 'CSV'},
+            'file', 'bench.csv', '\n'.join(lines).encode()
+        )
+        status, payload = self.request('upload', 'POST', '/api/etl/upload/', body, content_type)
+        if status in (200, 202):
+            upload_id = json.loads(payload).get('id')
+            if upload_id:
+                self.upload_ids.append(upload_id)
+
+    def do_upload_progress(self):
+        if not self.upload_ids:
+            return self.do_upload()
+        self.request('upload_progress', 'GET', f'/api/etl/uploads/{self.rng.choice(self.upload_ids)}/progress/')
+
+
+class Results:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        with self.lock:
+            self.samples[endpoint].append((seconds, status))
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def report(results, timer, elapsed):
+    endpoints = {}
+    for endpoint in sorted(results.samples):
+        samples = results.samples[endpoint]
+        latencies = sorted(seconds for seconds, _ in samples)
+        db = timer.samples.get(endpoint, [])
+        db_seconds = sorted(seconds for seconds, _ in db)
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, status in samples if not 200 <= status < 400),
+            'throughput_rps': round(len(samples) / elapsed, 2),
+            'latency_ms': {
+                'p50': _ms(percentile(latencies, 0.5)),
+                'p95': _ms(percentile(latencies, 0.95)),
+                'p99': _ms(percentile(latencies, 0.99)),
+                'mean': _ms(sum(latencies) / len(latencies)),
+            },
+            'db_ms': {
+                'mean': _ms(sum(db_seconds) / len(db_seconds)) if db else None,
+                'p95': _ms(percentile(db_seconds, 0.95)),
+            },
+            'queries_mean': round(sum(queries for _, queries in db) / len(db), 1) if db else None,
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {'requests': total, 'throughput_rps': round(total / elapsed, 2), 'endpoints': endpoints}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--indicators', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=16, help='clients concurrents')
+    parser.add_argument('--admins', type=int, default=0, help='dont administrateurs (défaut: un quart)')
+    parser.add_argument('--duration', type=float, default=30, help='durée de la charge en secondes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='fichier JSON du rapport (défaut: sortie standard)')
+    args = parser.parse_args()
+    admins = args.admins or max(1, args.clients // 4)
+    partners = max(args.clients - admins, 0)
+
+    media_root = tempfile.mkdtemp(prefix='bench_media_')
+    database_dir = tempfile.mkdtemp(prefix='bench_db_')
+    overrides = override_settings(
+        MEDIA_ROOT=media_root,
+        PRIVATE_MEDIA_ROOT=os.path.join(media_root, 'private'),
+        DEBUG=False,
+        ALLOWED_HOSTS=['127.0.0.1'],
+        REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []},
+    )
+    overrides.enable()
+    if connection.vendor == 'sqlite':
+        # Base fichier partagée par les threads du serveur (la base mémoire de test ne l'est pas)
+        connection.settings_dict['TEST']['NAME'] = os.path.join(database_dir, 'bench.sqlite3')
+        connection.settings_dict['OPTIONS'] = {**connection.settings_dict.get('OPTIONS', {}), 'timeout': 30}
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    server = None
+    try:
+        started = time.perf_counter()
+        dataset = generate(args.indicators, partners, admins, args.seed)
+        setup_seconds = time.perf_counter() - started
+        connection.close()
+
+        timer = DatabaseTimer(WSGIHandler())
+        server, base_url = start_server(timer)
+        results = Results()
+        clients = [
+            Client(base_url, f'admin{i}-{args.seed}', ADMIN_MIX, dataset, results, args.seed + i) for i in range(admins)
+        ] + [
+            Client(base_url, f'partner{i}-{args.seed}', PARTNER_MIX, dataset, results, args.seed + admins + i) for i in range(partners)
+        ]
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = [threading.Thread(target=client.run, args=(deadline,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        output = {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cpu_count': os.cpu_count(),
+            'clients': {'admins': admins, 'partners': partners},
+            'dataset': {key: dataset[key] for key in ('indicators', 'datapoints')},
+            'setup_seconds': round(setup_seconds, 2),
+            'duration_seconds': round(elapsed, 2),
+            **report(results, timer, elapsed),
+        }
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        overrides.disable()
+        shutil.rmtree(media_root, ignore_errors=True)
+        shutil.rmtree(database_dir, ignore_errors=True)
+
+    text = json.dumps(output, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
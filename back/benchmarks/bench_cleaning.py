@@ -0,0 +1,75 @@
+"""
+Benchmark du nettoyage ETL : ancienne implémentation (applymap) contre CleaningPipeline.
+À lancer depuis back/ avec: python -m benchmarks.bench_cleaning --rows 100000 --columns 40
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from apps.etl.services.cleaning import CleaningPipeline
+
+
+def legacy_clean(df):
+    """Ancien ETLProcessor._clean_data"""
+    df = df.copy()
+    df = df.dropna(how='all')
+    with warnings.catch_warnings():
+        # applymap est déprécié depuis pandas 2.1
+        warnings.simplefilter('ignore', FutureWarning)
+        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    df.columns = df.columns.str.lower().str.strip()
+    return df
+
+
+def build_frame(rows, columns, seed=0):
+    """Bloc mixte : moitié texte avec espaces parasites, moitié numérique, quelques lignes vides"""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 2:
+            data[f' Valeur {i} '] = rng.normal(size=rows)
+        else:
+            words = np.array([f'  Région {n} ' for n in range(50)], dtype=object)
+            data[f' Libellé {i} '] = words[rng.integers(0, len(words), size=rows)]
+    df = pd.DataFrame(data)
+    df.iloc[::100] = None
+    return df
+
+
+def timed(func, df, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows, args.columns)
+    pipeline = CleaningPipeline()
+
+    legacy_seconds, legacy = timed(legacy_clean, df, args.repeat)
+    pipeline_seconds, cleaned = timed(pipeline.run, df, args.repeat)
+
+    # Les deux implémentations doivent produire le même résultat
+    pd.testing.assert_frame_equal(legacy, cleaned)
+
+    print(f"Bloc: {args.rows} lignes x {args.columns} colonnes (meilleur de {args.repeat})")
+    print(f"  applymap          : {legacy_seconds:.3f}s")
+    print(f"  CleaningPipeline  : {pipeline_seconds:.3f}s")
+    print(f"  Gain              : x{legacy_seconds / pipeline_seconds:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark de la lecture Excel : pd.read_excel (tout le classeur en un DataFrame)
+contre iter_excel_chunks par blocs, avec openpyxl (read_only/values_only) et
+calamine (si python-calamine est installé).
+À lancer depuis back/ avec: python -m benchmarks.bench_excel --rows 500000
+
+Chaque lecture est faite dans un processus séparé pour mesurer son pic de mémoire (RSS).
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from apps.etl.services.readers import CalamineWorkbook, iter_excel_chunks
+
+REGIONS = ['Brazzaville', 'Pointe-Noire', 'Bouenza', 'Cuvette', 'Kouilou', 'Likouala', 'Niari', 'Plateaux', 'Pool', 'Sangha']
+
+
+def build_workbook(path, rows, seed=0):
+    """Classeur de type INS : un titre sur la première ligne, l'en-tête sur la deuxième"""
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Données')
+    sheet.append(['Recensement synthétique'])
+    sheet.append(['indicateur', 'description', 'région', 'année', 'date', 'population', 'taux', 'code'])
+    regions = rng.integers(0, len(REGIONS), size=rows)
+    years = rng.integers(2000, 2024, size=rows)
+    populations = rng.integers(100, 1_000_000, size=rows)
+    rates = rng.random(size=rows) * 100
+    start = date(2000, 1, 1)
+    for i in range(rows):
+        sheet.append([
+            f'Indicateur {i % 500}', f'Description {i % 50}', REGIONS[regions[i]], int(years[i]),
+            start + timedelta(days=int(i % 8000)), int(populations[i]), float(rates[i]), f'C{i:07d}'
+        ])
+    workbook.save(path)
+
+
+def read_legacy(path, chunk_size):
+    df = pd.read_excel(path, sheet_name='Données', header=1)
+    return len(df), float(df['population'].sum())
+
+
+def read_chunks(engine):
+    def read(path, chunk_size):
+        rows = 0
+        total = 0.0
+        for chunk in iter_excel_chunks(path, chunk_size, sheet_name='Données', header_row=2, engine=engine):
+            rows += len(chunk)
+            total += float(chunk['population'].sum())
+        return rows, total
+    return read
+
+
+def _measure(func, path, chunk_size, queue):
+    start = time.perf_counter()
+    result = func(path, chunk_size)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss est en Ko sous Linux
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, result))
+
+
+def measure(func, path, chunk_size):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(func, path, chunk_size, queue))
+    process.start()
+    outcome = queue.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'synthetique.xlsx')
+        started = time.perf_counter()
+        build_workbook(path, args.rows)
+        size = os.path.getsize(path) / 1024 / 1024
+        print(f"Classeur: {args.rows} lignes x 8 colonnes, {size:.1f} Mo (généré en {time.perf_counter() - started:.1f}s)")
+
+        readers = [('pd.read_excel', read_legacy), ('openpyxl (blocs)', read_chunks('openpyxl'))]
+        if CalamineWorkbook is not None:
+            readers.append(('calamine (blocs)', read_chunks('calamine')))
+        results = [(label, *measure(func, path, args.chunk_size)) for label, func in readers]
+
+    # Toutes les lectures doivent trouver les mêmes données
+    expected = results[0][3]
+    for label, _, _, result in results:
+        assert result == expected, (label, result, expected)
+
+    legacy_seconds = results[0][1]
+    print(f"Blocs de {args.chunk_size} lignes")
+    for label, seconds, rss, _ in results:
+        print(f"  {label:<18}: {seconds:6.1f}s (x{legacy_seconds / seconds:.1f}), pic mémoire {rss:.0f} Mo")
+
+
+if __name__ == '__main__':
+    main()
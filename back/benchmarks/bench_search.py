@@ -0,0 +1,104 @@
+"""
+Benchmark de la recherche d'indicateurs : LIKE (SearchFilter) contre l'index plein texte.
+À lancer depuis back/ avec: python -m benchmarks.bench_search --rows 100000
+
+Les données sont générées dans une base de test temporaire, supprimée à la fin.
+LIKE trouve aussi les sous-chaînes en milieu de mot, d'où des totaux parfois plus élevés.
+"""
+import argparse
+import os
+import random
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'back.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from apps.datacatalog.models import Category, Indicator  # noqa: E402
+from apps.datacatalog.search import index_indicators, search_indicators  # noqa: E402
+
+WORDS = [
+    'taux', 'mortalité', 'infantile', 'scolarisation', 'primaire', 'secondaire', 'population',
+    'région', 'accès', 'eau', 'potable', 'électricité', 'vaccination', 'couverture', 'pauvreté',
+    'ménages', 'chômage', 'jeunes', 'femmes', 'naissances', 'décès', 'santé', 'éducation', 'revenu',
+]
+QUERIES = ['mortalité', 'taux scolarisation', 'vacc', 'pauvreté ménages', 'revenu']
+
+
+def build_vocabulary(rng, size=5000):
+    """Vocabulaire à fréquences de Zipf : les mots du catalogue puis des mots synthétiques"""
+    letters = 'abcdefghijklmnopqrstuvwxyzéè'
+    synthetic = {''.join(rng.choices(letters, k=rng.randint(5, 11))) for _ in range(size)}
+    vocabulary = [word for word in sorted(synthetic) if word not in WORDS][:size - len(WORDS)]
+    rng.shuffle(vocabulary)
+    # Les mots du catalogue sont répartis dans la distribution (fréquents à rares)
+    for position, word in enumerate(WORDS):
+        vocabulary.insert(position * 40, word)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    return vocabulary, weights
+
+
+def generate(rows, batch_size=5000):
+    rng = random.Random(0)
+    vocabulary, weights = build_vocabulary(rng)
+    category = Category.objects.create(name='Benchmark')
+    for start in range(0, rows, batch_size):
+        batch = Indicator.objects.bulk_create([
+            Indicator(
+                title=' '.join(rng.choices(vocabulary, weights, k=4)).capitalize(),
+                description=' '.join(rng.choices(vocabulary, weights, k=20)),
+                category=category,
+                data_file='benchmark.csv'
+            )
+            for _ in range(min(batch_size, rows - start))
+        ])
+        index_indicators(batch)
+
+
+def like_search(query):
+    """Équivalent de SearchFilter sur title et description"""
+    condition = Q()
+    for word in query.split():
+        condition &= Q(title__icontains=word) | Q(description__icontains=word)
+    return Indicator.objects.filter(condition).order_by('-created_at', '-id')
+
+
+def timed(func, query, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(list(func(query)[:20]))
+        total = func(query).count()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        started = time.perf_counter()
+        generate(args.rows)
+        print(f"{args.rows} indicateurs générés et indexés en {time.perf_counter() - started:.1f}s ({connection.vendor})")
+        print(f"{'requête':<26}{'LIKE':>10}{'index':>10}{'résultats LIKE/index':>24}")
+        for query in QUERIES:
+            like_seconds, _, like_total = timed(like_search, query, args.repeat)
+            index_seconds, _, index_total = timed(
+                lambda q: search_indicators(Indicator.objects.all(), q), query, args.repeat
+            )
+            print(f"{query:<26}{like_seconds * 1000:>8.1f}ms{index_seconds * 1000:>8.1f}ms{like_total:>12}/{index_total}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Configuration gunicorn (production).
+À lancer avec: PROMETHEUS_MULTIPROC_DIR=/tmp/hiswaca-metrics gunicorn back.wsgi:application --config gunicorn_config.py
+
+Workers à threads (gthread) : un flux SSE d'avancement ETL (/api/etl/uploads/{id}/progress/?format=sse)
+occupe un thread pendant au plus ETL_PROGRESS_STREAM_TIMEOUT secondes, et non un
+worker entier ; ``timeout`` (battement de cœur du worker) reste supérieur à cette durée.
+
+Avec PROMETHEUS_MULTIPROC_DIR, /metrics agrège les métriques de tous les
+workers : le répertoire est vidé au démarrage et les fichiers d'un worker
+arrêté sont marqués pour que ses jauges ne soient plus exposées.
+"""
+import os
+import shutil
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = 120
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)